@@ -10,16 +10,23 @@
 --
 -- This script:
 -- • Creates 2 tables: interviews, question_responses
+-- • Creates the complete_interview() function used by the backend
+-- • Creates analytics rollups (interview_stats, interview_topic_stats) kept current by triggers
 -- • No duplicate or redundant tables
 -- • Includes all required columns for manual interview ending
 -- • Safe to run multiple times
 -- ===============================================================================
 
 -- Drop existing tables if they exist (clean slate)
+DROP TABLE IF EXISTS interview_topic_stats CASCADE;
+DROP TABLE IF EXISTS interview_stats CASCADE;
 DROP TABLE IF EXISTS question_responses CASCADE;
 DROP TABLE IF EXISTS interview_results CASCADE;  -- Remove duplicate table
 DROP TABLE IF EXISTS interviews CASCADE;
 DROP VIEW IF EXISTS interview_results_view CASCADE;
+DROP FUNCTION IF EXISTS complete_interview(TEXT, JSONB, JSONB, JSONB);
+DROP FUNCTION IF EXISTS interviews_stats_trigger() CASCADE;
+DROP FUNCTION IF EXISTS rebuild_interview_stats();
 
 -- ===============================================================================
 -- TABLE 1: INTERVIEWS - Main interview sessions
@@ -65,6 +72,8 @@ CREATE TABLE question_responses (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
     session_id TEXT NOT NULL,
     question_index INTEGER NOT NULL,
+    -- Client-generated; makes replayed inserts from the backend's outbox idempotent
+    idempotency_key TEXT UNIQUE,
     
     -- Question content
     question_text TEXT NOT NULL,
@@ -97,7 +106,8 @@ CREATE TABLE question_responses (
 CREATE INDEX idx_interviews_session_id ON interviews(session_id);
 CREATE INDEX idx_interviews_status ON interviews(status);
 CREATE INDEX idx_interviews_completion_method ON interviews(completion_method);
-CREATE INDEX idx_interviews_created_at ON interviews(created_at DESC);
+-- Matches the listing order (newest first, id as tie-breaker) for keyset pagination
+CREATE INDEX idx_interviews_created_at_id ON interviews(created_at DESC, id DESC);
 
 CREATE INDEX idx_question_responses_session_id ON question_responses(session_id);
 CREATE INDEX idx_question_responses_question_index ON question_responses(session_id, question_index);
@@ -149,6 +159,241 @@ LEFT JOIN (
     GROUP BY session_id
 ) qr ON i.session_id = qr.session_id;
 
+-- ===============================================================================
+-- RPC: COMPLETE AN INTERVIEW IN ONE ROUND TRIP
+-- ===============================================================================
+-- Called by InterviewDatabase.complete_interview via POST /rest/v1/rpc/complete_interview.
+-- Atomically: creates the interview row if it is missing (when p_session is given),
+-- marks it completed, and inserts any question responses not yet written.
+-- Returns the completed interview row, or NULL if the session does not exist
+-- and p_session was not provided.
+CREATE OR REPLACE FUNCTION complete_interview(
+    p_session_id TEXT,
+    p_completion JSONB,
+    p_session JSONB DEFAULT NULL,
+    p_responses JSONB DEFAULT '[]'
+) RETURNS SETOF interviews
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF p_session IS NOT NULL THEN
+        INSERT INTO interviews (session_id, interview_type, topics, start_time, total_questions, status)
+        VALUES (
+            p_session_id,
+            COALESCE(p_session->>'interview_type', 'technical'),
+            COALESCE(ARRAY(SELECT jsonb_array_elements_text(p_session->'topics')), '{}'),
+            (p_session->>'start_time')::TIMESTAMPTZ,
+            COALESCE((p_session->>'total_questions')::INTEGER, 0),
+            'in_progress'
+        )
+        ON CONFLICT (session_id) DO NOTHING;
+    END IF;
+
+    INSERT INTO question_responses (
+        idempotency_key, session_id, question_index, question_text, user_response, score,
+        feedback, time_taken, hints_used, difficulty, created_at
+    )
+    SELECT
+        r.idempotency_key, p_session_id, r.question_index, COALESCE(r.question_text, ''), r.user_response, r.score,
+        r.feedback, r.time_taken, COALESCE(r.hints_used, 0), COALESCE(r.difficulty, 'medium'),
+        COALESCE(r.created_at, NOW())
+    FROM jsonb_to_recordset(COALESCE(p_responses, '[]')) AS r(
+        idempotency_key TEXT, question_index INTEGER, question_text TEXT, user_response TEXT, score INTEGER,
+        feedback TEXT, time_taken INTEGER, hints_used INTEGER, difficulty TEXT, created_at TIMESTAMPTZ
+    )
+    WHERE EXISTS (SELECT 1 FROM interviews WHERE session_id = p_session_id)
+    ON CONFLICT (idempotency_key) DO NOTHING;
+
+    RETURN QUERY
+    UPDATE interviews SET
+        status = 'completed',
+        end_time = (p_completion->>'end_time')::TIMESTAMPTZ,
+        duration = COALESCE((p_completion->>'duration')::INTEGER, 0),
+        completed_questions = COALESCE((p_completion->>'completed_questions')::INTEGER, 0),
+        average_score = (p_completion->>'average_score')::INTEGER,
+        individual_scores = COALESCE(
+            ARRAY(SELECT jsonb_array_elements_text(p_completion->'individual_scores')::NUMERIC::INTEGER), '{}'),
+        final_results = COALESCE(p_completion->'final_results', '{}'),
+        completion_method = COALESCE(p_completion->>'completion_method', 'automatic'),
+        updated_at = NOW()
+    WHERE session_id = p_session_id
+    RETURNING *;
+END;
+$$;
+
+-- ===============================================================================
+-- ANALYTICS ROLLUPS
+-- ===============================================================================
+-- Read by the /api/interviews/stats and /analytics endpoints instead of scanning
+-- interviews. Triggers apply each row's contribution on INSERT, subtract the old
+-- one and add the new one on UPDATE, and subtract it on DELETE, in the same
+-- transaction as the write (including the complete_interview() RPC).
+-- Scores are integers, so plain sums and sums of squares are exact (no Welford
+-- running mean needed) and can be subtracted again when a row changes.
+-- Status and minutes are derived as in the backend's calculate_status/format_interview_data.
+CREATE TABLE interview_stats (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),  -- single row
+    total BIGINT NOT NULL DEFAULT 0,
+    approved BIGINT NOT NULL DEFAULT 0,
+    rejected BIGINT NOT NULL DEFAULT 0,
+    manually_ended BIGINT NOT NULL DEFAULT 0,
+    timeout BIGINT NOT NULL DEFAULT 0,
+    in_progress BIGINT NOT NULL DEFAULT 0,
+    -- Interviews with a score > 0
+    scored BIGINT NOT NULL DEFAULT 0,
+    score_sum BIGINT NOT NULL DEFAULT 0,
+    score_sum_sq BIGINT NOT NULL DEFAULT 0,
+    -- Interviews lasting at least a minute (rounded half to even)
+    timed BIGINT NOT NULL DEFAULT 0,
+    duration_minutes_sum BIGINT NOT NULL DEFAULT 0,
+    efficiency_sum DOUBLE PRECISION NOT NULL DEFAULT 0,  -- score per minute
+    questions_completed BIGINT NOT NULL DEFAULT 0,
+    questions_expected BIGINT NOT NULL DEFAULT 0,
+    -- Score distribution (missing score counts as 0)
+    score_0_20 BIGINT NOT NULL DEFAULT 0,
+    score_21_40 BIGINT NOT NULL DEFAULT 0,
+    score_41_60 BIGINT NOT NULL DEFAULT 0,
+    score_61_80 BIGINT NOT NULL DEFAULT 0,
+    score_81_100 BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Per topic, over interviews with a score > 0
+CREATE TABLE interview_topic_stats (
+    topic TEXT PRIMARY KEY,
+    attempts BIGINT NOT NULL DEFAULT 0,
+    score_sum BIGINT NOT NULL DEFAULT 0,
+    min_score INTEGER,
+    max_score INTEGER
+);
+
+CREATE OR REPLACE FUNCTION interview_stats_apply(r interviews, p_sign INTEGER) RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_score INTEGER := COALESCE(r.average_score, 0);
+    -- Whole minutes rounded half to even, like Python's round() in the backend
+    -- (ROUND on numeric goes half away from zero: 30 s would count as a minute)
+    v_minutes INTEGER := CASE
+        WHEN COALESCE(r.duration, 0) % 60 = 30 THEN 2 * ROUND(COALESCE(r.duration, 0) / 120.0)
+        ELSE ROUND(COALESCE(r.duration, 0) / 60.0)
+    END;
+    v_status TEXT := CASE
+        WHEN r.completion_method = 'manually_ended' THEN 'manually_ended'
+        WHEN r.completion_method = 'timeout_cleanup' THEN 'timeout'
+        WHEN r.average_score IS NULL THEN 'in_progress'
+        WHEN r.average_score >= 70 THEN 'approved'
+        ELSE 'rejected'
+    END;
+BEGIN
+    INSERT INTO interview_stats (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+    UPDATE interview_stats SET
+        total = total + p_sign,
+        approved = approved + CASE WHEN v_status = 'approved' THEN p_sign ELSE 0 END,
+        rejected = rejected + CASE WHEN v_status = 'rejected' THEN p_sign ELSE 0 END,
+        manually_ended = manually_ended + CASE WHEN v_status = 'manually_ended' THEN p_sign ELSE 0 END,
+        timeout = timeout + CASE WHEN v_status = 'timeout' THEN p_sign ELSE 0 END,
+        in_progress = in_progress + CASE WHEN v_status = 'in_progress' THEN p_sign ELSE 0 END,
+        scored = scored + CASE WHEN v_score > 0 THEN p_sign ELSE 0 END,
+        score_sum = score_sum + CASE WHEN v_score > 0 THEN p_sign * v_score ELSE 0 END,
+        score_sum_sq = score_sum_sq + CASE WHEN v_score > 0 THEN p_sign * v_score * v_score ELSE 0 END,
+        timed = timed + CASE WHEN v_minutes > 0 THEN p_sign ELSE 0 END,
+        duration_minutes_sum = duration_minutes_sum + CASE WHEN v_minutes > 0 THEN p_sign * v_minutes ELSE 0 END,
+        efficiency_sum = efficiency_sum
+            + CASE WHEN v_minutes > 0 THEN p_sign * v_score::DOUBLE PRECISION / v_minutes ELSE 0 END,
+        questions_completed = questions_completed + p_sign * COALESCE(r.completed_questions, 0),
+        questions_expected = questions_expected + p_sign * COALESCE(r.total_questions, 0),
+        score_0_20 = score_0_20 + CASE WHEN v_score <= 20 THEN p_sign ELSE 0 END,
+        score_21_40 = score_21_40 + CASE WHEN v_score > 20 AND v_score <= 40 THEN p_sign ELSE 0 END,
+        score_41_60 = score_41_60 + CASE WHEN v_score > 40 AND v_score <= 60 THEN p_sign ELSE 0 END,
+        score_61_80 = score_61_80 + CASE WHEN v_score > 60 AND v_score <= 80 THEN p_sign ELSE 0 END,
+        score_81_100 = score_81_100 + CASE WHEN v_score > 80 THEN p_sign ELSE 0 END,
+        updated_at = NOW()
+    WHERE id;
+
+    IF v_score <= 0 OR r.topics IS NULL THEN
+        RETURN;
+    END IF;
+
+    IF p_sign > 0 THEN
+        INSERT INTO interview_topic_stats AS s (topic, attempts, score_sum, min_score, max_score)
+        SELECT t.topic, t.n, t.n * v_score, v_score, v_score
+        FROM (SELECT topic, COUNT(*) AS n FROM unnest(r.topics) AS topic GROUP BY topic) t
+        ON CONFLICT (topic) DO UPDATE SET
+            attempts = s.attempts + EXCLUDED.attempts,
+            score_sum = s.score_sum + EXCLUDED.score_sum,
+            min_score = LEAST(s.min_score, EXCLUDED.min_score),
+            max_score = GREATEST(s.max_score, EXCLUDED.max_score);
+    ELSE
+        UPDATE interview_topic_stats s SET
+            attempts = s.attempts - t.n,
+            score_sum = s.score_sum - t.n * v_score
+        FROM (SELECT topic, COUNT(*) AS n FROM unnest(r.topics) AS topic GROUP BY topic) t
+        WHERE s.topic = t.topic;
+        DELETE FROM interview_topic_stats WHERE attempts <= 0;
+        -- Min/max can't be subtracted: recompute them only where the removed score was the extreme
+        UPDATE interview_topic_stats s SET
+            min_score = (SELECT MIN(i.average_score) FROM interviews i
+                         WHERE s.topic = ANY(i.topics) AND i.average_score > 0),
+            max_score = (SELECT MAX(i.average_score) FROM interviews i
+                         WHERE s.topic = ANY(i.topics) AND i.average_score > 0)
+        WHERE s.topic = ANY(r.topics) AND (s.min_score = v_score OR s.max_score = v_score);
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION interviews_stats_trigger() RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM interview_stats_apply(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM interview_stats_apply(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER interviews_stats_insert_delete
+    AFTER INSERT OR DELETE ON interviews
+    FOR EACH ROW EXECUTE FUNCTION interviews_stats_trigger();
+
+-- Progress updates that don't touch these columns skip the rollup entirely
+CREATE TRIGGER interviews_stats_update
+    AFTER UPDATE ON interviews
+    FOR EACH ROW
+    WHEN (OLD.average_score IS DISTINCT FROM NEW.average_score
+       OR OLD.completion_method IS DISTINCT FROM NEW.completion_method
+       OR OLD.duration IS DISTINCT FROM NEW.duration
+       OR OLD.completed_questions IS DISTINCT FROM NEW.completed_questions
+       OR OLD.total_questions IS DISTINCT FROM NEW.total_questions
+       OR OLD.topics IS DISTINCT FROM NEW.topics)
+    EXECUTE FUNCTION interviews_stats_trigger();
+
+-- Backfill / repair: recompute the rollups from scratch (python rebuild_stats.py).
+-- Run it after changing interview_stats_apply on an existing database.
+-- Blocks interview writes while it runs so none is counted twice or missed.
+CREATE OR REPLACE FUNCTION rebuild_interview_stats() RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    r interviews;
+BEGIN
+    LOCK TABLE interviews IN SHARE MODE;
+    DELETE FROM interview_topic_stats;
+    DELETE FROM interview_stats;
+    INSERT INTO interview_stats (id) VALUES (TRUE);
+    FOR r IN SELECT * FROM interviews LOOP
+        PERFORM interview_stats_apply(r, 1);
+    END LOOP;
+    RETURN (SELECT total FROM interview_stats);
+END;
+$$;
+
+INSERT INTO interview_stats (id) VALUES (TRUE);
+
 -- ===============================================================================
 -- SAMPLE DATA FOR TESTING (uncomment to insert test data)
 -- ===============================================================================
@@ -184,7 +429,7 @@ SELECT
     'BASE TABLE' as table_type
 FROM information_schema.tables 
 WHERE table_schema = 'public' 
-  AND table_name IN ('interviews', 'question_responses')
+  AND table_name IN ('interviews', 'question_responses', 'interview_stats', 'interview_topic_stats')
 ORDER BY table_name;
 
 -- Show interviews table structure
@@ -223,6 +468,13 @@ SELECT
 FROM information_schema.views 
 WHERE table_name = 'interview_summary';
 
+-- Show the completion function
+SELECT 
+    routine_name,
+    'FUNCTION' as routine_type
+FROM information_schema.routines 
+WHERE routine_name IN ('complete_interview', 'rebuild_interview_stats');
+
 -- Final success message
 SELECT 
     '🎉 SUCCESS! Database schema created successfully!' as message,
@@ -4,14 +4,11 @@ Comprehensive API endpoints for interview data, analytics, and exports
 """
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
-from database import db
+from database import db, interview_filter, parse_include
+from export import interviews_export
 import json
-import io
-import csv
-from collections import defaultdict
 
 app = FastAPI(title="CodeSage Interview API", version="2.0")
 
@@ -52,15 +49,16 @@ def format_interview_data(interview: Dict[str, Any]) -> Dict[str, Any]:
     average_score = interview.get("average_score")
     status = calculate_status(completion_method, average_score)
     
-    # Extract interviewer from final_results or default
-    final_results = interview.get("final_results", {})
+    # final_results is only loaded with include=final_results; interviewer and
+    # overall_feedback are extracted by the database query for every interview
+    final_results = interview.get("final_results") or {}
     if isinstance(final_results, str):
         try:
             final_results = json.loads(final_results)
         except:
             final_results = {}
     
-    interviewer = final_results.get("interviewer", "AI Interviewer")
+    interviewer = interview.get("interviewer") or final_results.get("interviewer", "AI Interviewer")
     
     # Extract topics
     topics = interview.get("topics", [])
@@ -68,9 +66,9 @@ def format_interview_data(interview: Dict[str, Any]) -> Dict[str, Any]:
         topics = final_results.get("topics", [])
     
     # Format feedback from final_results
-    feedback = final_results.get("overall_feedback", "No feedback available")
+    feedback = interview.get("overall_feedback") or final_results.get("overall_feedback", "No feedback available")
     
-    return {
+    formatted = {
         "id": interview.get("session_id"),
         "type": interview.get("interview_type", "technical"),
         "date": interview.get("created_at"),
@@ -86,9 +84,27 @@ def format_interview_data(interview: Dict[str, Any]) -> Dict[str, Any]:
         "completion_method": completion_method,
         "individual_scores": interview.get("individual_scores", []),
         "start_time": interview.get("start_time"),
-        "end_time": interview.get("end_time"),
-        "final_results": final_results
+        "end_time": interview.get("end_time")
     }
+    if "final_results" in interview:
+        formatted["final_results"] = final_results
+    return formatted
+
+
+def consistency_score(stats: Dict[str, Any]) -> int:
+    """100 minus the standard deviation of scores (> 0), from the rollup sums"""
+    n = stats["scored"]
+    if n <= 1:
+        return 100
+    # Integer sums keep the numerator exact
+    variance = (n * stats["score_sum_sq"] - stats["score_sum"] ** 2) / (n * n)
+    return max(0, round(100 - variance ** 0.5))
+
+
+async def recent_interviews(count: int) -> List[Dict[str, Any]]:
+    """The ``count`` most recent interviews, formatted, oldest first"""
+    result = await db.list_interviews(limit=count)
+    return [format_interview_data(i) for i in reversed(result["interviews"])]
 
 
 @app.get("/")
@@ -97,72 +113,55 @@ async def root():
     return {"status": "ok", "service": "CodeSage Interview API", "version": "2.0"}
 
 
+@app.on_event("shutdown")
+async def close_database():
+    await db.aclose()
+
+
 @app.get("/api/interviews")
 async def get_interviews(
     page: int = Query(1, ge=1),
-    limit: int = Query(50, ge=1, le=100),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
     status_filter: Optional[str] = Query(None),
     interview_type: Optional[str] = Query(None),
     min_score: Optional[int] = Query(None, ge=0, le=100),
     max_score: Optional[int] = Query(None, ge=0, le=100),
     start_date: Optional[str] = Query(None),
-    end_date: Optional[str] = Query(None)
+    end_date: Optional[str] = Query(None),
+    include: Optional[str] = Query(None)
 ):
     """
-    Get all interviews with pagination and filtering
+    Get interviews with filtering and pagination, newest first.
+
+    Filters run in the database. Pass the returned ``next_cursor`` as
+    ``cursor`` to get the next page; ``page`` still works but costs an
+    offset scan. ``include=final_results`` adds each interview's full
+    results payload.
     """
     try:
-        # Fetch all interviews from database
-        all_interviews = await db.get_all_interviews(limit=1000)
-        
-        if not all_interviews:
-            return {
-                "interviews": [],
-                "total": 0,
-                "page": page,
-                "limit": limit,
-                "pages": 0
-            }
-        
-        # Format interviews
-        formatted_interviews = [format_interview_data(interview) for interview in all_interviews]
-        
-        # Apply filters
-        filtered = formatted_interviews
-        
-        if status_filter:
-            filtered = [i for i in filtered if i["status"] == status_filter]
-        
-        if interview_type:
-            filtered = [i for i in filtered if i["type"] == interview_type]
-        
-        if min_score is not None:
-            filtered = [i for i in filtered if i["score"] >= min_score]
-        
-        if max_score is not None:
-            filtered = [i for i in filtered if i["score"] <= max_score]
-        
-        if start_date:
-            start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            filtered = [i for i in filtered if datetime.fromisoformat(i["date"].replace('Z', '+00:00')) >= start_dt]
-        
-        if end_date:
-            end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-            filtered = [i for i in filtered if datetime.fromisoformat(i["date"].replace('Z', '+00:00')) <= end_dt]
-        
-        # Pagination
-        total = len(filtered)
-        pages = (total + limit - 1) // limit
-        start_idx = (page - 1) * limit
-        end_idx = start_idx + limit
-        paginated = filtered[start_idx:end_idx]
-        
+        result = await db.list_interviews(
+            limit=limit,
+            cursor=cursor,
+            offset=0 if cursor else (page - 1) * limit,
+            include_final_results="final_results" in parse_include(include),
+            status=status_filter,
+            interview_type=interview_type,
+            min_score=min_score,
+            max_score=max_score,
+            start_date=start_date,
+            end_date=end_date,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
         return {
-            "interviews": paginated,
-            "total": total,
+            "interviews": [format_interview_data(interview) for interview in result["interviews"]],
             "page": page,
             "limit": limit,
-            "pages": pages
+            "next_cursor": result["next_cursor"],
+            "has_more": result["next_cursor"] is not None
         }
         
     except Exception as e:
@@ -172,12 +171,11 @@ async def get_interviews(
 
 @app.get("/api/interviews/stats/overview")
 async def get_stats_overview():
-    """Get overall statistics and metrics"""
+    """Get overall statistics and metrics (read from the analytics rollups)"""
     try:
-        all_interviews = await db.get_all_interviews(limit=1000)
-        formatted = [format_interview_data(i) for i in all_interviews]
+        stats = await db.get_interview_stats()
         
-        total = len(formatted)
+        total = stats["total"] if stats else 0
         if total == 0:
             return {
                 "total": 0,
@@ -191,27 +189,19 @@ async def get_stats_overview():
                 "completion_rate": 0
             }
         
-        approved = len([i for i in formatted if i["status"] == "approved"])
-        rejected = len([i for i in formatted if i["status"] == "rejected"])
-        manually_ended = len([i for i in formatted if i["status"] == "manually_ended"])
-        timeout = len([i for i in formatted if i["status"] == "timeout"])
+        average_score = round(stats["score_sum"] / stats["scored"]) if stats["scored"] else 0
+        average_duration = round(stats["duration_minutes_sum"] / stats["timed"]) if stats["timed"] else 0
         
-        scores = [i["score"] for i in formatted if i["score"] > 0]
-        average_score = round(sum(scores) / len(scores)) if scores else 0
-        
-        durations = [i["duration"] for i in formatted if i["duration"] > 0]
-        average_duration = round(sum(durations) / len(durations)) if durations else 0
-        
-        total_questions = sum(i["questions_completed"] for i in formatted)
-        expected_questions = sum(i["total_questions"] for i in formatted)
+        total_questions = stats["questions_completed"]
+        expected_questions = stats["questions_expected"]
         completion_rate = round((total_questions / expected_questions * 100)) if expected_questions > 0 else 0
         
         return {
             "total": total,
-            "approved": approved,
-            "rejected": rejected,
-            "manually_ended": manually_ended,
-            "timeout": timeout,
+            "approved": stats["approved"],
+            "rejected": stats["rejected"],
+            "manually_ended": stats["manually_ended"],
+            "timeout": stats["timeout"],
             "average_score": average_score,
             "average_duration": average_duration,
             "total_questions_answered": total_questions,
@@ -226,10 +216,9 @@ async def get_stats_overview():
 async def get_performance_analytics():
     """Get  performance analytics including topic breakdown and trends"""
     try:
-        all_interviews = await db.get_all_interviews(limit=1000)
-        formatted = [format_interview_data(i) for i in all_interviews]
+        stats = await db.get_interview_stats()
         
-        if not formatted:
+        if not stats or stats["total"] == 0:
             return {
                 "topic_performance": [],
                 "score_distribution": {},
@@ -238,68 +227,48 @@ async def get_performance_analytics():
                 "consistency_score": 0
             }
         
-        topic_scores = defaultdict(list)
-        for interview in formatted:
-            for topic in interview.get("topics", []):
-                if interview["score"] > 0:
-                    topic_scores[topic].append(interview["score"])
-        
         topic_performance = [
             {
-                "topic": topic,
-                "average_score": round(sum(scores) / len(scores)),
-                "attempts": len(scores),
-                "max_score": max(scores),
-                "min_score": min(scores)
+                "topic": t["topic"],
+                "average_score": round(t["score_sum"] / t["attempts"]),
+                "attempts": t["attempts"],
+                "max_score": t["max_score"],
+                "min_score": t["min_score"]
             }
-            for topic, scores in topic_scores.items()
+            for t in stats["topics"]
         ]
         topic_performance.sort(key=lambda x: x["average_score"], reverse=True)
         
-        score_ranges = {"0-20": 0, "21-40": 0, "41-60": 0, "61-80": 0, "81-100": 0}
-        for interview in formatted:
-            score = interview["score"]
-            if score <= 20:
-                score_ranges["0-20"] += 1
-            elif score <= 40:
-                score_ranges["21-40"] += 1
-            elif score <= 60:
-                score_ranges["41-60"] += 1
-            elif score <= 80:
-                score_ranges["61-80"] += 1
-            else:
-                score_ranges["81-100"] += 1
+        score_ranges = {
+            "0-20": stats["score_0_20"],
+            "21-40": stats["score_21_40"],
+            "41-60": stats["score_41_60"],
+            "61-80": stats["score_61_80"],
+            "81-100": stats["score_81_100"]
+        }
+        
+        recent = await recent_interviews(10)
         
+        # Per-interview efficiency covers the trend window; the average covers all interviews
         time_efficiency = {}
-        for interview in formatted:
+        for interview in recent:
             if interview["duration"] > 0:
                 efficiency = interview["score"] / interview["duration"]
                 time_efficiency[interview["id"]] = round(efficiency, 2)
         
-        avg_efficiency = round(sum(time_efficiency.values()) / len(time_efficiency), 2) if time_efficiency else 0
+        avg_efficiency = round(stats["efficiency_sum"] / stats["timed"], 2) if stats["timed"] else 0
         
-        sorted_interviews = sorted(formatted, key=lambda x: x["date"])
-        recent_interviews = sorted_interviews[-10:]
         improvement_trend = [
             {"date": i["date"], "score": i["score"], "interview_number": idx + 1}
-            for idx, i in enumerate(recent_interviews)
+            for idx, i in enumerate(recent)
         ]
         
-        scores = [i["score"] for i in formatted if i["score"] > 0]
-        if len(scores) > 1:
-            mean_score = sum(scores) / len(scores)
-            variance = sum((s - mean_score) ** 2 for s in scores) / len(scores)
-            std_dev = variance ** 0.5
-            consistency_score = max(0, round(100 - std_dev))
-        else:
-            consistency_score = 100
-        
         return {
             "topic_performance": topic_performance,
             "score_distribution": score_ranges,
             "time_efficiency": {"average": avg_efficiency, "by_interview": time_efficiency},
             "improvement_trend": improvement_trend,
-            "consistency_score": consistency_score
+            "consistency_score": consistency_score(stats)
         }
     except Exception as e:
         print(f"❌ Error in get_performance_analytics: {e}")
@@ -310,23 +279,17 @@ async def get_performance_analytics():
 async def get_performance_insights():
     """Get AI-generated performance insights and recommendations"""
     try:
-        all_interviews = await db.get_all_interviews(limit=1000)
-        formatted = [format_interview_data(i) for i in all_interviews]
+        stats = await db.get_interview_stats()
         
-        if not formatted:
+        if not stats or stats["total"] == 0:
             return {"strengths": [], "areas_for_improvement": [], "recommendations": []}
         
-        topic_scores = defaultdict(list)
-        for interview in formatted:
-            for topic in interview.get("topics", []):
-                if interview["score"] > 0:
-                    topic_scores[topic].append(interview["score"])
-        
         strengths = []
         weaknesses = []
         
-        for topic, scores in topic_scores.items():
-            avg = sum(scores) / len(scores)
+        for t in stats["topics"]:
+            topic = t["topic"]
+            avg = t["score_sum"] / t["attempts"]
             if avg >= 80:
                 strengths.append({
                     "topic": topic,
@@ -341,8 +304,8 @@ async def get_performance_insights():
                 })
         
         recommendations = []
-        total_expected = sum(i["total_questions"] for i in formatted)
-        total_completed = sum(i["questions_completed"] for i in formatted)
+        total_expected = stats["questions_expected"]
+        total_completed = stats["questions_completed"]
         if total_expected > 0:
             completion_rate = (total_completed / total_expected) * 100
             if completion_rate < 80:
@@ -352,17 +315,15 @@ async def get_performance_insights():
                     "priority": "high"
                 })
         
-        manually_ended = len([i for i in formatted if i["status"] == "manually_ended"])
-        if manually_ended > 2:
+        if stats["manually_ended"] > 2:
             recommendations.append({
                 "category": "Consistency",
                 "suggestion": "Try to complete interviews without ending them manually.",
                 "priority": "medium"
             })
         
-        sorted_interviews = sorted(formatted, key=lambda x: x["date"])
-        if len(sorted_interviews) >= 3:
-            recent_scores = [i["score"] for i in sorted_interviews[-3:] if i["score"] > 0]
+        if stats["total"] >= 3:
+            recent_scores = [i["score"] for i in await recent_interviews(3) if i["score"] > 0]
             if len(recent_scores) >= 2 and recent_scores[-1] < recent_scores[0]:
                 recommendations.append({
                     "category": "Performance",
@@ -382,60 +343,53 @@ async def get_performance_insights():
 
 @app.get("/api/interviews/export")
 async def export_interviews(
-    format: str = Query("csv", regex="^(csv|json)$"),
-    status_filter: Optional[str] = Query(None)
+    format: str = Query("csv", regex="^(csv|json|ndjson|parquet|arrow)$"),
+    compression: Optional[str] = Query(None, regex="^gzip$"),
+    status_filter: Optional[str] = Query(None),
+    interview_type: Optional[str] = Query(None),
+    min_score: Optional[int] = Query(None, ge=0, le=100),
+    max_score: Optional[int] = Query(None, ge=0, le=100),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    include: Optional[str] = Query(None)
 ):
-    """Export interview data in CSV or JSON format"""
+    """Export interview data as CSV, JSON, NDJSON, Parquet or Arrow, streamed page by page (compression=gzip to gzip it)"""
+    filters = {
+        "status": status_filter,
+        "interview_type": interview_type,
+        "min_score": min_score,
+        "max_score": max_score,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
     try:
-        all_interviews = await db.get_all_interviews(limit=1000)
-        formatted = [format_interview_data(i) for i in all_interviews]
-        
-        if status_filter:
-            formatted = [i for i in formatted if i["status"] == status_filter]
-        
-        if format == "csv":
-            output = io.StringIO()
-            if formatted:
-                fieldnames = ["id", "type", "date", "duration", "score", "status",
-                             "questions_completed", "total_questions", "interviewer", "completion_method"]
-                writer = csv.DictWriter(output, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for interview in formatted:
-                    writer.writerow({
-                        "id": interview["id"],
-                        "type": interview["type"],
-                        "date": interview["date"],
-                        "duration": interview["duration"],
-                        "score": interview["score"],
-                        "status": interview["status"],
-                        "questions_completed": interview["questions_completed"],
-                        "total_questions": interview["total_questions"],
-                        "interviewer": interview["interviewer"],
-                        "completion_method": interview["completion_method"]
-                    })
-            
-            output.seek(0)
-            return StreamingResponse(
-                iter([output.getvalue()]),
-                media_type="text/csv",
-                headers={"Content-Disposition": f"attachment; filename=interviews_{datetime.now().strftime('%Y%m%d')}.csv"}
-            )
-        else:
-            return JSONResponse(
-                content={"interviews": formatted, "exported_at": datetime.now().isoformat()},
-                headers={"Content-Disposition": f"attachment; filename=interviews_{datetime.now().strftime('%Y%m%d')}.json"}
-            )
-    except Exception as e:
-        print(f"❌ Error in export_interviews: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        # Reject bad filters now; once streaming starts the status code is already sent
+        interview_filter(**filters)
+        include_final_results = "final_results" in parse_include(include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        return interviews_export(db, format_interview_data, format, compression,
+                                 include_final_results=include_final_results, **filters)
+    except RuntimeError as e:
+        # Parquet/Arrow need the optional pyarrow package
+        raise HTTPException(status_code=501, detail=str(e))
 
 
 @app.get("/api/interviews/{session_id}")
-async def get_interview_detail(session_id: str):
-    """Get detailed interview information including all question responses"""
+async def get_interview_detail(session_id: str, include: Optional[str] = Query(None)):
+    """Get detailed interview information including all question responses
+
+    The full final_results payload is only returned with ``include=final_results``.
+    """
+    try:
+        include_final_results = "final_results" in parse_include(include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
-        interview = await db.get_interview_results(session_id)
+        interview = await db.get_interview_results(session_id, include_final_results=include_final_results)
         if not interview:
             raise HTTPException(status_code=404, detail="Interview not found")
         
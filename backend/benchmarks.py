@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the audio pipeline.
+Uses synthetic audio only, so no microphone or API key is needed.
+
+    python benchmarks.py capture [seconds]
+    python benchmarks.py stt [backends] [clips] [concurrency]
+
+The stt benchmark defaults to the fake backend; name real ones explicitly,
+e.g. ``stt local,groq 32 8`` (groq needs GROQ_API_KEY).
+"""
+import asyncio
+import sys
+import time
+
+import numpy as np
+import webrtcvad
+
+from utils import SAMPLE_RATE, FRAME_SIZE, AudioRingBuffer, capture_with_vad
+
+
+class SyntheticStream:
+    """PyAudio-like stream that replays alternating tone bursts and near-silence."""
+
+    def __init__(self, seconds: float, speech_ms: int = 900, pause_ms: int = 300, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        total = int(seconds * SAMPLE_RATE)
+        t = np.arange(total) / SAMPLE_RATE
+        # Harmonic-rich tone in the voice band so webrtcvad classifies it as speech
+        tone = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((180, 360, 720, 1440)))
+        period = (speech_ms + pause_ms) * SAMPLE_RATE // 1000
+        gate = (np.arange(total) % period) < speech_ms * SAMPLE_RATE // 1000
+        audio = np.where(gate, tone * 6000, 0) + rng.normal(0, 30, total)
+        # Trailing silence long enough to end the capture
+        tail = rng.normal(0, 30, 200 * FRAME_SIZE)
+        self._pcm = np.clip(np.concatenate((audio, tail)), -32768, 32767).astype(np.int16).tobytes()
+        self._pos = 0
+        self.frames_read = 0
+
+    def read(self, n, exception_on_overflow=False):
+        nbytes = n * 2
+        chunk = self._pcm[self._pos:self._pos + nbytes]
+        if len(chunk) < nbytes:
+            chunk = chunk + b"\x00" * (nbytes - len(chunk))
+        self._pos += nbytes
+        self.frames_read += 1
+        return chunk
+
+
+def _legacy_frame_stats(stream, frames: int):
+    """Per-frame work done by the old capture loop, for comparison."""
+    vad = webrtcvad.Vad(1)
+    chunks = []
+    for _ in range(frames):
+        chunk = stream.read(FRAME_SIZE)
+        vad.is_speech(chunk, SAMPLE_RATE)
+        audio_np = np.frombuffer(chunk, dtype=np.int16)
+        np.max(np.abs(audio_np))
+        np.sqrt(np.mean(audio_np.astype(float) ** 2))
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def bench_capture(seconds: float = 60.0, repeats: int = 3):
+    """Report frames/second through capture_with_vad on synthetic audio."""
+    print(f"🧪 Capture benchmark: {seconds:.0f}s synthetic audio x {repeats}")
+    buffer = AudioRingBuffer(max_seconds=seconds + 10)
+    best = 0.0
+    for _ in range(repeats):
+        stream = SyntheticStream(seconds)
+        start = time.perf_counter()
+        audio, heard = capture_with_vad(stream=stream, buffer=buffer, log_interval=3600)
+        elapsed = time.perf_counter() - start
+        best = max(best, stream.frames_read / elapsed)
+    print(f"   capture_with_vad: {best:,.0f} frames/s "
+          f"({best * FRAME_SIZE / SAMPLE_RATE:,.0f}x realtime), heard={heard}, samples={len(audio)}")
+
+    frames = int(seconds * 1000 / 30)
+    stream = SyntheticStream(seconds)
+    start = time.perf_counter()
+    _legacy_frame_stats(stream, frames)
+    legacy = frames / (time.perf_counter() - start)
+    print(f"   legacy per-frame loop: {legacy:,.0f} frames/s")
+
+
+async def _stt_run(backend, clips, concurrency: int):
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i, pcm):
+        async with limit:
+            started = time.perf_counter()
+            await backend.transcribe(pcm, SAMPLE_RATE, f"bench_{i}")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i, pcm) for i, pcm in enumerate(clips)))
+    return time.perf_counter() - started, sorted(latencies)
+
+
+def bench_stt(backends=("fake",), clips: int = 16, concurrency: int = 4, seconds: float = 8.0):
+    """Compare STT backends on throughput and per-request latency."""
+    from stt_backends import FakeBackend, make_stt_backend
+
+    print(f"🧪 STT benchmark: {clips} clips of {seconds:.0f}s, {concurrency} concurrent")
+    audio = [np.frombuffer(SyntheticStream(seconds, seed=i)._pcm, dtype=np.int16) for i in range(clips)]
+    for name in backends:
+        backend = FakeBackend(latency_ms=200) if name == "fake" else make_stt_backend(name)
+        # Warm up (model load, connection setup) outside the timed run
+        asyncio.run(_stt_run(backend, audio[:1], 1))
+        elapsed, latencies = asyncio.run(_stt_run(backend, audio, concurrency))
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"   {backend.cache_id}: {clips / elapsed:.2f} clips/s, "
+              f"{clips * seconds / elapsed:.1f}x realtime, p50 {p50:.0f} ms, p95 {p95:.0f} ms")
+        extra = {k: v for k, v in backend.stats().items() if k in ("avg_batch_size", "max_batch_size", "reuse_rate")}
+        if extra:
+            print(f"      {extra}")
+
+
+if __name__ == "__main__":
+    mode = sys.argv[1] if len(sys.argv) > 1 else "capture"
+    if mode == "capture":
+        bench_capture(float(sys.argv[2]) if len(sys.argv) > 2 else 60.0)
+    elif mode == "stt":
+        bench_stt(
+            sys.argv[2].split(",") if len(sys.argv) > 2 else ("fake",),
+            int(sys.argv[3]) if len(sys.argv) > 3 else 16,
+            int(sys.argv[4]) if len(sys.argv) > 4 else 4,
+        )
+    else:
+        print(f"Unknown benchmark: {mode}")
+        sys.exit(1)
@@ -5,14 +5,16 @@ import traceback
 import os
 import json
 import uuid
-from datetime import datetime
-from typing import Optional, Dict, List, Any
-from supabase import create_client, Client
-from urllib import request as urlrequest
-from urllib.parse import urlencode
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Any, AsyncIterator
+import asyncio
+import base64
 import json as _json
-from dotenv import load_dotenv
 import time
+from collections import OrderedDict
+import httpx
+from supabase import create_client, Client
+from dotenv import load_dotenv
 
 load_dotenv()
 
@@ -28,6 +30,7 @@ if not SUPABASE_URL or not SUPABASE_ANON_KEY:
     supabase: Optional[Client] = None
 else:
     try:
+        # Synchronous client for scripts such as verify_database.py; the server uses `rest` below
         # Create client (timeout is handled at httpx level internally)
         supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
         print("✅ Supabase client initialized successfully")
@@ -38,105 +41,452 @@ else:
         supabase = None
 
 
-def _rest_headers() -> Dict[str, str]:
-    return {
-        "apikey": SUPABASE_ANON_KEY or "",
-        "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
-        "Content-Type": "application/json",
-    }
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "20"))
+DB_POOL_MAX_KEEPALIVE = int(os.getenv("DB_POOL_MAX_KEEPALIVE", "10"))
+# In-flight request caps per lane: interview writes never queue behind dashboard scans
+DB_INTERACTIVE_CONCURRENCY = int(os.getenv("DB_INTERACTIVE_CONCURRENCY", "12"))
+DB_ANALYTICS_CONCURRENCY = int(os.getenv("DB_ANALYTICS_CONCURRENCY", "4"))
+# Extra lookups when a completion finds no session row (debugging only; costs round trips)
+DB_DIAGNOSTICS = os.getenv("DB_DIAGNOSTICS", "0") == "1"
 
 
-def _rest_get(path: str, params: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
-    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-        return None
+class PostgrestClient:
+    """Async PostgREST client over one shared keep-alive connection pool.
 
+    Like ``WhisperClient``, one ``httpx.AsyncClient`` is kept per event loop.
+    Requests run in one of two lanes, each with its own concurrency limit:
+    ``interactive`` for reads and writes on the interview path, and
+    ``analytics`` for large dashboard reads, so a slow stats page can hold
+    at most ``DB_ANALYTICS_CONCURRENCY`` connections. Every call takes an
+    optional timeout. Failures are logged and return None, as the old
+    urllib helpers did.
+    """
 
-def _rest_post(path: str, payload: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
-    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-        return None
-    url = f"{SUPABASE_URL}/rest/v1/{path}"
-    body = _json.dumps(payload).encode("utf-8")
-    headers = _rest_headers()
-    headers.update({"Prefer": "return=representation"})
-    req = urlrequest.Request(url, data=body, headers=headers, method="POST")
-    try:
-        with urlrequest.urlopen(req, timeout=15) as resp:
-            data = resp.read().decode("utf-8")
-            return _json.loads(data) if data else []
-    except Exception as e:
-        print(f"❌ REST POST failed for {path}: {e}")
-        return None
-
-
-def _rest_patch(path: str, match: Dict[str, str], payload: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
-    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-        return None
-    # Build PostgREST filters like session_id=eq.abc
-    filters = {k: f"eq.{v}" for k, v in match.items()}
-    query = urlencode(filters, doseq=True)
-    url = f"{SUPABASE_URL}/rest/v1/{path}?{query}"
-    body = _json.dumps(payload).encode("utf-8")
-    headers = _rest_headers()
-    headers.update({"Prefer": "return=representation"})
-    req = urlrequest.Request(url, data=body, headers=headers, method="PATCH")
-    try:
-        with urlrequest.urlopen(req, timeout=15) as resp:
-            data = resp.read().decode("utf-8")
-            return _json.loads(data) if data else []
-    except Exception as e:
-        print(f"❌ REST PATCH failed for {path}: {e}")
-        return None
-    query = urlencode(params, doseq=True)
-    url = f"{SUPABASE_URL}/rest/v1/{path}?{query}"
-    req = urlrequest.Request(url, headers=_rest_headers())
+    LANES = ("interactive", "analytics")
+
+    def __init__(self, url: Optional[str] = SUPABASE_URL, key: Optional[str] = SUPABASE_ANON_KEY,
+                 timeout: float = DB_TIMEOUT, max_connections: int = DB_POOL_MAX_CONNECTIONS,
+                 max_keepalive: int = DB_POOL_MAX_KEEPALIVE,
+                 interactive_concurrency: int = DB_INTERACTIVE_CONCURRENCY,
+                 analytics_concurrency: int = DB_ANALYTICS_CONCURRENCY):
+        self.base_url = f"{url.rstrip('/')}/rest/v1" if url else None
+        self.key = key
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive)
+        self.concurrency = {"interactive": max(1, interactive_concurrency),
+                            "analytics": max(1, analytics_concurrency)}
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self._semaphores: Dict[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]] = {}
+        self.requests = {lane: 0 for lane in self.LANES}
+        self.errors = 0
+        self.timeouts = 0
+        self.total_ms = 0.0
+        self.queue_ms = 0.0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url and self.key)
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "apikey": self.key or "",
+            "Authorization": f"Bearer {self.key}",
+            "Content-Type": "application/json",
+        }
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(base_url=self.base_url, headers=self.headers(), limits=self.limits,
+                                       timeout=httpx.Timeout(self.timeout, connect=5.0))
+            self._clients[loop] = client
+            self._semaphores[loop] = {lane: asyncio.Semaphore(n) for lane, n in self.concurrency.items()}
+        return client
+
+    async def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                      payload: Any = None, prefer: Optional[str] = None, timeout: Optional[float] = None,
+                      lane: str = "interactive") -> Optional[Any]:
+        """Send one PostgREST request; returns the decoded JSON body, or None on failure."""
+        if not self.configured:
+            return None
+        client = self._client()
+        headers = {"Prefer": prefer} if prefer else None
+        queued = time.perf_counter()
+        async with self._semaphores[asyncio.get_running_loop()][lane]:
+            started = time.perf_counter()
+            self.queue_ms += (started - queued) * 1000
+            self.requests[lane] += 1
+            try:
+                response = await client.request(
+                    method, f"/{path}", params=params, headers=headers,
+                    content=_json.dumps(payload, default=str) if payload is not None else None,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                )
+                if response.status_code >= 400:
+                    self.errors += 1
+                    print(f"❌ REST {method} {path} failed: {response.status_code} {response.text[:200]}")
+                    return None
+                return response.json() if response.content else []
+            except httpx.TimeoutException:
+                self.timeouts += 1
+                print(f"❌ REST {method} {path} timed out")
+                return None
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ REST {method} {path} failed: {e}")
+                return None
+            finally:
+                self.total_ms += (time.perf_counter() - started) * 1000
+
+    async def select(self, table: str, params: Dict[str, Any], **kwargs) -> Optional[List[Dict[str, Any]]]:
+        return await self.request("GET", table, params=params, **kwargs)
+
+    async def insert(self, table: str, rows: Any, prefer: str = "return=representation",
+                     **kwargs) -> Optional[List[Dict[str, Any]]]:
+        return await self.request("POST", table, payload=rows, prefer=prefer, **kwargs)
+
+    async def update(self, table: str, match: Dict[str, Any], payload: Dict[str, Any],
+                     **kwargs) -> Optional[List[Dict[str, Any]]]:
+        # PostgREST filters like session_id=eq.abc
+        params = {k: f"eq.{v}" for k, v in match.items()}
+        return await self.request("PATCH", table, params=params, payload=payload,
+                                  prefer="return=representation", **kwargs)
+
+    async def rpc(self, function: str, args: Dict[str, Any], **kwargs) -> Optional[Any]:
+        """Call a SQL function exposed by PostgREST (see SUPABASE_SCHEMA.sql)."""
+        return await self.request("POST", f"rpc/{function}", payload=args, **kwargs)
+
+    async def aclose(self):
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        self._semaphores.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def stats(self) -> dict:
+        total = sum(self.requests.values())
+        return {
+            "configured": self.configured,
+            "requests": dict(self.requests),
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "avg_request_ms": round(self.total_ms / total, 1) if total else 0.0,
+            "avg_queue_ms": round(self.queue_ms / total, 1) if total else 0.0,
+            "concurrency": dict(self.concurrency),
+            "max_connections": self.limits.max_connections,
+        }
+
+
+rest = PostgrestClient()
+
+
+DB_CACHE_TTL = float(os.getenv("DB_CACHE_TTL", "60"))
+# After the TTL, entries are still served for this long while a refresh runs in the background
+DB_CACHE_STALE_TTL = float(os.getenv("DB_CACHE_STALE_TTL", "300"))
+DB_CACHE_MAX_ENTRIES = int(os.getenv("DB_CACHE_MAX_ENTRIES", "256"))
+
+
+class QueryCache:
+    """TTL cache for read queries, keyed by the normalized query.
+
+    * fresh entries (younger than ``ttl``) are served directly;
+    * stale entries (up to ``ttl + stale_ttl``) are served immediately while
+      one background refresh runs (stale-while-revalidate);
+    * concurrent misses for the same key share a single load (single-flight);
+    * if a load fails, a stale entry is served instead of an error;
+    * entries carry tags ("interviews", ...) and writes invalidate by tag. A
+      load that started before an invalidation is returned but not stored.
+    """
+
+    def __init__(self, ttl: float = DB_CACHE_TTL, stale_ttl: float = DB_CACHE_STALE_TTL,
+                 max_entries: int = DB_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        # key -> (value, stored_at, tags)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._tag_generation: Dict[str, int] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.joins = 0
+        self.refreshes = 0
+        self.errors_served_stale = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(table: str, query: Dict[str, Any]) -> str:
+        """Normalized key: parameter order and value types don't matter."""
+        return _json.dumps([table, sorted((k, str(v)) for k, v in query.items() if v is not None)])
+
+    async def get(self, key: str, loader, tags: tuple = ()) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.time() - entry[1]
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._load(key, loader, tags)
+                return entry[0]
+        self.misses += 1
+        try:
+            return await asyncio.shield(self._load(key, loader, tags))
+        except Exception:
+            if entry is None:
+                raise
+            self.errors_served_stale += 1
+            print(f"⚠️  Returning stale cached data for {key[:80]}")
+            return entry[0]
+
+    def _load(self, key: str, loader, tags: tuple) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.joins += 1
+            return task
+        generations = {tag: self._tag_generation.get(tag, 0) for tag in tags}
+
+        async def load():
+            try:
+                value = await loader()
+                if all(self._tag_generation.get(tag, 0) == g for tag, g in generations.items()):
+                    self._store(key, value, tags)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        self.refreshes += 1
+        task = asyncio.ensure_future(load())
+        # Background refreshes may fail unobserved; retrieve the exception so it isn't logged as lost
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = task
+        return task
+
+    def _store(self, key: str, value: Any, tags: tuple):
+        self._entries[key] = (value, time.time(), tags)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *tags: str):
+        """Drop every entry carrying any of ``tags``."""
+        for tag in tags:
+            self._tag_generation[tag] = self._tag_generation.get(tag, 0) + 1
+        doomed = [k for k, (_, _, entry_tags) in self._entries.items() if set(entry_tags) & set(tags)]
+        for k in doomed:
+            del self._entries[k]
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "single_flight_joins": self.joins,
+            "loads": self.refreshes,
+            "errors_served_stale": self.errors_served_stale,
+            "invalidations": self.invalidations,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+
+query_cache = QueryCache()
+
+
+# Columns for interview listings; id is needed for keyset pagination
+INTERVIEW_LIST_COLUMNS = ("id,session_id,interview_type,topics,status,completion_method,"
+                          "total_questions,completed_questions,average_score,duration,created_at")
+# Every interview column except final_results, the full results payload (questions, code
+# submissions, voice responses, conversation), which is only fetched when asked for
+INTERVIEW_COLUMNS = ("id,session_id,interview_type,status,topics,total_questions,completed_questions,"
+                     "current_question_index,average_score,individual_scores,duration,start_time,end_time,"
+                     "completion_method,created_at,updated_at")
+# The final_results keys shown alongside interviews; extracted by the database, not shipped as the blob
+INTERVIEW_SUMMARY_FIELDS = ("interviewer", "overall_feedback")
+# Optional parts of an interview for include=
+INTERVIEW_INCLUDES = ("final_results",)
+_EARLY_END_METHODS = ("manually_ended", "timeout_cleanup")
+
+
+def parse_include(include: Optional[str]) -> set:
+    """Names from an ``include=a,b`` query parameter; raises ValueError for unknown ones"""
+    names = {name.strip() for name in (include or "").split(",") if name.strip()}
+    unknown = names.difference(INTERVIEW_INCLUDES)
+    if unknown:
+        raise ValueError(f"Unknown include: {', '.join(sorted(unknown))} (expected {', '.join(INTERVIEW_INCLUDES)})")
+    return names
+
+
+def _postgrest_select(columns: str, include_final_results: bool = False) -> str:
+    """PostgREST select list: ``columns`` plus the summary fields, and final_results if asked for"""
+    summary = ",".join(f"{field}:final_results->>{field}" for field in INTERVIEW_SUMMARY_FIELDS)
+    return f"{columns},{summary}" + (",final_results" if include_final_results else "")
+
+
+def _utc_iso(value: str) -> str:
+    """Normalize an ISO date/datetime from a query string to naive UTC ISO (raises ValueError)."""
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.isoformat()
+
+
+def interview_filter(status: Optional[str] = None, interview_type: Optional[str] = None,
+                     min_score: Optional[int] = None, max_score: Optional[int] = None,
+                     start_date: Optional[str] = None, end_date: Optional[str] = None,
+                     cursor: Optional[str] = None) -> List[tuple]:
+    """Listing filters as a condition tree, rendered to PostgREST or SQL by each backend.
+
+    Leaves are ``(column, op, value)``; ``("or", [...])`` and ``("and", [...])``
+    nest. ``status`` follows ``calculate_status``: it is derived from
+    completion_method and average_score, and a missing score counts as 0.
+    """
+    conditions: List[tuple] = []
+    if status:
+        regular = ("or", [("completion_method", "is_null", None),
+                          ("completion_method", "not_in", _EARLY_END_METHODS)])
+        if status == "manually_ended":
+            conditions.append(("completion_method", "eq", "manually_ended"))
+        elif status == "timeout":
+            conditions.append(("completion_method", "eq", "timeout_cleanup"))
+        elif status == "approved":
+            conditions += [regular, ("average_score", "gte", 70)]
+        elif status == "rejected":
+            conditions += [regular, ("average_score", "lt", 70)]
+        elif status == "in_progress":
+            conditions += [regular, ("average_score", "is_null", None)]
+        else:
+            conditions.append(("id", "is_null", None))  # unknown status: nothing matches
+    if interview_type:
+        conditions.append(("interview_type", "eq", interview_type))
+    if min_score:
+        conditions.append(("average_score", "gte", int(min_score)))
+    if max_score is not None:
+        conditions.append(("or", [("average_score", "is_null", None), ("average_score", "lte", int(max_score))]))
+    if start_date:
+        conditions.append(("created_at", "gte", _utc_iso(start_date)))
+    if end_date:
+        conditions.append(("created_at", "lte", _utc_iso(end_date)))
+    if cursor:
+        conditions.append(cursor_condition(cursor))
+    return conditions
+
+
+def cursor_condition(cursor: str) -> tuple:
+    """Rows strictly after ``cursor`` in (created_at DESC, id DESC) order"""
+    created_at, row_id = decode_cursor(cursor)
+    return ("or", [("created_at", "lt", created_at),
+                   ("and", [("created_at", "eq", created_at), ("id", "lt", row_id)])])
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    raw = _json.dumps([row.get("created_at"), str(row.get("id"))]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """(created_at, id) from an opaque cursor; raises ValueError if it is malformed."""
     try:
-        with urlrequest.urlopen(req, timeout=15) as resp:
-            data = resp.read().decode("utf-8")
-            return _json.loads(data)
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = _json.loads(raw)
+        return str(created_at), str(row_id)
     except Exception as e:
-        print(f"❌ REST GET failed for {path}: {e}")
-        return None
+        raise ValueError(f"Invalid cursor: {cursor[:40]}") from e
+
+
+def _postgrest_value(value: Any) -> str:
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _postgrest_condition(node: tuple) -> str:
+    if node[0] in ("and", "or"):
+        return f"{node[0]}({','.join(_postgrest_condition(child) for child in node[1])})"
+    column, op, value = node
+    if op == "is_null":
+        return f"{column}.is.null"
+    if op == "not_in":
+        return f"{column}.not.in.({','.join(_postgrest_value(v) for v in value)})"
+    return f"{column}.{op}.{_postgrest_value(value)}"
 
 
-# Simple cache for interviews to reduce database load
-_interviews_cache = {
-    "data": None,
-    "timestamp": 0,
-    "ttl": 60  # Cache for 60 seconds for faster page loads
-}
+# Running counters in the single interview_stats row, kept current by triggers on interviews
+# (SUPABASE_SCHEMA.sql, local_database.py). "scored" and the score sums cover scores > 0;
+# "timed", the minute sum and efficiency_sum cover durations that round to at least a minute.
+INTERVIEW_STATS_FIELDS = (
+    "total", "approved", "rejected", "manually_ended", "timeout", "in_progress",
+    "scored", "score_sum", "score_sum_sq", "timed", "duration_minutes_sum", "efficiency_sum",
+    "questions_completed", "questions_expected",
+    "score_0_20", "score_21_40", "score_41_60", "score_61_80", "score_81_100",
+)
+
+
+def _interview_stats(totals: Optional[Dict[str, Any]], topics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Rollup rows as one dict: the counters plus ``topics`` (attempts, score_sum, min/max per topic)"""
+    stats: Dict[str, Any] = {field: (totals or {}).get(field) or 0 for field in INTERVIEW_STATS_FIELDS}
+    stats["topics"] = [
+        {
+            "topic": t["topic"],
+            "attempts": t.get("attempts") or 0,
+            "score_sum": t.get("score_sum") or 0,
+            "min_score": t.get("min_score"),
+            "max_score": t.get("max_score"),
+        }
+        for t in topics if t.get("attempts")
+    ]
+    return stats
+
+
+def _format_interview(interview_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Interview row in the shape the frontend expects (.get avoids KeyError when schema differs)"""
+    formatted = {
+        "session_id": interview_data.get("session_id"),
+        "id": interview_data.get("id"),
+        "interview_type": interview_data.get("interview_type"),
+        "topics": interview_data.get("topics") or [],
+        "total_questions": interview_data.get("total_questions") or 0,
+        "completed_questions": interview_data.get("completed_questions") or 0,
+        "average_score": interview_data.get("average_score") or 0,
+        "individual_scores": interview_data.get("individual_scores") or [],
+        # Provide both duration and total_time keys for frontend compatibility
+        "duration": interview_data.get("duration") or 0,
+        "total_time": interview_data.get("duration") or 0,
+        "start_time": interview_data.get("start_time"),
+        "end_time": interview_data.get("end_time"),
+        "status": interview_data.get("status") or interview_data.get("completion_method") or "unknown",
+        "completion_method": interview_data.get("completion_method"),
+        "created_at": interview_data.get("created_at"),
+        "interviewer": interview_data.get("interviewer"),
+        "overall_feedback": interview_data.get("overall_feedback"),
+    }
+    # Only present when requested (include=final_results)
+    if "final_results" in interview_data:
+        formatted["final_results"] = interview_data.get("final_results") or {}
+    return formatted
 
 
 class InterviewDatabase:
     """Handle all interview-related database operations"""
     
-    def __init__(self):
-        self.supabase = supabase
+    def __init__(self, client: PostgrestClient = rest, cache: QueryCache = query_cache):
+        self.rest = client
+        self.cache = cache
+
+    @property
+    def configured(self) -> bool:
+        return self.rest.configured
         
     async def create_interview_session(self, session_data: Dict[str, Any]) -> Optional[str]:
         """Create a new interview session record"""
-        if not self.supabase:
-            # REST fallback for insert
-            print("⚠️ Supabase client not available, using REST insert")
-            try:
-                start_time = session_data.get("start_time")
-                if isinstance(start_time, (int, float)):
-                    start_time = datetime.fromtimestamp(start_time).isoformat()
-                insert_data = {
-                    "session_id": session_data.get("session_id"),
-                    "interview_type": session_data.get("interview_type", "technical"),
-                    "topics": session_data.get("topics", []),
-                    "start_time": start_time,
-                    "status": "in_progress",
-                    "total_questions": session_data.get("total_questions", 0),
-                    "current_question_index": (session_data.get("current_question_index", 0) + 1),
-                    "created_at": datetime.utcnow().isoformat()
-                }
-                rows = _rest_post("interviews", insert_data)
-                if rows:
-                    print(f"✅ REST insert created interview with ID: {rows[0].get('id')}")
-                    return rows[0].get('id')
-            except Exception as e:
-                print(f"❌ REST create_interview_session failed: {e}")
+        if not self.rest.configured:
             return None
             
         try:
@@ -155,14 +505,22 @@ class InterviewDatabase:
                 "total_questions": session_data.get("total_questions", 0),
                 # Store current question index as 1-based for the DB while internal logic remains 0-based
                 "current_question_index": (session_data.get("current_question_index", 0) + 1),
-                "created_at": datetime.utcnow().isoformat()
+                "created_at": session_data.get("created_at") or datetime.utcnow().isoformat()
             }
             
-            result = self.supabase.table("interviews").insert(insert_data).execute()
+            # Insert-only on session_id so a replayed create (see outbox.py) is harmless: it must not
+            # reset a completed row to in_progress or rewind its progress
+            rows = await self.rest.insert("interviews", insert_data, params={"on_conflict": "session_id"},
+                                          prefer="return=representation,resolution=ignore-duplicates")
+            if rows == []:
+                # Already created: nothing is returned for an ignored row
+                rows = await self.rest.select("interviews", {"session_id": f"eq.{insert_data['session_id']}",
+                                                             "select": "id"})
             
-            if result.data:
-                print(f"✅ Interview session created with ID: {result.data[0]['id']}")
-                return result.data[0]['id']
+            if rows:
+                print(f"✅ Interview session created with ID: {rows[0]['id']}")
+                self.cache.invalidate("interviews")
+                return rows[0]['id']
             else:
                 print("❌ Failed to create interview session")
                 return None
@@ -173,7 +531,7 @@ class InterviewDatabase:
     
     async def update_interview_progress(self, session_id: str, progress_data: Dict[str, Any]) -> bool:
         """Update interview progress"""
-        if not self.supabase:
+        if not self.rest.configured:
             return False
             
         try:
@@ -193,9 +551,9 @@ class InterviewDatabase:
             if update_data:
                 update_data["updated_at"] = datetime.utcnow().isoformat()
                 
-                result = self.supabase.table("interviews").update(update_data).eq("session_id", session_id).execute()
+                rows = await self.rest.update("interviews", {"session_id": session_id}, update_data)
                 
-                if result.data:
+                if rows:
                     print(f"✅ Interview progress updated for session: {session_id}")
                     return True
                     
@@ -204,53 +562,56 @@ class InterviewDatabase:
             
         return False
     
-    async def complete_interview(self, session_id: str, results_data: Dict[str, Any]) -> bool:
-        """Mark interview as completed and store results"""
-        if not self.supabase:
-            print("⚠️ Supabase client unavailable, using REST update for completion")
-            try:
-                rows = _rest_patch("interviews", {"session_id": session_id}, results_data)
-                if rows is not None and len(rows) > 0:
-                    print(f"✅ REST completion update applied for session: {session_id}")
-                    return True
-                print(f"❌ REST completion update returned no rows for session: {session_id}")
-            except Exception as e:
-                print(f"❌ REST complete_interview failed: {e}")
-            return False
+    @staticmethod
+    def completion_row(results_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalized column values for a completed interview"""
+        end_time = results_data.get("end_time")
+        if isinstance(end_time, (int, float)):
+            end_time = datetime.fromtimestamp(end_time).isoformat()
+        
+        total_time = results_data.get("total_time", 0)
+        if isinstance(total_time, float):
+            total_time = int(total_time)  # Convert to integer seconds
+        
+        # Convert average_score to integer if it's a float
+        average_score = results_data.get("average_score")
+        if isinstance(average_score, float):
+            average_score = int(average_score)
+        
+        # Convert individual scores to integers if they're floats
+        individual_scores = results_data.get("individual_scores", [])
+        if individual_scores:
+            individual_scores = [int(score) if isinstance(score, float) else score for score in individual_scores]
+        
+        return {
+            "status": "completed",
+            "end_time": end_time,
+            "duration": total_time,
+            "completed_questions": results_data.get("completed_questions", 0),
+            "average_score": average_score,
+            "individual_scores": individual_scores,
+            # Store the complete results payload for audit
+            "final_results": results_data,
+            # Normalize completion_method key: prefer completion_status or completion_method
+            "completion_method": results_data.get("completion_status") or results_data.get("completion_method") or "automatic",
+            "updated_at": datetime.utcnow().isoformat()
+        }
+
+    async def complete_interview(self, session_id: str, results_data: Dict[str, Any],
+                                 session_data: Optional[Dict[str, Any]] = None,
+                                 responses: Optional[List[Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+        """Mark interview as completed and store results in one round trip.
+
+        The ``complete_interview`` SQL function creates the interview row first
+        when ``session_data`` is given and it doesn't exist yet, and inserts
+        ``responses`` (question_responses rows) in the same transaction.
+        Returns the completed row, or None on failure.
+        """
+        if not self.rest.configured:
+            return None
             
         try:
-            # Prepare the completion data
-            end_time = results_data.get("end_time")
-            if isinstance(end_time, (int, float)):
-                end_time = datetime.fromtimestamp(end_time).isoformat()
-            
-            total_time = results_data.get("total_time", 0)
-            if isinstance(total_time, float):
-                total_time = int(total_time)  # Convert to integer seconds
-            
-            # Convert average_score to integer if it's a float
-            average_score = results_data.get("average_score")
-            if isinstance(average_score, float):
-                average_score = int(average_score)
-            
-            # Convert individual scores to integers if they're floats
-            individual_scores = results_data.get("individual_scores", [])
-            if individual_scores:
-                individual_scores = [int(score) if isinstance(score, float) else score for score in individual_scores]
-            
-            update_data = {
-                "status": "completed",
-                "end_time": end_time,
-                "duration": total_time,
-                "completed_questions": results_data.get("completed_questions", 0),
-                "average_score": average_score,
-                "individual_scores": individual_scores,
-                # Store the complete results payload for audit
-                "final_results": results_data,
-                # Normalize completion_method key: prefer completion_status or completion_method
-                "completion_method": results_data.get("completion_status") or results_data.get("completion_method") or "automatic",
-                "updated_at": datetime.utcnow().isoformat()
-            }
+            update_data = self.completion_row(results_data)
             
             print(f"🔄 Attempting to complete interview for session: {session_id}")
             print(f"📊 Update data:")
@@ -260,93 +621,94 @@ class InterviewDatabase:
             print(f"   Completed Questions: {update_data['completed_questions']}")
             print(f"   Average Score: {update_data['average_score']}")
             
-            # First check if the session exists
-            try:
-                existing_session = self.supabase.table("interviews").select("session_id, status, created_at").eq("session_id", session_id).execute()
-                if existing_session.data and len(existing_session.data) > 0:
-                    print(f"✅ Session found: {existing_session.data[0]}")
-                else:
-                    print(f"❌ Session {session_id} not found in database!")
-                    print("🔍 Checking recent sessions...")
-                    recent = self.supabase.table("interviews").select("session_id, created_at").order("created_at", desc=True).limit(5).execute()
-                    for r in recent.data:
-                        print(f"   📝 {r.get('session_id')} - {r.get('created_at')}")
-                    return False
-            except Exception as e:
-                print(f"❌ Error checking session existence: {e}")
+            session_row = None
+            if session_data is not None:
+                start_time = session_data.get("start_time")
+                if isinstance(start_time, (int, float)):
+                    start_time = datetime.fromtimestamp(start_time).isoformat()
+                session_row = {
+                    "interview_type": session_data.get("interview_type", "technical"),
+                    "topics": session_data.get("topics", []),
+                    "start_time": start_time,
+                    "total_questions": session_data.get("total_questions", 0),
+                }
             
-            result = self.supabase.table("interviews").update(update_data).eq("session_id", session_id).execute()
+            rows = await self.rest.rpc("complete_interview", {
+                "p_session_id": session_id,
+                "p_completion": update_data,
+                "p_session": session_row,
+                "p_responses": responses or [],
+            })
+            if rows is None:
+                # Function not installed (or failed): fall back to plain table writes
+                print("⚠️ complete_interview RPC unavailable, falling back to table writes")
+                rows = await self._complete_with_table_writes(session_id, update_data, session_data, responses)
             
-            if result.data and len(result.data) > 0:
+            if rows:
                 print(f"✅ Interview completed successfully for session: {session_id}")
-                print(f"📈 Final data: {result.data[0].get('status')} - {result.data[0].get('duration')}s - {result.data[0].get('average_score')}/100")
-                return True
+                self.cache.invalidate("interviews")
+                print(f"📈 Final data: {rows[0].get('status')} - {rows[0].get('duration')}s - {rows[0].get('average_score')}/100")
+                return rows[0]
             else:
                 print(f"❌ Failed to complete interview for session: {session_id}")
-                print(f"🔍 Result data: {result.data}")
-                return False
+                if DB_DIAGNOSTICS:
+                    await self.diagnose_missing_session(session_id)
+                return None
                 
         except Exception as e:
             print(f"❌ Error completing interview: {e}")
-            return False
-    
-    async def get_interview_results(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get interview results by session ID"""
-        if not self.supabase:
-            # REST fallback
-            rows = _rest_get("interviews", {
-                "select": "*",
+            return None
+
+    async def _complete_with_table_writes(self, session_id: str, update_data: Dict[str, Any],
+                                          session_data: Optional[Dict[str, Any]],
+                                          responses: Optional[List[Dict[str, Any]]]) -> Optional[List[Dict[str, Any]]]:
+        rows = await self.rest.update("interviews", {"session_id": session_id}, update_data)
+        if not rows and session_data is not None:
+            if await self.create_interview_session({**session_data, "session_id": session_id}):
+                rows = await self.rest.update("interviews", {"session_id": session_id}, update_data)
+        if rows and responses and not await self.store_question_responses(responses):
+            # Report failure so the caller keeps the responses queued; replaying the
+            # completion is harmless (same update, duplicate responses are skipped)
+            print(f"❌ Interview {session_id} completed but its responses were not stored")
+            return None
+        return rows
+
+    async def diagnose_missing_session(self, session_id: str):
+        """Log whether the session exists and the most recent sessions (DB_DIAGNOSTICS=1)"""
+        try:
+            existing_session = await self.rest.select("interviews", {
+                "select": "session_id,status,created_at",
                 "session_id": f"eq.{session_id}",
-                "limit": 1
             })
-            if rows:
-                interview_data = rows[0]
-                return {
-                    "session_id": interview_data.get("session_id"),
-                    "id": interview_data.get("id"),
-                    "interview_type": interview_data.get("interview_type"),
-                    "topics": interview_data.get("topics") or [],
-                    "total_questions": interview_data.get("total_questions") or 0,
-                    "completed_questions": interview_data.get("completed_questions") or 0,
-                    "average_score": interview_data.get("average_score") or 0,
-                    "individual_scores": interview_data.get("individual_scores") or [],
-                    "duration": interview_data.get("duration") or 0,
-                    "total_time": interview_data.get("duration") or 0,
-                    "start_time": interview_data.get("start_time"),
-                    "end_time": interview_data.get("end_time"),
-                    "status": interview_data.get("status") or interview_data.get("completion_method") or "unknown",
-                    "completion_method": interview_data.get("completion_method"),
-                    "created_at": interview_data.get("created_at"),
-                    "final_results": interview_data.get("final_results") or {}
-                }
+            if existing_session:
+                print(f"✅ Session found: {existing_session[0]}")
+                return
+            print(f"❌ Session {session_id} not found in database!")
+            print("🔍 Checking recent sessions...")
+            recent = await self.rest.select("interviews", {
+                "select": "session_id,created_at",
+                "order": "created_at.desc",
+                "limit": 5,
+            }) or []
+            for r in recent:
+                print(f"   📝 {r.get('session_id')} - {r.get('created_at')}")
+        except Exception as e:
+            print(f"❌ Error checking session existence: {e}")
+    
+    async def get_interview_results(self, session_id: str, include_final_results: bool = False) -> Optional[Dict[str, Any]]:
+        """Get interview results by session ID (the final_results payload only if asked for)"""
+        if not self.rest.configured:
             return None
             
         try:
-            result = self.supabase.table("interviews").select("*").eq("session_id", session_id).execute()
+            rows = await self.rest.select("interviews", {
+                "select": _postgrest_select(INTERVIEW_COLUMNS, include_final_results),
+                "session_id": f"eq.{session_id}",
+                "limit": 1,
+            })
             
-            if result.data and len(result.data) > 0:
-                interview_data = result.data[0]
-
-                # Return formatted results using .get to avoid KeyError when schema differs
-                return {
-                    "session_id": interview_data.get("session_id"),
-                    "id": interview_data.get("id"),
-                    "interview_type": interview_data.get("interview_type"),
-                    "topics": interview_data.get("topics") or [],
-                    "total_questions": interview_data.get("total_questions") or 0,
-                    "completed_questions": interview_data.get("completed_questions") or 0,
-                    "average_score": interview_data.get("average_score") or 0,
-                    "individual_scores": interview_data.get("individual_scores") or [],
-                    # Provide both duration and total_time keys for frontend compatibility
-                    "duration": interview_data.get("duration") or 0,
-                    "total_time": interview_data.get("duration") or 0,
-                    "start_time": interview_data.get("start_time"),
-                    "end_time": interview_data.get("end_time"),
-                    "status": interview_data.get("status") or interview_data.get("completion_method") or "unknown",
-                    "completion_method": interview_data.get("completion_method"),
-                    "created_at": interview_data.get("created_at"),
-                    "final_results": interview_data.get("final_results") or {}
-                }
+            if rows:
+                return _format_interview(rows[0])
             else:
                 print(f"❌ No interview found for session: {session_id}")
                 return None
@@ -357,111 +719,229 @@ class InterviewDatabase:
     
     async def get_all_interviews(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get all interview records with optional limit"""
-        global _interviews_cache
+        if not self.rest.configured:
+            print("❌ Supabase not configured")
+            return []
         
-        if not self.supabase:
-            # REST fallback
-            if not SUPABASE_URL:
-                print("❌ Supabase not configured")
-                return []
-            params = {
-                "select": "session_id,interview_type,topics,status,completion_method,total_questions,completed_questions,average_score,duration,created_at",
-                "order": "created_at.desc",
-                "limit": limit,
-            }
-            rows = _rest_get("interviews", params) or []
+        params = {
+            "select": _postgrest_select(INTERVIEW_LIST_COLUMNS),
+            "order": "created_at.desc",
+            "limit": limit,
+        }
+
+        async def load():
+            print(f"🔍 Fetching {limit} interviews from database...")
+            # Dashboard scans run in the analytics lane so they can't starve live interviews
+            rows = await self.rest.select("interviews", params, lane="analytics", timeout=30)
+            if rows is None:
+                raise RuntimeError("interviews query failed")
+            print(f"✅ Retrieved {len(rows)} interviews from database")
             return rows
-        
-        # Check cache first
-        current_time = time.time()
-        if _interviews_cache["data"] is not None and (current_time - _interviews_cache["timestamp"]) < _interviews_cache["ttl"]:
-            print(f"✅ Returning {len(_interviews_cache['data'])} interviews from cache")
-            return _interviews_cache["data"][:limit]
-            
+
         try:
-            # No artificial limit - fetch all records requested
-            print(f"🔍 Fetching {limit} interviews from database...")
-            
-            # Use simpler query
-            result = self.supabase.table("interviews").select(
-                "session_id, interview_type, topics, status, completion_method, "
-                "total_questions, completed_questions, average_score, "
-                "duration, created_at"
-            ).order("created_at", desc=True).limit(limit).execute()
-            
-            if result.data:
-                print(f"✅ Retrieved {len(result.data)} interviews from database")
-                # Update cache
-                _interviews_cache["data"] = result.data
-                _interviews_cache["timestamp"] = current_time
-                return result.data
-            else:
-                print("⚠️  No interviews found in database")
-                return []
-                
+            return await self.cache.get(QueryCache.key("interviews", params), load, tags=("interviews",))
         except Exception as e:
-            error_msg = str(e)
-            print(f"❌ Error getting all interviews: {error_msg}")
-            
-            # Return cached data if available, even if stale
-            if _interviews_cache["data"] is not None:
-                print(f"⚠️  Returning stale cached data ({len(_interviews_cache['data'])} interviews)")
-                return _interviews_cache["data"][:limit]
-            
-            # Return empty list as last resort
+            print(f"❌ Error getting all interviews: {e}")
             return []
     
+    async def list_interviews(self, limit: int = 50, cursor: Optional[str] = None, offset: int = 0,
+                              include_final_results: bool = False, **filters) -> Dict[str, Any]:
+        """One page of interviews, newest first, filtered in the database.
+
+        Keyset pagination on (created_at, id): pass the returned
+        ``next_cursor`` to get the following page. ``offset`` is only for
+        callers still paging by number. Filters are ``interview_filter``'s
+        keyword arguments. Raises ValueError for a malformed cursor or date.
+        """
+        conditions = interview_filter(cursor=cursor, **filters)
+        if not self.rest.configured:
+            print("❌ Supabase not configured")
+            return {"interviews": [], "next_cursor": None}
+        # One extra row tells us whether another page exists
+        params = self._keyset_params(_postgrest_select(INTERVIEW_LIST_COLUMNS, include_final_results),
+                                     conditions, limit + 1)
+        if offset:
+            params["offset"] = offset
+
+        async def load():
+            rows = await self.rest.select("interviews", params, lane="analytics", timeout=30)
+            if rows is None:
+                raise RuntimeError("interviews query failed")
+            return rows
+
+        try:
+            rows = await self.cache.get(QueryCache.key("interviews", params), load, tags=("interviews",))
+        except Exception as e:
+            print(f"❌ Error listing interviews: {e}")
+            return {"interviews": [], "next_cursor": None}
+        page = rows[:limit]
+        return {"interviews": page, "next_cursor": encode_cursor(page[-1]) if len(rows) > limit else None}
+
+    @staticmethod
+    def _keyset_params(select: str, conditions: List[tuple], limit: int) -> Dict[str, Any]:
+        params: Dict[str, Any] = {"select": select, "order": "created_at.desc,id.desc", "limit": limit}
+        if conditions:
+            params["and"] = f"({','.join(_postgrest_condition(c) for c in conditions)})"
+        return params
+
+    async def _iter_newest_first(self, table: str, select: str, conditions: List[tuple],
+                                 page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Pages of ``table`` in (created_at DESC, id DESC) order, uncached; raises if a page can't be read"""
+        if not self.rest.configured:
+            return
+        cursor = None
+        while True:
+            where = conditions + [cursor_condition(cursor)] if cursor else conditions
+            rows = await self.rest.select(table, self._keyset_params(select, where, page_size),
+                                          lane="analytics", timeout=30)
+            if rows is None:
+                raise RuntimeError(f"{table} export query failed")
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            cursor = encode_cursor(rows[-1])
+
+    async def iter_interviews(self, page_size: int = 500, include_final_results: bool = False,
+                              columns: str = INTERVIEW_LIST_COLUMNS, **filters) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Every matching interview, newest first, one page at a time.
+
+        For exports: keyset pagination without the query cache, so memory
+        stays at one page however many rows match. Raises ValueError for
+        bad filters, and RuntimeError if a page can't be read, so a failed
+        export can't pass for a complete one.
+        """
+        select = _postgrest_select(columns, include_final_results)
+        async for page in self._iter_newest_first("interviews", select, interview_filter(**filters), page_size):
+            yield page
+
+    async def iter_question_responses(self, page_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Every question_responses row, newest first, one page at a time (see ``iter_interviews``)"""
+        async for page in self._iter_newest_first("question_responses", "*", [], page_size):
+            yield page
+
+    async def get_interview_stats(self) -> Optional[Dict[str, Any]]:
+        """Analytics rollups over every interview (see ``INTERVIEW_STATS_FIELDS``).
+
+        The database keeps them current on every insert, update and delete of
+        ``interviews``, so this is two small reads however long the history.
+        Returns None if the rollup tables can't be read.
+        """
+        if not self.rest.configured:
+            return None
+
+        async def load():
+            totals, topics = await asyncio.gather(
+                self.rest.select("interview_stats", {"select": "*"}, lane="analytics"),
+                self.rest.select("interview_topic_stats", {"select": "*"}, lane="analytics"),
+            )
+            if totals is None or topics is None:
+                raise RuntimeError("interview_stats query failed")
+            return _interview_stats(totals[0] if totals else None, topics)
+
+        try:
+            return await self.cache.get(QueryCache.key("interview_stats", {}), load, tags=("interviews",))
+        except Exception as e:
+            print(f"❌ Error getting interview stats: {e}")
+            return None
+
+    async def rebuild_interview_stats(self) -> Optional[int]:
+        """Recompute the rollups from the interviews table; returns the number of interviews counted.
+
+        Needed once when the rollup tables are added to an existing database
+        (see rebuild_stats.py), or if rows were changed with triggers disabled.
+        """
+        if not self.rest.configured:
+            return None
+        total = await self.rest.rpc("rebuild_interview_stats", {}, lane="analytics", timeout=300)
+        if total is None:
+            print("❌ Failed to rebuild interview stats")
+            return None
+        self.cache.invalidate("interviews")
+        return int(total)
+
+    @staticmethod
+    def question_response_row(session_id: str, question_index: int, question_data: Dict[str, Any],
+                              idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """question_responses row; question_index expected to be 1-based from caller"""
+        return {
+            "idempotency_key": idempotency_key or uuid.uuid4().hex,
+            "session_id": session_id,
+            "question_index": int(question_index),
+            # NOT NULL column; the complete_interview RPC COALESCEs it the same way
+            "question_text": question_data.get("question") or "",
+            "user_response": question_data.get("user_response"),
+            "score": question_data.get("score"),
+            "feedback": question_data.get("feedback"),
+            "time_taken": question_data.get("time_taken"),
+            "hints_used": question_data.get("hints_used", 0),
+            "difficulty": question_data.get("difficulty"),
+            "created_at": datetime.utcnow().isoformat()
+        }
+
     async def store_question_response(self, session_id: str, question_index: int, question_data: Dict[str, Any]) -> bool:
         """Store individual question and response data"""
-        if not self.supabase:
+        return await self.store_question_responses([self.question_response_row(session_id, question_index, question_data)])
+
+    async def store_question_responses(self, rows: List[Dict[str, Any]]) -> bool:
+        """Insert several question_responses rows in one request"""
+        if not self.rest.configured or not rows:
             return False
             
         try:
-            # question_index expected to be 1-based from caller
-            insert_data = {
-                "session_id": session_id,
-                "question_index": int(question_index),
-                "question_text": question_data.get("question"),
-                "user_response": question_data.get("user_response"),
-                "score": question_data.get("score"),
-                "feedback": question_data.get("feedback"),
-                "time_taken": question_data.get("time_taken"),
-                "hints_used": question_data.get("hints_used", 0),
-                "difficulty": question_data.get("difficulty"),
-                "created_at": datetime.utcnow().isoformat()
-            }
-            
-            result = self.supabase.table("question_responses").insert(insert_data).execute()
+            # Rows already written by an earlier (unacknowledged) attempt are skipped
+            result = await self.rest.insert("question_responses", rows, params={"on_conflict": "idempotency_key"},
+                                            prefer="return=minimal,resolution=ignore-duplicates")
             
-            if result.data:
-                print(f"✅ Question response stored for session: {session_id}, question: {question_index}")
+            if result is not None:
+                print(f"✅ Stored {len(rows)} question response(s) for session(s): "
+                      f"{', '.join(sorted({r['session_id'] for r in rows}))}")
                 return True
             else:
-                print(f"❌ Failed to store question response")
+                print(f"❌ Failed to store question responses")
                 return False
                 
         except Exception as e:
-            print(f"❌ Error storing question response: {e}")
+            print(f"❌ Error storing question responses: {e}")
             return False
     
     async def get_question_responses(self, session_id: str) -> List[Dict[str, Any]]:
         """Get all question responses for a session"""
-        if not self.supabase:
+        if not self.rest.configured:
             return []
             
         try:
             # return ordered by question_index (which is 1-based)
-            result = self.supabase.table("question_responses").select("*").eq("session_id", session_id).order("question_index").execute()
-            
-            if result.data:
-                return result.data
-            else:
-                return []
+            rows = await self.rest.select("question_responses", {
+                "select": "*",
+                "session_id": f"eq.{session_id}",
+                "order": "question_index",
+            })
+            return rows or []
                 
         except Exception as e:
             print(f"❌ Error getting question responses: {e}")
             return []
 
+    async def aclose(self):
+        await self.rest.aclose()
+
+    def stats(self) -> dict:
+        return {"backend": "supabase", **self.rest.stats(), "query_cache": self.cache.stats()}
+
+
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "supabase").lower()
+
+
+def make_database(name: str = DATABASE_BACKEND) -> InterviewDatabase:
+    """Build the configured backend: "supabase" (default) or "sqlite" (local_database.py)"""
+    if name == "sqlite":
+        from local_database import SQLiteInterviewDatabase
+        return SQLiteInterviewDatabase()
+    if name != "supabase":
+        print(f"⚠️ Unknown DATABASE_BACKEND '{name}', using supabase")
+    return InterviewDatabase()
+
 
 # Global database instance
-db = InterviewDatabase()
\ No newline at end of file
+db = make_database()
@@ -0,0 +1,335 @@
+"""
+Streaming interview exports (/api/interviews/export).
+
+The old export read at most 1000 interviews, built the whole file in
+memory and only then started the response. Here the pipeline is a chain of
+async generators:
+
+    db.iter_interviews   pages of rows, keyset-paginated, no row cap
+    format_row           the server's format_interview_data
+    csv / ndjson / json  one text chunk per page
+    gzip (optional)      compressed on the fly, flushed per page
+
+so memory stays at one page however large the export, and the first bytes
+(the CSV header, or the opening of the JSON document) go out before the
+first query returns.
+
+``parquet`` and ``arrow`` (IPC stream) are columnar formats for analytics
+tools. They skip format_row and carry the raw columns with real types:
+int32 scores and counts, list columns for topics and individual_scores,
+and UTC timestamps. Each page becomes one record batch, or one Parquet row
+group. These formats need pyarrow, which is optional.
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from fastapi.responses import StreamingResponse
+
+from database import INTERVIEW_COLUMNS, INTERVIEW_LIST_COLUMNS, InterviewDatabase
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+
+CSV_FIELDS = ["id", "type", "date", "duration", "score", "status",
+              "questions_completed", "total_questions", "interviewer", "completion_method"]
+
+Pages = AsyncIterator[List[Dict[str, Any]]]
+
+
+async def _counted(pages: Pages) -> Pages:
+    exported = 0
+    try:
+        async for page in pages:
+            exported += len(page)
+            yield page
+    except Exception as e:
+        # Headers are already sent: aborting the stream is the only way to tell the client
+        print(f"❌ Export failed after {exported} rows: {e}")
+        raise
+    print(f"📤 Exported {exported} interviews")
+
+
+async def _formatted(pages: Pages, format_row: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Pages:
+    async for page in _counted(pages):
+        yield [format_row(row) for row in page]
+
+
+def _drain(buffer: io.StringIO) -> str:
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return text
+
+
+async def csv_chunks(pages: Pages) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    yield _drain(buffer)
+    async for page in pages:
+        writer.writerows(page)
+        yield _drain(buffer)
+
+
+async def ndjson_chunks(pages: Pages) -> AsyncIterator[str]:
+    async for page in pages:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in page)
+
+
+async def json_chunks(pages: Pages) -> AsyncIterator[str]:
+    """The same document as the old JSON export, written incrementally"""
+    yield f'{{"exported_at": {json.dumps(datetime.now().isoformat())}, "interviews": ['
+    separator = ""
+    async for page in pages:
+        yield separator + ", ".join(json.dumps(row, default=str) for row in page)
+        separator = ", "
+    yield "]}"
+
+
+async def gzip_chunks(chunks: AsyncIterator[Any], level: int = EXPORT_GZIP_LEVEL) -> AsyncIterator[bytes]:
+    # wbits=31: gzip container (header and CRC trailer) rather than a raw zlib stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        # Sync flush per page so the client gets data as pages arrive, not when the window fills
+        yield compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+# Columnar exports: column name -> type. Raw database columns, not format_interview_data
+INTERVIEW_ARROW_COLUMNS = {
+    "id": "string",
+    "session_id": "string",
+    "interview_type": "string",
+    "status": "string",
+    "completion_method": "string",
+    "topics": "list<string>",
+    "total_questions": "int32",
+    "completed_questions": "int32",
+    "current_question_index": "int32",
+    "average_score": "int32",
+    "individual_scores": "list<int32>",
+    "duration": "int32",
+    "start_time": "timestamp",
+    "end_time": "timestamp",
+    "created_at": "timestamp",
+    "updated_at": "timestamp",
+    "interviewer": "string",
+    "overall_feedback": "string",
+}
+
+RESPONSE_ARROW_COLUMNS = {
+    "id": "string",
+    "session_id": "string",
+    "question_index": "int32",
+    "question_text": "string",
+    "user_response": "string",
+    "code_submission": "string",
+    "score": "int32",
+    "feedback": "string",
+    "time_taken": "int32",
+    "hints_used": "int32",
+    "difficulty": "string",
+    "created_at": "timestamp",
+    "updated_at": "timestamp",
+}
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow not installed. Run: pip install pyarrow")
+
+
+def interview_arrow_columns(include_final_results: bool = False) -> Dict[str, str]:
+    columns = dict(INTERVIEW_ARROW_COLUMNS)
+    if include_final_results:
+        # Free-form document: kept as JSON text, which DuckDB's json functions read directly
+        columns["final_results"] = "json"
+    return columns
+
+
+def _arrow_type(kind: str):
+    return {
+        "string": pa.string(),
+        "json": pa.string(),
+        "int32": pa.int32(),
+        "list<string>": pa.list_(pa.string()),
+        "list<int32>": pa.list_(pa.int32()),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }[kind]
+
+
+def arrow_schema(columns: Dict[str, str]):
+    require_pyarrow()
+    return pa.schema([(name, _arrow_type(kind)) for name, kind in columns.items()])
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """ISO string from either backend -> aware UTC datetime (naive values are UTC)"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = str(value).replace("Z", "+00:00")
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            # Postgres may send more or fewer than 6 fractional digits, which older Pythons reject
+            head, _, rest = text.partition(".")
+            digits = "".join(c for c in rest if c.isdigit())
+            parsed = datetime.fromisoformat(f"{head}.{digits[:6].ljust(6, '0')}{rest[len(digits):]}")
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def record_batch(rows: List[Dict[str, Any]], columns: Dict[str, str]):
+    """One page of rows as an Arrow record batch with ``columns``' types"""
+    arrays = []
+    for name, kind in columns.items():
+        values = [row.get(name) for row in rows]
+        if kind == "timestamp":
+            values = [parse_timestamp(v) for v in values]
+        elif kind == "json":
+            values = [None if v is None else json.dumps(v, default=str) for v in values]
+        arrays.append(pa.array(values, type=_arrow_type(kind)))
+    return pa.RecordBatch.from_arrays(arrays, schema=arrow_schema(columns))
+
+
+class _ChunkSink:
+    """Write-only file for pyarrow writers: hands out bytes as they're written.
+
+    Unlike draining a BytesIO, ``tell`` keeps counting from the start of the
+    stream, which the Parquet footer's absolute offsets depend on.
+    """
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def write_row_group(writer, rows: List[Dict[str, Any]], columns: Dict[str, str]):
+    """Convert ``rows`` and write them to a ParquetWriter as one row group (CPU-bound: run in a thread)."""
+    writer.write_table(pa.Table.from_batches([record_batch(rows, columns)]))
+
+
+def _write_ipc_batch(writer, rows: List[Dict[str, Any]], columns: Dict[str, str]):
+    writer.write_batch(record_batch(rows, columns))
+
+
+async def arrow_chunks(pages: Pages, columns: Dict[str, str]) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, arrow_schema(columns))
+    yield sink.drain()
+    async for page in pages:
+        # Conversion is CPU-bound: keep it off the event loop
+        await asyncio.to_thread(_write_ipc_batch, writer, page, columns)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+async def parquet_chunks(pages: Pages, columns: Dict[str, str]) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, arrow_schema(columns), compression="zstd")
+    async for page in pages:
+        # One row group per page; the footer indexing them all is written on close.
+        # Conversion and compression are CPU-bound: keep them off the event loop
+        await asyncio.to_thread(write_row_group, writer, page, columns)
+        yield sink.drain()
+    await asyncio.to_thread(writer.close)
+    yield sink.drain()
+
+
+# format -> (encoder, media type, file extension)
+FORMATS = {
+    "csv": (csv_chunks, "text/csv", "csv"),
+    "json": (json_chunks, "application/json", "json"),
+    "ndjson": (ndjson_chunks, "application/x-ndjson", "ndjson"),
+}
+
+# Columnar formats: encoder takes the raw pages plus the column types
+COLUMNAR_FORMATS = {
+    "arrow": (arrow_chunks, "application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": (parquet_chunks, "application/vnd.apache.parquet", "parquet"),
+}
+
+
+def export_response(pages: Pages, format_row: Callable[[Dict[str, Any]], Dict[str, Any]], fmt: str = "csv",
+                    compression: Optional[str] = None, name: str = "interviews") -> StreamingResponse:
+    """Stream ``pages`` (e.g. ``db.iter_interviews(...)``) as an attachment in format ``fmt``"""
+    encode, media_type, extension = FORMATS[fmt]
+    chunks = encode(_formatted(pages, format_row))
+    return _attachment(chunks, media_type, f"{name}_{datetime.now().strftime('%Y%m%d')}.{extension}", compression)
+
+
+def _attachment(chunks: AsyncIterator[Any], media_type: str, filename: str,
+                compression: Optional[str]) -> StreamingResponse:
+    if compression == "gzip":
+        return StreamingResponse(
+            gzip_chunks(chunks),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f"attachment; filename={filename}.gz"}
+        )
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+def interviews_export(database: InterviewDatabase, format_row: Callable[[Dict[str, Any]], Dict[str, Any]],
+                      fmt: str = "csv", compression: Optional[str] = None, include_final_results: bool = False,
+                      **filters) -> StreamingResponse:
+    """The /api/interviews/export response: matching interviews in any format.
+
+    Raises RuntimeError for a columnar format without pyarrow, before
+    anything is queried.
+    """
+    if fmt not in COLUMNAR_FORMATS:
+        pages = database.iter_interviews(page_size=EXPORT_PAGE_SIZE, columns=INTERVIEW_LIST_COLUMNS,
+                                         include_final_results=include_final_results, **filters)
+        return export_response(pages, format_row, fmt, compression)
+    require_pyarrow()
+    encode, media_type, extension = COLUMNAR_FORMATS[fmt]
+    pages = database.iter_interviews(page_size=EXPORT_PAGE_SIZE, columns=INTERVIEW_COLUMNS,
+                                     include_final_results=include_final_results, **filters)
+    chunks = encode(_counted(pages), interview_arrow_columns(include_final_results))
+    return _attachment(chunks, media_type, f"interviews_{datetime.now().strftime('%Y%m%d')}.{extension}",
+                       compression)
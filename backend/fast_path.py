@@ -0,0 +1,156 @@
+"""
+Local fast path for trivial interview turns.
+
+Filler turns such as "thank you", "okay", "can you repeat that" or "give me
+a hint" don't need the LLM: the answer is already in session state (the
+last question asked, the last hint given). ``fast_reply`` recognises those
+intents with a few patterns and builds the reply directly, in the same
+shape ``interviewer_reply`` returns, so callers can use either
+interchangeably. Anything it is unsure about returns None and goes to the
+LLM as before.
+"""
+import re
+import threading
+from typing import Dict, List, Optional
+
+# Longer utterances are real answers even if they start with "okay" or "thank you"
+MAX_FAST_PATH_WORDS = 8
+
+DEFAULT_QUESTION = "Can you introduce yourself?"
+
+# Requests must open the turn (after fillers like "sorry" or "okay"); a turn that only
+# mentions "repeat" or "hint" ("we repeat until the queue is empty") is an answer
+_LEAD = r"^(?:(?:sorry|um+|uh+|okay|ok|so|please|excuse me|pardon me)\s+)*"
+_REPEAT = re.compile(
+    _LEAD + r"(?:(?:can|could|would|will) you (?:please )?(?:repeat|say (?:that|it) again|rephrase)"
+    r"|(?:please )?repeat(?: that| it| the question| please|$)|say (?:that|it) again|come again|pardon"
+    r"|one more time|what was the question|i didn'?t (?:catch|hear|get|understand) (?:that|it|you|the question))"
+    r"|\brepeat the question\b"
+)
+_HINT = re.compile(
+    _LEAD + r"(?:(?:can|could|may) i (?:please )?(?:get|have) (?:a |another |some )?(?:hint|clue)"
+    r"|(?:can|could) you (?:please )?give me (?:a |another |some )?(?:hint|clue|pointer|nudge)"
+    r"|(?:please )?give me (?:a |another |some )?(?:hint|clue|pointer|nudge)"
+    r"|i (?:need|want|would like|'?d like) (?:a |another |some )?(?:hint|clue)"
+    r"|(?:a )?(?:hint|clue)(?: please|$)|i'?m stuck$|help me out)"
+)
+# "No hint needed", "I don't want a hint": declining is not a request
+_NEGATION = re.compile(r"\b(?:no|not|never|without|(?:don'?t|do not) (?:need|want))\b")
+# Words allowed after a request ("... the question again please"); more means there's an answer in it
+MAX_TRAILING_WORDS = 3
+
+# Whole-turn fillers. "Thank you" is what Whisper tends to emit for silence.
+_SILENCE_WORDS = {"thank", "thanks", "you", "so", "much", "very", "um", "umm", "uh", "uhh", "hmm", "hm",
+                  "mm", "mhm", "er", "ah", "well"}
+_ACK_WORDS = {"okay", "ok", "alright", "all", "right", "got", "it", "cool", "fine", "great", "nice",
+              "understood", "sounds", "good", "makes", "sense"} | _SILENCE_WORDS
+_WORD = re.compile(r"[a-z']+")
+
+
+def classify_intent(text: str) -> Optional[str]:
+    """Return "repeat", "hint", "silence" or "ack" for trivial turns, else None."""
+    words = _WORD.findall((text or "").lower())
+    if not words:
+        # Nothing transcribed (noise, or every STT request failed): callers must ask for a re-record
+        return None
+    if len(words) > MAX_FAST_PATH_WORDS:
+        return None
+    joined = " ".join(words)
+    if not _NEGATION.search(joined):
+        for intent, pattern in (("repeat", _REPEAT), ("hint", _HINT)):
+            match = pattern.search(joined)
+            if match and len(joined[match.end():].split()) <= MAX_TRAILING_WORDS:
+                return intent
+    if all(w in _SILENCE_WORDS for w in words):
+        return "silence"
+    if all(w in _ACK_WORDS for w in words):
+        return "ack"
+    return None
+
+
+class FastPathStats:
+    """How many candidate turns were answered locally vs. by the LLM."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.llm_turns = 0
+        self.by_intent: Dict[str, int] = {}
+
+    def record(self, intent: Optional[str]):
+        with self._lock:
+            self.turns += 1
+            if intent is None:
+                self.llm_turns += 1
+            else:
+                self.by_intent[intent] = self.by_intent.get(intent, 0) + 1
+
+    def stats(self) -> dict:
+        skipped = self.turns - self.llm_turns
+        return {
+            "turns": self.turns,
+            "llm_turns": self.llm_turns,
+            "fast_path_turns": skipped,
+            "llm_skip_rate": round(skipped / self.turns, 3) if self.turns else 0.0,
+            "by_intent": dict(self.by_intent),
+        }
+
+
+fast_path_stats = FastPathStats()
+
+
+def _last(context: List[dict], field: str) -> str:
+    for turn in reversed(context or []):
+        value = (turn.get(field) or "").strip()
+        if value:
+            return value
+    return ""
+
+
+def _current_hint(context: List[dict], question: str) -> str:
+    """The last turn's hint, if it was given for ``question``.
+
+    A reply's hint answers the question the candidate was on when they asked
+    (the previous turn's next_question). If the reply moved on to a new
+    question, its hint belongs to the old one.
+    """
+    if not context:
+        return ""
+    asked = _last(context[:-1], "next_question") or DEFAULT_QUESTION
+    if asked != question:
+        return ""
+    return (context[-1].get("hint") or "").strip()
+
+
+def fast_reply(candidate: str, context: List[dict]) -> Optional[dict]:
+    """Answer a trivial turn from session state, or return None to use the LLM.
+
+    The reply carries ``"fast_path": <intent>`` so callers can keep these turns
+    out of the scored conversation.
+    """
+    intent = classify_intent(candidate)
+    question = _last(context, "next_question") or DEFAULT_QUESTION
+    hint = ""
+    if intent == "repeat":
+        evaluation = "Sure, here is the question again."
+    elif intent == "hint":
+        hint = _current_hint(context, question)
+        if not hint:
+            # No hint prepared for this question yet; the LLM has to write one
+            intent = None
+        evaluation = "Here's a small hint."
+    elif intent == "silence":
+        evaluation = "Take your time, there's no rush. Go ahead whenever you're ready."
+    elif intent == "ack":
+        evaluation = "Great, go ahead."
+    fast_path_stats.record(intent)
+    if intent is None:
+        return None
+    print(f"⚡ Fast path ({intent}): answered without LLM call")
+    return {
+        "evaluation": evaluation,
+        "next_question": question,
+        "hint": hint,
+        "final_feedback": "",
+        "fast_path": intent,
+    }
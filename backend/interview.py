@@ -1,16 +1,19 @@
 import os
 import time
 import json
-import requests
 import sounddevice as sd
 import soundfile as sf
 import numpy as np
 import webrtcvad
 import pyaudio
 from groq import Groq
-from gtts import gTTS
 from dotenv import load_dotenv
-from utils import build_interviewer_prompt, get_user_topics, record_with_vad
+from utils import SAMPLE_RATE, AudioRingBuffer, build_interviewer_prompt, capture_with_vad, get_user_topics
+from transcription import trim_silence, whisper_client
+from stt_backends import stt_backend
+from lexicon import lexicon_for
+from tts import say, tts_service
+from fast_path import classify_intent, fast_reply
 
 # --- Load env ---
 load_dotenv()
@@ -51,106 +54,56 @@ def transcript_is_valid(text: str) -> bool:
 # --- VAD Test Function ---
 def test_vad_recording():
     print("Testing VAD recording. Speak a short sentence, then stay silent...")
-    filename = "test_vad.wav"
-    filename, heard = record_with_vad(filename)
-    print(f"Recording stopped. Audio saved to {filename}. Heard speech: {heard}")
-    # Play back the recorded audio
+    audio, heard = capture_with_vad()
+    print(f"Recording stopped. Captured {len(audio) / SAMPLE_RATE:.1f}s of audio. Heard speech: {heard}")
+    # Play back the recorded audio straight from memory
     try:
-        data, sr = sf.read(filename, dtype="float32")
         print("Playing back your recording...")
-        sd.play(data, sr)
+        sd.play(audio, SAMPLE_RATE)
         sd.wait()
     except Exception as e:
         print(f"Playback error: {e}")
-    # Optionally, delete the test file
-    try:
-        os.remove(filename)
-    except Exception as e:
-        print(f"Could not delete test file: {e}")
     # Also test the retry prompt flow by simulating a no-speech scenario is manual testing
 
-# --- TTS using gTTS ---
-def say(text: str, filename="out.mp3"):
-    if not text.strip():
-        return
+# --- STT (backend chosen by STT_BACKEND) ---
+def transcribe_bytes(audio: bytes, filename: str = "audio.wav", content_type: str = "audio/wav") -> str:
+    """Transcribe one in-memory audio file with the Groq Whisper API"""
+    return whisper_client.transcribe_sync(audio, filename, content_type)
+
+def _load_for_transcription(path: str):
+    """Return mono int16 (pcm, sample_rate), or (raw_bytes, None) if libsndfile can't decode the file."""
     try:
-        tts = gTTS(text=text, lang="en")
-        tts.save(filename)
-        data, sr = sf.read(filename, dtype="float32")
-        sd.play(data, sr); sd.wait()
-    except Exception as e:
-        print(f"TTS error: {e}")
+        pcm, sr = sf.read(path, dtype="int16")
+        if pcm.ndim > 1:
+            pcm = pcm.mean(axis=1).astype(np.int16)
+        return pcm, sr
+    except RuntimeError as e:
+        print(f"⚠️ Could not decode audio locally, uploading file as-is: {e}")
+    with open(path, "rb") as audio_file:
+        return audio_file.read(), None
+
+def transcribe_pcm(pcm: np.ndarray, sample_rate: int, name: str = "answer", prompt: str = None) -> str:
+    """Transcribe int16 PCM with the configured STT backend (see stt_backends)"""
+    return stt_backend.transcribe_sync(pcm, sample_rate, name, prompt)
+
+async def transcribe_pcm_async(pcm: np.ndarray, sample_rate: int, name: str = "answer", prompt: str = None) -> str:
+    """Async variant of transcribe_pcm()"""
+    return await stt_backend.transcribe(pcm, sample_rate, name, prompt)
 
-# --- STT with Groq Whisper ---
 def transcribe(path: str) -> str:
-    """Transcribe audio file to text using Groq Whisper API"""
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        print("❌ Groq API key not available for transcription")
-        return "[Transcription error: API key not found]"
-    
+    """Transcribe an audio file to text with the configured STT backend.
+
+    Files libsndfile can't decode are uploaded to Groq Whisper as-is.
+    """
+    print(f"📁 Transcribing file: {path}")
     try:
-        print(f"📁 Transcribing file: {path}")
-        print(f"📏 File size: {os.path.getsize(path)} bytes")
-        
-        # Use Groq's REST API for audio transcription
-        url = "https://api.groq.com/openai/v1/audio/transcriptions"
-        
-        with open(path, "rb") as audio_file:
-            files = {
-                "file": (os.path.basename(path), audio_file, "audio/wav")
-            }
-            data = {
-                "model": "whisper-large-v3",
-                "response_format": "json"
-            }
-            headers = {
-                "Authorization": f"Bearer {api_key}"
-            }
-            
-            print(f"📤 Sending request to Groq Whisper API...")
-            response = requests.post(url, files=files, data=data, headers=headers, timeout=30)
-        
-        print(f"📡 Response status: {response.status_code}")
-        
-        if response.status_code != 200:
-            error_msg = response.text[:200]
-            print(f"❌ API error: {error_msg}")
-            return f"[Transcription error: API returned {response.status_code}]"
-        
-        result = response.json()
-        print(f"🔍 Response: {result}")
-        
-        transcript = result.get('text', '').strip()
-        
-        if not transcript or len(transcript) < 2:
-            print("⚠️ Transcription returned empty or very short result")
-            return ""
-        
-        print(f"✅ Transcription successful: {transcript[:100]}...")
-        return transcript
-        
-    except requests.exceptions.Timeout:
-        print("❌ Request timeout")
-        return "[Transcription error: API request timeout]"
-        
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Request error: {e}")
-        return f"[Transcription error: Network error - {str(e)[:80]}]"
-        
-    except Exception as e:
-        error_type = type(e).__name__
-        error_msg = str(e)
-        print(f"❌ Transcription error ({error_type}): {error_msg}")
-        import traceback
-        traceback.print_exc()
-        
-        if "auth" in error_msg.lower() or "key" in error_msg.lower():
-            return "[Transcription error: API authentication failed]"
-        elif "quota" in error_msg.lower() or "limit" in error_msg.lower():
-            return "[Transcription error: API quota exceeded]"
-        else:
-            return f"[Transcription error: {error_type} - {error_msg[:100]}]"
+        audio, sr = _load_for_transcription(path)
+    except OSError as e:
+        print(f"❌ Could not read audio file: {e}")
+        return f"[Transcription error: {type(e).__name__} - {str(e)[:100]}]"
+    if sr is None:
+        return transcribe_bytes(audio, os.path.basename(path))
+    return transcribe_pcm(audio, sr, os.path.splitext(os.path.basename(path))[0])
 
 # --- LLM Interview Brain ---
 def interviewer_reply(candidate: str, context: list) -> dict:
@@ -178,27 +131,28 @@ def interviewer_reply(candidate: str, context: list) -> dict:
             "final_feedback": ""
         }
 
+def respond(candidate: str, context: list) -> dict:
+    """Answer trivial turns from session state (see fast_path), everything else via the LLM"""
+    return fast_reply(candidate, context) or interviewer_reply(candidate, context)
+
 # --- Main Loop ---
 def run_interview():
     # Topic selection
     topics = get_user_topics()
     global INTERVIEWER_PROMPT
     INTERVIEWER_PROMPT = build_interviewer_prompt(topics)
-    # Add instruction for jargon correction
-    INTERVIEWER_PROMPT += (
-        "\nIf the candidate uses a technical term or jargon that is misspelled or not recognized "
-        "(for example, 'kosarachi' instead of 'kosaraju'), try to infer the intended word and "
-        "suggest the closest possible correct term in your feedback."
-    )
-    INTERVIEWER_PROMPT = build_interviewer_prompt(topics)
+    # Mis-heard jargon is fixed locally instead of by the LLM
+    lexicon = lexicon_for(topics)
 
+    tts_service.warm()
     say("Hello, I'm CodeSage, your AI interviewer. Can you introduce yourself?")
     round_idx = 0
 
+    # One capture buffer for the whole interview instead of one per answer
+    buffer = AudioRingBuffer()
     while True:
-        filename = f"ans{round_idx}.wav"
         print("🎙 Speak when ready...")
-        filename, heard_speech = record_with_vad(filename)
+        audio, heard_speech = capture_with_vad(buffer=buffer)
 
         # If VAD didn't detect any speech, prompt user and retry a few times
         retries = 0
@@ -206,22 +160,19 @@ def run_interview():
         while not heard_speech and retries < max_retries:
             say("I didn't hear anything. Please speak a bit louder or check your microphone.")
             print("No speech detected by VAD. Prompted user to speak louder.")
-            filename, heard_speech = record_with_vad(filename)
+            audio, heard_speech = capture_with_vad(buffer=buffer)
             retries += 1
 
-        candidate = transcribe(filename)
-        # Validate transcript quality
-        if not transcript_is_valid(candidate):
+        candidate = transcribe_pcm(trim_silence(audio, SAMPLE_RATE), SAMPLE_RATE,
+                                   prompt=lexicon.whisper_prompt) if heard_speech else ""
+        # Validate transcript quality (fillers like "okay" go to the fast path instead)
+        if not transcript_is_valid(candidate) and classify_intent(candidate) is None:
             # Give one more retry if transcript looks invalid
             say("I couldn't understand that. Could you repeat more clearly?")
             print("Transcript invalid or unintelligible. Asking user to repeat.")
-            filename, heard_speech = record_with_vad(filename)
-            candidate = transcribe(filename)
-        # Delete the answer audio file after transcription
-        try:
-            os.remove(filename)
-        except Exception as e:
-            print(f"Warning: Could not delete {filename}: {e}")
+            audio, heard_speech = capture_with_vad(buffer=buffer)
+            candidate = transcribe_pcm(trim_silence(audio, SAMPLE_RATE), SAMPLE_RATE,
+                                       prompt=lexicon.whisper_prompt) if heard_speech else ""
 
         if not candidate:
             # After retrying above, if still empty, give a hint and continue
@@ -229,18 +180,23 @@ def run_interview():
             print("Empty transcript after retries. Skipping this round.")
             continue
 
+        candidate = lexicon.correct(candidate)
         print("Candidate:", candidate)
-        reply = interviewer_reply(candidate, conversation)
-
-        # Store conversation
-        conversation.append({
-            "round": round_idx,
-            "candidate": candidate,
-            "evaluation": reply.get("evaluation", ""),
-            "next_question": reply.get("next_question", ""),
-            "hint": reply.get("hint", ""),
-            "final_feedback": reply.get("final_feedback", "")
-        })
+        reply = respond(candidate, conversation)
+        # Start synthesizing the next question while the evaluation is shown
+        if reply.get("next_question"):
+            tts_service.prefetch(reply["next_question"])
+
+        # Store conversation (fast-path filler turns are not scored)
+        if not reply.get("fast_path"):
+            conversation.append({
+                "round": round_idx,
+                "candidate": candidate,
+                "evaluation": reply.get("evaluation", ""),
+                "next_question": reply.get("next_question", ""),
+                "hint": reply.get("hint", ""),
+                "final_feedback": reply.get("final_feedback", "")
+            })
 
         # Speak feedback + question
         if reply.get("evaluation"):
@@ -262,9 +218,16 @@ if __name__ == "__main__":
     print("Select mode:")
     print("1. Run Interview")
     print("2. Test VAD Recording")
-    mode = input("Enter 1 or 2: ").strip()
+    print("3. Run Interview (full-duplex: overlapped stages, interrupt by speaking)")
+    mode = input("Enter 1, 2 or 3: ").strip()
     if mode == "2":
         test_vad_recording()
+    elif mode == "3":
+        if not os.getenv("GROQ_API_KEY"):
+            print("Please set GROQ_API_KEY in your .env file")
+            exit(1)
+        from pipeline import run_pipelined_interview
+        run_pipelined_interview(get_user_topics())
     else:
         if not os.getenv("GROQ_API_KEY"):
             print("Please set GROQ_API_KEY in your .env file")
@@ -7,9 +7,13 @@ import numpy as np
 import webrtcvad
 import pyaudio
 from groq import Groq
-from gtts import gTTS
 from dotenv import load_dotenv
-from utils import get_user_topics, record_with_vad
+from utils import SAMPLE_RATE, AudioRingBuffer, capture_with_vad, get_user_topics
+from transcription import trim_silence
+from stt_backends import stt_backend
+from lexicon import lexicon_for
+from tts import say, tts_service
+from fast_path import classify_intent, fast_reply
 
 # --- Resume reading function ---
 def read_resume(resume_path):
@@ -17,21 +21,25 @@ def read_resume(resume_path):
         with open(resume_path, 'r', encoding='utf-8') as f:
             return f.read()
     elif resume_path.lower().endswith('.pdf'):
-        try:
-            import PyPDF2
-        except ImportError:
-            print("PyPDF2 not installed. Run: pip install PyPDF2")
-            return ""
         with open(resume_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() or ""
-            return text
+            return read_resume_pdf(f)[0]
     else:
         print("Unsupported resume format. Please use .txt or .pdf")
         return ""
 
+def read_resume_pdf(fileobj):
+    """Extract text from an open PDF file object. Returns (text, page_count)."""
+    try:
+        import PyPDF2
+    except ImportError:
+        print("PyPDF2 not installed. Run: pip install PyPDF2")
+        return "", 0
+    reader = PyPDF2.PdfReader(fileobj)
+    text = ""
+    for page in reader.pages:
+        text += page.extract_text() or ""
+    return text, len(reader.pages)
+
 # --- Load env ---
 load_dotenv()
 
@@ -71,44 +79,23 @@ def transcript_is_valid(text: str) -> bool:
 # --- VAD Test Function ---
 def test_vad_recording():
     print("Testing VAD recording. Speak a short sentence, then stay silent...")
-    filename = "test_vad.wav"
-    filename, heard = record_with_vad(filename)
-    print(f"Recording stopped. Audio saved to {filename}. Heard speech: {heard}")
-    # Play back the recorded audio
+    audio, heard = capture_with_vad()
+    print(f"Recording stopped. Captured {len(audio) / SAMPLE_RATE:.1f}s of audio. Heard speech: {heard}")
+    # Play back the recorded audio straight from memory
     try:
-        data, sr = sf.read(filename, dtype="float32")
         print("Playing back your recording...")
-        sd.play(data, sr)
+        sd.play(audio, SAMPLE_RATE)
         sd.wait()
     except Exception as e:
         print(f"Playback error: {e}")
-    # Optionally, delete the test file
-    try:
-        os.remove(filename)
-    except Exception as e:
-        print(f"Could not delete test file: {e}")
     # Also test the retry prompt flow by simulating a no-speech scenario is manual testing
 
-# --- TTS using gTTS ---
-def say(text: str, filename="out.mp3"):
-    if not text.strip():
-        return
-    try:
-        tts = gTTS(text=text, lang="en")
-        tts.save(filename)
-        data, sr = sf.read(filename, dtype="float32")
-        sd.play(data, sr); sd.wait()
-    except Exception as e:
-        print(f"TTS error: {e}")
-
-# --- STT with Groq Whisper ---
-def transcribe(path: str) -> str:
-    with open(path, "rb") as f:
-        result = client.audio.transcriptions.create(
-            file=(path, f.read()),
-            model="whisper-large-v3-turbo"
-        )
-    return getattr(result, "text", "").strip()
+# --- STT (backend chosen by STT_BACKEND) ---
+def transcribe(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> str:
+    if len(audio) == 0:
+        return ""
+    prompt = lexicon_for().whisper_prompt
+    return stt_backend.transcribe_sync(trim_silence(audio, sample_rate), sample_rate, prompt=prompt)
 
 # --- LLM Interview Brain ---
 def interviewer_reply(candidate: str, context: list) -> dict:
@@ -175,10 +162,7 @@ You are conducting a live mock job interview with the candidate, using their res
    - Suggest improvements or ask for more details if needed.
    - If candidate requests a hint, give only a small clue.
 
-3. Jargon or Misspelling:
-   - If the candidate uses a technical term or jargon that is misspelled or not recognized (e.g., "kosarachi" instead of "kosaraju"), try to infer the intended word and suggest the closest possible correct term in your feedback.
-
-4. Final feedback (at end of interview):
+3. Final feedback (at end of interview):
    - Summarize overall performance:
      1. Strengths demonstrated
      2. Areas for improvement
@@ -198,13 +182,15 @@ Resume:
 {resume_text}
 """
 
+    tts_service.warm()
     say("Hello, I'm Code-Win, your AI interviewer. I will ask you questions based on your resume. Can you introduce yourself?")
     round_idx = 0
 
+    # One capture buffer for the whole interview instead of one per answer
+    buffer = AudioRingBuffer()
     while True:
-        filename = f"ans{round_idx}.wav"
         print("🎙 Speak when ready...")
-        filename, heard_speech = record_with_vad(filename)
+        audio, heard_speech = capture_with_vad(buffer=buffer)
 
         # If VAD didn't detect any speech, prompt user and retry a few times
         retries = 0
@@ -212,22 +198,17 @@ Resume:
         while not heard_speech and retries < max_retries:
             say("I didn't hear anything. Please speak a bit louder or check your microphone.")
             print("No speech detected by VAD. Prompted user to speak louder.")
-            filename, heard_speech = record_with_vad(filename)
+            audio, heard_speech = capture_with_vad(buffer=buffer)
             retries += 1
 
-        candidate = transcribe(filename)
-        # Validate transcript quality
-        if not transcript_is_valid(candidate):
+        candidate = transcribe(audio)
+        # Validate transcript quality (fillers like "okay" go to the fast path instead)
+        if not transcript_is_valid(candidate) and classify_intent(candidate) is None:
             # Give one more retry if transcript looks invalid
             say("I couldn't understand that. Could you repeat more clearly?")
             print("Transcript invalid or unintelligible. Asking user to repeat.")
-            filename, heard_speech = record_with_vad(filename)
-            candidate = transcribe(filename)
-        # Delete the answer audio file after transcription
-        try:
-            os.remove(filename)
-        except Exception as e:
-            print(f"Warning: Could not delete {filename}: {e}")
+            audio, heard_speech = capture_with_vad(buffer=buffer)
+            candidate = transcribe(audio)
 
         if not candidate:
             # After retrying above, if still empty, give a hint and continue
@@ -235,18 +216,23 @@ Resume:
             print("Empty transcript after retries. Skipping this round.")
             continue
 
+        candidate = lexicon_for().correct(candidate)
         print("Candidate:", candidate)
-        reply = interviewer_reply(candidate, conversation)
+        reply = fast_reply(candidate, conversation) or interviewer_reply(candidate, conversation)
+        # Start synthesizing the next question while the evaluation is shown
+        if reply.get("next_question"):
+            tts_service.prefetch(reply["next_question"])
 
-        # Store conversation
-        conversation.append({
-            "round": round_idx,
-            "candidate": candidate,
-            "evaluation": reply.get("evaluation", ""),
-            "next_question": reply.get("next_question", ""),
-            "hint": reply.get("hint", ""),
-            "final_feedback": reply.get("final_feedback", "")
-        })
+        # Store conversation (fast-path filler turns are not scored)
+        if not reply.get("fast_path"):
+            conversation.append({
+                "round": round_idx,
+                "candidate": candidate,
+                "evaluation": reply.get("evaluation", ""),
+                "next_question": reply.get("next_question", ""),
+                "hint": reply.get("hint", ""),
+                "final_feedback": reply.get("final_feedback", "")
+            })
 
         # Speak feedback + question
         if reply.get("evaluation"):
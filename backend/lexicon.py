@@ -0,0 +1,354 @@
+"""
+Technical-term lexicon for interview transcripts.
+
+Whisper regularly mis-hears algorithm and systems jargon ("kosarachi" for
+Kosaraju, "dykstra" for Dijkstra). Instead of asking the LLM to repair those
+on every turn, transcripts are corrected locally against a per-topic
+lexicon before they reach ``interviewer_reply``, and the same lexicon is sent
+to Whisper as a prompt so it is more likely to hear the terms right in the
+first place.
+
+Plain terms (``B-tree``, ``TCP``) are only canonicalized on an exact match
+after normalization, so spacing and casing variants like "b tree" are fixed.
+Distinctive jargon (names of algorithms, systems and people) is
+additionally fuzzy-matched with a BK-tree.
+
+Answers are mostly ordinary English, so two guards keep it intact. Terms
+that are also common words (REST, SOLID, NAT, Raft, ...) are only rewritten
+next to a technical word: "rest api" becomes "REST API", but "the rest of
+the array" is left alone. And words in ``COMMON_WORDS`` are never
+fuzzy-matched, so "my manager" doesn't become "my Manacher".
+"""
+import re
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils import TOPIC_OPTIONS
+
+# Canonical spelling of common terms per topic; matched exactly (ignoring case/spaces/hyphens)
+TOPIC_TERMS: Dict[str, List[str]] = {
+    "DSA": [
+        "array", "linked list", "hash map", "hash table", "binary search", "BFS", "DFS", "DP", "heap",
+        "min-heap", "max-heap", "priority queue", "stack", "queue", "deque", "trie", "segment tree",
+        "Fenwick tree", "B-tree", "AVL tree", "red-black tree", "union-find", "two pointers",
+        "sliding window", "backtracking", "greedy", "divide and conquer", "topological sort", "Prim's",
+        "big O",
+    ],
+    "DBMS": [
+        "SQL", "NoSQL", "ACID", "B-tree", "B+ tree", "index", "primary key", "foreign key",
+        "join", "inner join", "outer join", "normalization", "1NF", "2NF", "3NF", "BCNF",
+        "transaction", "isolation level", "deadlock", "write-ahead log", "MVCC", "ER diagram",
+    ],
+    "System Design": [
+        "load balancer", "CDN", "cache", "sharding", "replication", "CAP theorem", "API gateway",
+        "rate limiter", "message queue", "pub/sub", "microservices", "monolith", "consistent hashing",
+        "eventual consistency", "idempotency", "REST", "gRPC", "WebSocket", "SLA", "p99",
+    ],
+    "OOPS": [
+        "class", "object", "inheritance", "polymorphism", "encapsulation", "abstraction", "interface",
+        "abstract class", "overloading", "overriding", "SOLID", "dependency injection", "design pattern",
+        "singleton", "factory", "observer", "composition",
+    ],
+    "Operating systems": [
+        "process", "thread", "mutex", "semaphore", "deadlock", "paging", "segmentation", "virtual memory",
+        "TLB", "page fault", "context switch", "scheduler", "round robin", "FCFS", "SJF", "race condition",
+        "critical section", "kernel", "system call", "fork", "thrashing",
+    ],
+    "Computer networks": [
+        "TCP", "UDP", "IP", "HTTP", "HTTPS", "DNS", "DHCP", "ARP", "NAT", "OSI model", "TCP/IP",
+        "three-way handshake", "subnet", "CIDR", "MAC address", "router", "switch", "TLS", "SSL",
+        "congestion control", "sliding window", "ICMP", "BGP", "OSPF",
+    ],
+}
+
+# Distinctive jargon per topic; also fuzzy-matched against mis-heard words
+TOPIC_JARGON: Dict[str, List[str]] = {
+    "DSA": [
+        "Kosaraju", "Tarjan", "Dijkstra", "Bellman-Ford", "Floyd-Warshall", "Kruskal",
+        "Kadane", "Knuth-Morris-Pratt", "KMP", "Rabin-Karp", "Boyer-Moore", "Manacher", "Huffman",
+        "memoization", "quicksort", "mergesort", "heapsort", "Fibonacci", "Hamiltonian",
+        "Eulerian", "A* search", "Floyd's cycle detection", "Levenshtein",
+    ],
+    "DBMS": [
+        "PostgreSQL", "MySQL", "MongoDB", "Cassandra", "denormalization", "serializability",
+        "linearizability", "idempotent", "materialized view", "Boyce-Codd",
+    ],
+    "System Design": [
+        "Kubernetes", "Kafka", "RabbitMQ", "Redis", "Memcached", "Cassandra", "DynamoDB", "Zookeeper",
+        "Paxos", "Raft", "Nginx", "Elasticsearch", "geohashing", "quadtree",
+        "Bloom filter", "HyperLogLog",
+    ],
+    "OOPS": [
+        "Liskov substitution", "SOLID principles", "memoization",
+    ],
+    "Operating systems": [
+        "Belady's anomaly", "Banker's algorithm", "Peterson's algorithm", "spinlock",
+        "Dining philosophers",
+    ],
+    "Computer networks": [
+        "Dijkstra", "Bellman-Ford", "Ethernet", "traceroute", "Nagle's algorithm", "IPv6", "IPv4",
+    ],
+}
+
+# Terms that are also everyday words; only canonicalized beside a technical word
+COMMON_WORD_TERMS = {
+    "REST", "SOLID", "NAT", "Raft", "ACID", "Prim's", "class", "object", "stack", "switch", "fork",
+    "index", "join", "heap", "queue", "cache", "process", "thread", "greedy", "factory", "observer",
+}
+
+# Words that make a neighbouring common-word term technical ("rest api", "raft consensus")
+CONTEXT_WORDS = {
+    "api", "apis", "endpoint", "endpoints", "principle", "principles", "consensus", "protocol", "protocols",
+    "algorithm", "algorithms", "gateway", "traversal", "leader", "election", "json", "service", "services",
+}
+
+# Everyday words that sit within fuzzy distance of some jargon ("manager" / Manacher,
+# "radius" / Redis); never fuzzy-matched. Fuzzy matching only looks at words of 5+ letters.
+COMMON_WORDS = frozenset("""
+    about above actually after again against almost along already always among another answer anything
+    approach around basically because before being below better between build called cannot career change
+    check choose clear close coding college common company compare complete could course create current
+    customer daily dealing decide design detail different difficult during early easier either enough
+    entire every everything example experience explain family faster feature field final finally first
+    follow friend given going great group handle happen having heard however ideas important improve
+    include inside instead itself karate keeping knowledge known large later learn learned least leave
+    level light likely limit little local longer looking lower mainly maintain major makes manage managed
+    manager managers managing mapping matter maybe means medication meeting member memory message method
+    middle might minutes model moment money months mostly myself nature nearly needed never normal nothing
+    number office often order other others outside overall people perhaps person piece place point
+    possible power practice pretty previous probably problem problems process product program project
+    projects proper question questions quick quickly quite rabbit rabbits radish radius rather readies
+    ready reading really reason rebids recent recently reddit redid reduce related relies remain remember
+    remiss report request resist result results return right round rules scale school second seems sense
+    server service several short should similar simple simply since single small smaller solve solved
+    someone something sometimes source space speak special specific speed spend spent stage stand
+    standard start started state still story strong student students study style subject success suggest
+    support system table taking talking target tartan tarzan teacher teaching team teams tested their
+    there these thing things think those though thought three through today together tools total toward
+    track training tried truly trying under understand understanding unique until usage useful users
+    using usually value various version video wanted where whether which while whole within without
+    words working world would write writing wrong years yourself hoffman impotent
+""".split())
+
+_NON_ALNUM = re.compile(r"[^0-9a-z+*/#]")
+
+
+def _key(text: str) -> str:
+    """Lookup key: lowercase with spaces, hyphens and apostrophes removed."""
+    return _NON_ALNUM.sub("", text.lower())
+
+
+def levenshtein(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+class BKTree:
+    """Burkhard-Keller tree over edit distance for tolerant dictionary lookup."""
+
+    def __init__(self, words: Iterable[str] = ()):
+        self._root: Optional[Tuple[str, dict]] = None
+        self.size = 0
+        for w in words:
+            self.add(w)
+
+    def add(self, word: str):
+        if self._root is None:
+            self._root = (word, {})
+            self.size = 1
+            return
+        node = self._root
+        while True:
+            d = levenshtein(word, node[0])
+            if d == 0:
+                return
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = (word, {})
+                self.size += 1
+                return
+            node = child
+
+    def search(self, word: str, tolerance: int) -> List[Tuple[int, str]]:
+        """All ``(distance, word)`` within ``tolerance`` of ``word``, closest first."""
+        if self._root is None:
+            return []
+        found, stack = [], [self._root]
+        while stack:
+            term, children = stack.pop()
+            d = levenshtein(word, term)
+            if d <= tolerance:
+                found.append((d, term))
+            for dist, child in children.items():
+                if d - tolerance <= dist <= d + tolerance:
+                    stack.append(child)
+        return sorted(found)
+
+
+def _tolerance(length: int) -> int:
+    if length <= 5:
+        return 1
+    if length <= 8:
+        return 2
+    return 3
+
+
+class LexiconStats:
+    def __init__(self):
+        self.transcripts = 0
+        self.corrected_transcripts = 0
+        self.corrections = 0
+        self.total_us = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "transcripts": self.transcripts,
+            "corrected_transcripts": self.corrected_transcripts,
+            "corrections": self.corrections,
+            "avg_correction_us": round(self.total_us / self.transcripts, 1) if self.transcripts else 0.0,
+        }
+
+
+lexicon_stats = LexiconStats()
+
+
+class Lexicon:
+    """Terms for a set of topics, with transcript correction and a Whisper prompt."""
+
+    # Longest phrase, in transcript words, considered for one term ("knuth morris pratt")
+    MAX_WORDS = 3
+    # Whisper only looks at the last ~224 prompt tokens
+    PROMPT_CHARS = 600
+
+    def __init__(self, topics: Iterable[str]):
+        self.topics = [t for t in topics if t in TOPIC_TERMS] or list(TOPIC_OPTIONS)
+        jargon = list(dict.fromkeys(t for topic in self.topics for t in TOPIC_JARGON.get(topic, [])))
+        terms = list(dict.fromkeys(t for topic in self.topics for t in TOPIC_TERMS.get(topic, [])))
+        self.terms = jargon + [t for t in terms if t not in jargon]
+        self._exact: Dict[str, str] = {}
+        self._ambiguous: set = set()
+        for term in self.terms:
+            k = _key(term)
+            self._exact.setdefault(k, term)
+            self._exact.setdefault(k + "s", term + "s" if not term.endswith("s") else term)
+            if term in COMMON_WORD_TERMS:
+                self._ambiguous.update((k, k + "s"))
+        # Neighbours that make an ambiguous term technical: context words, jargon, and
+        # acronym/proper-noun terms that aren't everyday words themselves
+        self._technical = set(CONTEXT_WORDS) | {
+            k for k, t in self._exact.items() if k not in self._ambiguous and t != t.lower()
+        }
+        self._fuzzy_terms: Dict[str, str] = {_key(t): t for t in jargon if len(_key(t)) >= 5}
+        # One small BK-tree per first letter; mis-hearings almost always keep the initial sound
+        self._trees: Dict[str, BKTree] = {}
+        self._lengths: Dict[str, set] = {}
+        for k in self._fuzzy_terms:
+            self._trees.setdefault(k[0], BKTree()).add(k)
+            self._lengths.setdefault(k[0], set()).add(len(k))
+        self.whisper_prompt = self._build_prompt()
+
+    def _build_prompt(self) -> str:
+        prompt = f"Technical interview about {', '.join(self.topics)}. Terms: "
+        for term in self.terms:
+            if len(prompt) + len(term) + 2 > self.PROMPT_CHARS:
+                break
+            prompt += term + ", "
+        return prompt.rstrip(", ") + "."
+
+    @lru_cache(maxsize=4096)
+    def _fuzzy(self, key: str, multiword: bool) -> Optional[str]:
+        tree = self._trees.get(key[0])
+        if tree is None:
+            return None
+        # Joined words must be about as long as the term: "kosa rachi" yes, "red is as" no
+        tolerance = 1 if multiword else _tolerance(len(key))
+        if not any(abs(n - len(key)) <= tolerance for n in self._lengths[key[0]]):
+            return None
+        matches = tree.search(key, _tolerance(len(key)))
+        if multiword:
+            matches = [(d, k) for d, k in matches if len(k) >= 7 and abs(len(k) - len(key)) <= 1]
+        if not matches or (len(matches) > 1 and matches[0][0] == matches[1][0]):
+            return None
+        return self._fuzzy_terms[matches[0][1]]
+
+    def _exact_match(self, key: str, n: int) -> Optional[str]:
+        term = self._exact.get(key) if key else None
+        if n > 1 and term is not None and len(key) < 7 and not re.search(r"[\s-]", term):
+            # "red is" should not become "Redis"; "b tree" may become "B-tree"
+            return None
+        return term
+
+    def _fuzzy_match(self, key: str, n: int) -> Optional[str]:
+        if len(key) < 5 or (n > 1 and len(key) < 7) or (n == 1 and key in COMMON_WORDS):
+            return None
+        return self._fuzzy(key, n > 1)
+
+    def _in_context(self, keys: List[str], i: int, n: int) -> bool:
+        """Whether the word before or after ``keys[i:i + n]`` is technical."""
+        neighbours = keys[max(i - 1, 0):i] + keys[i + n:i + n + 1]
+        return any(k in self._technical or k in self._fuzzy_terms for k in neighbours)
+
+    def _find(self, keys: List[str], i: int) -> Tuple[Optional[str], int]:
+        """Longest exact match at word ``i``, else the shortest fuzzy one."""
+        longest = min(self.MAX_WORDS, len(keys) - i)
+        windows = ["".join(keys[i:i + n]) for n in range(1, longest + 1)]
+        for n in range(longest, 0, -1):
+            term = self._exact_match(windows[n - 1], n)
+            if term is not None:
+                return term, n
+        for n in range(1, longest + 1):
+            term = self._fuzzy_match(windows[n - 1], n)
+            if term is not None:
+                return term, n
+        return None, 1
+
+    def correct(self, text: str) -> str:
+        """Replace mis-heard or mis-spaced terms in ``text`` with their canonical spelling."""
+        if not text:
+            return text
+        started = time.perf_counter()
+        words = text.split()
+        keys = [_key(w) for w in words]
+        out: List[str] = []
+        fixes = 0
+        i = 0
+        while i < len(words):
+            term, n = self._find(keys, i)
+            original = " ".join(words[i:i + n])
+            core = original.rstrip(".,;:!?")
+            if term is None or core == term or (n == 1 and core.lower() == term.lower() and term == term.lower()):
+                # No match, already right, or only sentence-initial capitalisation differs
+                out.append(original)
+            elif n == 1 and keys[i] in self._ambiguous and not self._in_context(keys, i, n):
+                # "the rest of", "a solid understanding": an everyday word, not the term
+                out.append(original)
+            else:
+                out.append(term + original[len(core):])
+                fixes += 1
+            i += n
+        corrected = " ".join(out)
+        lexicon_stats.transcripts += 1
+        lexicon_stats.total_us += (time.perf_counter() - started) * 1e6
+        if fixes:
+            lexicon_stats.corrected_transcripts += 1
+            lexicon_stats.corrections += fixes
+            print(f"🔤 Lexicon corrected {fixes} term(s): '{text[:80]}' -> '{corrected[:80]}'")
+        return corrected
+
+
+@lru_cache(maxsize=64)
+def _lexicon(topics: Tuple[str, ...]) -> Lexicon:
+    return Lexicon(topics)
+
+
+def lexicon_for(topics: Optional[Iterable[str]] = None) -> Lexicon:
+    """Shared Lexicon for a topic selection (all topics if none are given)."""
+    return _lexicon(tuple(sorted(set(topics or ()))))
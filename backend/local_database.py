@@ -0,0 +1,536 @@
+"""
+Embedded SQLite implementation of ``InterviewDatabase`` (DATABASE_BACKEND=sqlite).
+
+Same API and the same tables as SUPABASE_SCHEMA.sql, stored in one local
+file, for single-node deployments, offline development and benchmarks
+where a network round trip would dominate. Array and JSONB columns are
+stored as JSON text and decoded on read. The analytics rollups are kept by
+SQLite triggers mirroring the Postgres ones.
+
+SQLite calls are blocking, so they run on a dedicated executor rather than
+the event loop: one writer thread (SQLite allows a single writer at a
+time, so more would only contend on the lock) and a small pool of reader
+threads, each with its own connection. WAL mode lets the readers proceed
+while a write is in progress.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from database import (INTERVIEW_COLUMNS, INTERVIEW_LIST_COLUMNS, INTERVIEW_STATS_FIELDS, INTERVIEW_SUMMARY_FIELDS,
+                      InterviewDatabase, _format_interview, _interview_stats, cursor_condition, encode_cursor,
+                      interview_filter)
+
+LOCAL_DB_PATH = os.getenv("LOCAL_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "codesage.sqlite3"))
+LOCAL_DB_READERS = int(os.getenv("LOCAL_DB_READERS", "4"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS interviews (
+    id TEXT PRIMARY KEY,
+    session_id TEXT UNIQUE NOT NULL,
+    interview_type TEXT NOT NULL DEFAULT 'technical',
+    status TEXT NOT NULL DEFAULT 'in_progress',
+    topics TEXT DEFAULT '[]',
+    total_questions INTEGER DEFAULT 0,
+    completed_questions INTEGER DEFAULT 0,
+    current_question_index INTEGER DEFAULT 0,
+    average_score INTEGER DEFAULT NULL,
+    individual_scores TEXT DEFAULT '[]',
+    duration INTEGER DEFAULT 0,
+    start_time TEXT DEFAULT NULL,
+    end_time TEXT DEFAULT NULL,
+    final_results TEXT DEFAULT '{}',
+    completion_method TEXT DEFAULT 'automatic',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS question_responses (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES interviews(session_id) ON DELETE CASCADE,
+    question_index INTEGER NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    question_text TEXT NOT NULL DEFAULT '',
+    user_response TEXT DEFAULT NULL,
+    code_submission TEXT DEFAULT NULL,
+    score INTEGER DEFAULT NULL,
+    feedback TEXT DEFAULT NULL,
+    time_taken INTEGER DEFAULT NULL,
+    hints_used INTEGER DEFAULT 0,
+    difficulty TEXT DEFAULT 'medium',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_interviews_status ON interviews(status);
+CREATE INDEX IF NOT EXISTS idx_interviews_completion_method ON interviews(completion_method);
+CREATE INDEX IF NOT EXISTS idx_interviews_created_at_id ON interviews(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_question_responses_question_index ON question_responses(session_id, question_index);
+CREATE INDEX IF NOT EXISTS idx_question_responses_created_at ON question_responses(created_at DESC);
+"""
+
+# Analytics rollups (see SUPABASE_SCHEMA.sql): each interview row's contribution to every
+# interview_stats counter, with {r} standing for the row (NEW, OLD, or the table in a rebuild)
+_STATUS = ("(CASE WHEN {r}.completion_method = 'manually_ended' THEN 'manually_ended' "
+           "WHEN {r}.completion_method = 'timeout_cleanup' THEN 'timeout' "
+           "WHEN {r}.average_score IS NULL THEN 'in_progress' "
+           "WHEN {r}.average_score >= 70 THEN 'approved' ELSE 'rejected' END)")
+_SCORE = "COALESCE({r}.average_score, 0)"
+# Whole minutes rounded half to even like Python's round() in format_interview_data
+# (SQL ROUND goes half away from zero, which would count a 30 s interview as a minute)
+_EXACT_MINUTES = "(COALESCE({r}.duration, 0) / 60.0)"
+_MINUTES = (f"CAST(CASE WHEN {_EXACT_MINUTES} - CAST({_EXACT_MINUTES} AS INTEGER) = 0.5 "
+            f"THEN 2 * ROUND({_EXACT_MINUTES} / 2) ELSE ROUND({_EXACT_MINUTES}) END AS INTEGER)")
+_STATS_TERMS = {
+    "total": "1",
+    "approved": f"{_STATUS} = 'approved'",
+    "rejected": f"{_STATUS} = 'rejected'",
+    "manually_ended": f"{_STATUS} = 'manually_ended'",
+    "timeout": f"{_STATUS} = 'timeout'",
+    "in_progress": f"{_STATUS} = 'in_progress'",
+    "scored": f"{_SCORE} > 0",
+    "score_sum": f"({_SCORE} > 0) * {_SCORE}",
+    "score_sum_sq": f"({_SCORE} > 0) * {_SCORE} * {_SCORE}",
+    "timed": f"{_MINUTES} > 0",
+    "duration_minutes_sum": f"({_MINUTES} > 0) * {_MINUTES}",
+    "efficiency_sum": f"CASE WHEN {_MINUTES} > 0 THEN 1.0 * {_SCORE} / {_MINUTES} ELSE 0 END",
+    "questions_completed": "COALESCE({r}.completed_questions, 0)",
+    "questions_expected": "COALESCE({r}.total_questions, 0)",
+    "score_0_20": f"{_SCORE} <= 20",
+    "score_21_40": f"{_SCORE} > 20 AND {_SCORE} <= 40",
+    "score_41_60": f"{_SCORE} > 40 AND {_SCORE} <= 60",
+    "score_61_80": f"{_SCORE} > 60 AND {_SCORE} <= 80",
+    "score_81_100": f"{_SCORE} > 80",
+}
+assert tuple(_STATS_TERMS) == INTERVIEW_STATS_FIELDS
+# Stored as PRAGMA user_version: bump it when a term changes so existing files get new triggers and a rebuild
+_STATS_VERSION = 2
+_STATS_TRIGGERS = ("interviews_stats_insert", "interviews_stats_delete", "interviews_stats_update")
+
+
+def _stats_delta(row: str, sign: str) -> str:
+    """Trigger statements adding (sign "+") or removing (sign "-") one row's contribution"""
+    score = _SCORE.format(r=row)
+    counters = ", ".join(f"{c} = {c} {sign} ({term.format(r=row)})" for c, term in _STATS_TERMS.items())
+    statements = [
+        "INSERT INTO interview_stats (id) VALUES (1) ON CONFLICT(id) DO NOTHING",
+        f"UPDATE interview_stats SET {counters}, updated_at = datetime('now') WHERE id = 1",
+    ]
+    occurrences = f"(SELECT COUNT(*) FROM json_each({row}.topics) WHERE value = interview_topic_stats.topic)"
+    in_row = f"{score} > 0 AND topic IN (SELECT value FROM json_each({row}.topics))"
+    if sign == "+":
+        statements.append(
+            "INSERT INTO interview_topic_stats (topic, attempts, score_sum, min_score, max_score) "
+            f"SELECT value, COUNT(*), COUNT(*) * {score}, {score}, {score} FROM json_each({row}.topics) "
+            f"WHERE {score} > 0 GROUP BY value "
+            "ON CONFLICT(topic) DO UPDATE SET attempts = attempts + excluded.attempts, "
+            "score_sum = score_sum + excluded.score_sum, min_score = MIN(min_score, excluded.min_score), "
+            "max_score = MAX(max_score, excluded.max_score)"
+        )
+    else:
+        topic_scores = ("FROM interviews i, json_each(i.topics) t "
+                        "WHERE t.value = interview_topic_stats.topic AND i.average_score > 0")
+        statements += [
+            f"UPDATE interview_topic_stats SET attempts = attempts - {occurrences}, "
+            f"score_sum = score_sum - {occurrences} * {score} WHERE {in_row}",
+            "DELETE FROM interview_topic_stats WHERE attempts <= 0",
+            # Min/max can't be subtracted: recompute them only where the removed score was the extreme
+            f"UPDATE interview_topic_stats SET min_score = (SELECT MIN(i.average_score) {topic_scores}), "
+            f"max_score = (SELECT MAX(i.average_score) {topic_scores}) "
+            f"WHERE {in_row} AND (min_score = {score} OR max_score = {score})",
+        ]
+    return "".join(f"    {statement};\n" for statement in statements)
+
+
+_STATS_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS interview_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    {''.join(f"{c} {'REAL' if c == 'efficiency_sum' else 'INTEGER'} NOT NULL DEFAULT 0, " for c in _STATS_TERMS)}
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS interview_topic_stats (
+    topic TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    score_sum INTEGER NOT NULL DEFAULT 0,
+    min_score INTEGER,
+    max_score INTEGER
+);
+CREATE TRIGGER IF NOT EXISTS interviews_stats_insert AFTER INSERT ON interviews BEGIN
+{_stats_delta("NEW", "+")}END;
+CREATE TRIGGER IF NOT EXISTS interviews_stats_delete AFTER DELETE ON interviews BEGIN
+{_stats_delta("OLD", "-")}END;
+CREATE TRIGGER IF NOT EXISTS interviews_stats_update AFTER UPDATE ON interviews
+WHEN OLD.average_score IS NOT NEW.average_score OR OLD.completion_method IS NOT NEW.completion_method
+  OR OLD.duration IS NOT NEW.duration OR OLD.completed_questions IS NOT NEW.completed_questions
+  OR OLD.total_questions IS NOT NEW.total_questions OR OLD.topics IS NOT NEW.topics
+BEGIN
+{_stats_delta("OLD", "-")}{_stats_delta("NEW", "+")}END;
+"""
+
+
+def _rebuild_stats(conn: sqlite3.Connection) -> int:
+    """Recompute the rollups from the interviews table (inside the caller's write transaction)"""
+    conn.execute("DELETE FROM interview_topic_stats")
+    conn.execute("DELETE FROM interview_stats")
+    sums = ", ".join(f"COALESCE(SUM({term.format(r='i')}), 0)" for term in _STATS_TERMS.values())
+    conn.execute(f"INSERT INTO interview_stats (id, {', '.join(_STATS_TERMS)}, updated_at) "
+                 f"SELECT 1, {sums}, datetime('now') FROM interviews i")
+    conn.execute(
+        "INSERT INTO interview_topic_stats (topic, attempts, score_sum, min_score, max_score) "
+        "SELECT t.value, COUNT(*), SUM(i.average_score), MIN(i.average_score), MAX(i.average_score) "
+        "FROM interviews i, json_each(i.topics) t WHERE i.average_score > 0 GROUP BY t.value"
+    )
+    return conn.execute("SELECT total FROM interview_stats").fetchone()[0]
+
+
+_JSON_COLUMNS = {"topics": [], "individual_scores": [], "final_results": {}}
+
+
+def _sql_columns(columns: str, include_final_results: bool = False) -> str:
+    """SELECT list: ``columns`` plus the summary fields, and final_results if asked for"""
+    summary = ", ".join(f"json_extract(final_results, '$.{field}') AS {field}" for field in INTERVIEW_SUMMARY_FIELDS)
+    return f"{columns.replace(',', ', ')}, {summary}" + (", final_results" if include_final_results else "")
+
+
+def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+    data = dict(row)
+    for column, empty in _JSON_COLUMNS.items():
+        if column in data:
+            data[column] = json.loads(data[column]) if data[column] else empty
+    return data
+
+
+_SQL_OPS = {"eq": "=", "lt": "<", "lte": "<=", "gt": ">", "gte": ">="}
+
+
+def _sql_condition(node: tuple, args: list) -> str:
+    """Render an ``interview_filter`` condition tree as a SQL predicate."""
+    if node[0] in ("and", "or"):
+        return "(" + f" {node[0].upper()} ".join(_sql_condition(child, args) for child in node[1]) + ")"
+    column, op, value = node
+    if op == "is_null":
+        return f"{column} IS NULL"
+    if op == "not_in":
+        args.extend(value)
+        return f"{column} NOT IN ({', '.join('?' * len(value))})"
+    args.append(value)
+    return f"{column} {_SQL_OPS[op]} ?"
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class SQLiteInterviewDatabase(InterviewDatabase):
+    """InterviewDatabase over a local SQLite file in WAL mode."""
+
+    def __init__(self, path: str = LOCAL_DB_PATH, readers: int = LOCAL_DB_READERS):
+        self.path = path
+        # Private in-memory databases can't be shared between connections; use a named shared one
+        self._uri = path.startswith("file:") or path == ":memory:"
+        if path == ":memory:":
+            self.path = f"file:codesage-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        self._local = threading.local()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._readers = ThreadPoolExecutor(max_workers=max(1, readers), thread_name_prefix="sqlite-reader")
+        # Keeps a shared in-memory database alive, and creates the schema
+        self._keepalive = self._connect()
+        self._keepalive.executescript(_SCHEMA)
+        stale = self._keepalive.execute("PRAGMA user_version").fetchone()[0] != _STATS_VERSION
+        if stale:
+            # Rollup terms changed since this file was created: replace the triggers
+            self._keepalive.executescript("".join(f"DROP TRIGGER IF EXISTS {t};\n" for t in _STATS_TRIGGERS))
+        self._keepalive.executescript(_STATS_SCHEMA)
+        if stale or self._keepalive.execute("SELECT COUNT(*) FROM interview_stats").fetchone()[0] == 0:
+            # First start with (these) rollups on an existing file: backfill them
+            self._keepalive.execute("BEGIN IMMEDIATE")
+            _rebuild_stats(self._keepalive)
+            self._keepalive.execute(f"PRAGMA user_version = {_STATS_VERSION}")
+            self._keepalive.execute("COMMIT")
+        self.reads = 0
+        self.writes = 0
+        self.read_us = 0.0
+        self.write_us = 0.0
+        print(f"✅ Local SQLite database ready: {path}")
+
+    @property
+    def configured(self) -> bool:
+        return True
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, uri=self._uri, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    async def _run(self, write: bool, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        def call():
+            started = time.perf_counter()
+            conn = self._conn()
+            if not write:
+                return fn(conn), started
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+                conn.execute("COMMIT")
+                return result, started
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        result, started = await asyncio.get_running_loop().run_in_executor(
+            self._writer if write else self._readers, call
+        )
+        elapsed = (time.perf_counter() - started) * 1e6
+        if write:
+            self.writes += 1
+            self.write_us += elapsed
+        else:
+            self.reads += 1
+            self.read_us += elapsed
+        return result
+
+    @staticmethod
+    def _session_values(session_data: Dict[str, Any]) -> Dict[str, Any]:
+        start_time = session_data.get("start_time")
+        if isinstance(start_time, (int, float)):
+            start_time = datetime.fromtimestamp(start_time).isoformat()
+        return {
+            "interview_type": session_data.get("interview_type", "technical"),
+            "topics": json.dumps(session_data.get("topics", [])),
+            "start_time": start_time,
+            "total_questions": session_data.get("total_questions", 0),
+            # 1-based in the DB, as in the Supabase backend
+            "current_question_index": session_data.get("current_question_index", 0) + 1,
+            "created_at": session_data.get("created_at") or _now(),
+        }
+
+    @staticmethod
+    def _insert_session(conn: sqlite3.Connection, session_id: str, values: Dict[str, Any]) -> str:
+        # Insert-only, as in the Supabase backend: a replayed create leaves an existing row alone
+        conn.execute(
+            "INSERT INTO interviews (id, session_id, interview_type, topics, start_time, total_questions, "
+            "current_question_index, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 'in_progress', ?, ?) "
+            "ON CONFLICT(session_id) DO NOTHING",
+            (str(uuid.uuid4()), session_id, values["interview_type"], values["topics"], values["start_time"],
+             values["total_questions"], values["current_question_index"], values["created_at"], _now()),
+        )
+        return conn.execute("SELECT id FROM interviews WHERE session_id = ?", (session_id,)).fetchone()["id"]
+
+    @staticmethod
+    def _insert_responses(conn: sqlite3.Connection, rows: List[Dict[str, Any]]) -> int:
+        now = _now()
+        cursor = conn.executemany(
+            "INSERT INTO question_responses (id, session_id, question_index, idempotency_key, question_text, "
+            "user_response, score, feedback, time_taken, hints_used, difficulty, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(idempotency_key) DO NOTHING",
+            [(str(uuid.uuid4()), r["session_id"], int(r["question_index"]), r.get("idempotency_key"),
+              r.get("question_text") or "", r.get("user_response"), r.get("score"), r.get("feedback"),
+              r.get("time_taken"), r.get("hints_used") or 0, r.get("difficulty") or "medium",
+              r.get("created_at") or now, now) for r in rows],
+        )
+        return cursor.rowcount
+
+    async def create_interview_session(self, session_data: Dict[str, Any]) -> Optional[str]:
+        """Create a new interview session record"""
+        values = self._session_values(session_data)
+        try:
+            interview_id = await self._run(
+                True, lambda conn: self._insert_session(conn, session_data.get("session_id"), values)
+            )
+            print(f"✅ Interview session created with ID: {interview_id}")
+            return interview_id
+        except Exception as e:
+            print(f"❌ Error creating interview session: {e}")
+            return None
+
+    async def update_interview_progress(self, session_id: str, progress_data: Dict[str, Any]) -> bool:
+        """Update interview progress"""
+        update_data = {}
+        if "current_question_index" in progress_data:
+            update_data["current_question_index"] = int(progress_data["current_question_index"]) + 1
+        if "completed_questions" in progress_data:
+            update_data["completed_questions"] = progress_data["completed_questions"]
+        if not update_data:
+            return False
+        update_data["updated_at"] = _now()
+        assignments = ", ".join(f"{column} = ?" for column in update_data)
+        try:
+            changed = await self._run(True, lambda conn: conn.execute(
+                f"UPDATE interviews SET {assignments} WHERE session_id = ?", (*update_data.values(), session_id)
+            ).rowcount)
+            return changed > 0
+        except Exception as e:
+            print(f"❌ Error updating interview progress: {e}")
+            return False
+
+    async def complete_interview(self, session_id: str, results_data: Dict[str, Any],
+                                 session_data: Optional[Dict[str, Any]] = None,
+                                 responses: Optional[List[Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+        """Create if missing, insert responses and mark completed in one transaction"""
+        update_data = self.completion_row(results_data)
+        values = self._session_values(session_data) if session_data is not None else None
+
+        def complete(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+            if values is not None:
+                self._insert_session(conn, session_id, values)
+            exists = conn.execute("SELECT 1 FROM interviews WHERE session_id = ?", (session_id,)).fetchone()
+            if not exists:
+                return None
+            if responses:
+                self._insert_responses(conn, [{**r, "session_id": session_id} for r in responses])
+            conn.execute(
+                "UPDATE interviews SET status = 'completed', end_time = ?, duration = ?, completed_questions = ?, "
+                "average_score = ?, individual_scores = ?, final_results = ?, completion_method = ?, updated_at = ? "
+                "WHERE session_id = ?",
+                (update_data["end_time"], update_data["duration"], update_data["completed_questions"],
+                 update_data["average_score"], json.dumps(update_data["individual_scores"]),
+                 json.dumps(update_data["final_results"], default=str), update_data["completion_method"],
+                 update_data["updated_at"], session_id),
+            )
+            row = conn.execute("SELECT * FROM interviews WHERE session_id = ?", (session_id,)).fetchone()
+            return _decode(row)
+
+        try:
+            row = await self._run(True, complete)
+            if row:
+                print(f"✅ Interview completed successfully for session: {session_id}")
+            else:
+                print(f"❌ Session {session_id} not found in database!")
+            return row
+        except Exception as e:
+            print(f"❌ Error completing interview: {e}")
+            return None
+
+    async def diagnose_missing_session(self, session_id: str):
+        recent = await self._run(False, lambda conn: conn.execute(
+            "SELECT session_id, created_at FROM interviews ORDER BY created_at DESC LIMIT 5"
+        ).fetchall())
+        for r in recent:
+            print(f"   📝 {r['session_id']} - {r['created_at']}")
+
+    async def get_interview_results(self, session_id: str, include_final_results: bool = False) -> Optional[Dict[str, Any]]:
+        """Get interview results by session ID (the final_results payload only if asked for)"""
+        sql = f"SELECT {_sql_columns(INTERVIEW_COLUMNS, include_final_results)} FROM interviews WHERE session_id = ?"
+        row = await self._run(False, lambda conn: conn.execute(sql, (session_id,)).fetchone())
+        if row is None:
+            print(f"❌ No interview found for session: {session_id}")
+            return None
+        return _format_interview(_decode(row))
+
+    async def get_all_interviews(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get all interview records with optional limit"""
+        rows = await self._run(False, lambda conn: conn.execute(
+            f"SELECT {_sql_columns(INTERVIEW_LIST_COLUMNS)} FROM interviews ORDER BY created_at DESC LIMIT ?", (limit,)
+        ).fetchall())
+        return [_decode(r) for r in rows]
+
+    async def list_interviews(self, limit: int = 50, cursor: Optional[str] = None, offset: int = 0,
+                              include_final_results: bool = False, **filters) -> Dict[str, Any]:
+        """One page of interviews, newest first; keyset pagination on (created_at, id)"""
+        sql, args = self._keyset_sql("interviews", _sql_columns(INTERVIEW_LIST_COLUMNS, include_final_results),
+                                     interview_filter(cursor=cursor, **filters))
+        rows = await self._run(False, lambda conn: conn.execute(sql, (*args, limit + 1, offset)).fetchall())
+        page = [_decode(r) for r in rows[:limit]]
+        return {"interviews": page, "next_cursor": encode_cursor(page[-1]) if len(rows) > limit else None}
+
+    @staticmethod
+    def _keyset_sql(table: str, select: str, conditions: List[tuple]) -> tuple:
+        """Newest-first query with LIMIT and OFFSET placeholders left for the caller"""
+        args: list = []
+        where = f"WHERE {' AND '.join(_sql_condition(c, args) for c in conditions)}" if conditions else ""
+        return f"SELECT {select} FROM {table} {where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?", args
+
+    async def _iter_newest_first(self, table: str, select: str, conditions: List[tuple],
+                                 page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        cursor = None
+        while True:
+            where = conditions + [cursor_condition(cursor)] if cursor else conditions
+            sql, args = self._keyset_sql(table, select, where)
+            rows = await self._run(False, lambda conn: conn.execute(sql, (*args, page_size, 0)).fetchall())
+            page = [_decode(r) for r in rows]
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            cursor = encode_cursor(page[-1])
+
+    async def iter_interviews(self, page_size: int = 500, include_final_results: bool = False,
+                              columns: str = INTERVIEW_LIST_COLUMNS, **filters) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Every matching interview, newest first, one page at a time (keyset pagination)"""
+        select = _sql_columns(columns, include_final_results)
+        async for page in self._iter_newest_first("interviews", select, interview_filter(**filters), page_size):
+            yield page
+
+    async def iter_question_responses(self, page_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Every question_responses row, newest first, one page at a time"""
+        async for page in self._iter_newest_first("question_responses", "*", [], page_size):
+            yield page
+
+    async def get_interview_stats(self) -> Optional[Dict[str, Any]]:
+        """Analytics rollups over every interview, kept current by triggers"""
+        def read(conn: sqlite3.Connection):
+            totals = conn.execute("SELECT * FROM interview_stats WHERE id = 1").fetchone()
+            topics = conn.execute("SELECT * FROM interview_topic_stats").fetchall()
+            return _interview_stats(dict(totals) if totals else None, [dict(t) for t in topics])
+
+        try:
+            return await self._run(False, read)
+        except Exception as e:
+            print(f"❌ Error getting interview stats: {e}")
+            return None
+
+    async def rebuild_interview_stats(self) -> Optional[int]:
+        """Recompute the rollups from the interviews table"""
+        try:
+            return await self._run(True, _rebuild_stats)
+        except Exception as e:
+            print(f"❌ Failed to rebuild interview stats: {e}")
+            return None
+
+    async def store_question_responses(self, rows: List[Dict[str, Any]]) -> bool:
+        """Insert several question_responses rows in one transaction"""
+        if not rows:
+            return False
+        try:
+            await self._run(True, lambda conn: self._insert_responses(conn, rows))
+            return True
+        except Exception as e:
+            print(f"❌ Error storing question responses: {e}")
+            return False
+
+    async def get_question_responses(self, session_id: str) -> List[Dict[str, Any]]:
+        """Get all question responses for a session"""
+        rows = await self._run(False, lambda conn: conn.execute(
+            "SELECT * FROM question_responses WHERE session_id = ? ORDER BY question_index", (session_id,)
+        ).fetchall())
+        return [dict(r) for r in rows]
+
+    async def aclose(self):
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "reads": self.reads,
+            "writes": self.writes,
+            "avg_read_us": round(self.read_us / self.reads, 1) if self.reads else 0.0,
+            "avg_write_us": round(self.write_us / self.writes, 1) if self.writes else 0.0,
+        }
@@ -0,0 +1,231 @@
+"""
+Durable local outbox for database writes.
+
+Every interview write (session create, progress, question response,
+completion) is appended here before it is sent to Supabase, so a slow or
+unreachable database never loses data. It is an append-only SQLite table in
+WAL mode: an append is a single local transaction (well under a
+millisecond), and entries are deleted only after the remote write is
+acknowledged.
+
+``WriteBehindQueue`` (write_behind.py) is the replayer. It reads due
+entries in sequence order and applies them with per-entry backoff. Each
+entry's ``key`` doubles as the idempotency key sent to the database, so
+replaying a write whose acknowledgement was lost doesn't duplicate it.
+
+An entry that still fails after ``OUTBOX_MAX_ATTEMPTS`` tries (a row the
+database keeps rejecting) is moved to the ``outbox_dead`` table, so it
+stops blocking its session's later writes. Dead letters are kept, not
+dropped: ``requeue_dead`` puts them back once the cause is fixed.
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+DB_OUTBOX_PATH = os.getenv("DB_OUTBOX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".outbox.sqlite3"))
+OUTBOX_BACKOFF_BASE_S = float(os.getenv("OUTBOX_BACKOFF_BASE_S", "1"))
+OUTBOX_BACKOFF_MAX_S = float(os.getenv("OUTBOX_BACKOFF_MAX_S", "60"))
+# At the maximum backoff, 50 attempts is roughly 45 minutes of retrying
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "50"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    op TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_session ON outbox(session_id, seq);
+CREATE TABLE IF NOT EXISTS outbox_dead (
+    seq INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    op TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_error TEXT,
+    died_at REAL NOT NULL
+);
+"""
+
+
+class OutboxEntry:
+    __slots__ = ("seq", "key", "op", "session_id", "payload", "attempts", "next_attempt", "created_at")
+
+    def __init__(self, seq, key, op, session_id, payload, attempts, next_attempt, created_at):
+        self.seq = seq
+        self.key = key
+        self.op = op
+        self.session_id = session_id
+        self.payload: Dict[str, Any] = json.loads(payload)
+        self.attempts = attempts
+        self.next_attempt = next_attempt
+        self.created_at = created_at
+
+
+class Outbox:
+    """Append-only SQLite queue of pending writes, ordered by ``seq``."""
+
+    def __init__(self, path: str = DB_OUTBOX_PATH, backoff_base: float = OUTBOX_BACKOFF_BASE_S,
+                 backoff_max: float = OUTBOX_BACKOFF_MAX_S, max_attempts: int = OUTBOX_MAX_ATTEMPTS):
+        self.path = path
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: durable across process crashes, fsync only at checkpoints
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.appended = 0
+        self.acked = 0
+        self.failures = 0
+        self.dead = 0
+
+    def append(self, op: str, session_id: str, payload: Dict[str, Any], key: Optional[str] = None,
+               replace_pending: bool = False) -> str:
+        """Durably record a write; returns its idempotency key.
+
+        With ``replace_pending``, earlier entries of the same op for the session
+        are dropped first (last write wins).
+        """
+        key = key or uuid.uuid4().hex
+        body = json.dumps(payload, default=str)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if replace_pending:
+                    self._conn.execute("DELETE FROM outbox WHERE op = ? AND session_id = ?", (op, session_id))
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO outbox (key, op, session_id, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, op, session_id, body, time.time()),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.appended += 1
+        return key
+
+    def due(self, session_id: Optional[str] = None, force: bool = False, limit: int = 1000) -> List[OutboxEntry]:
+        """Entries ready to apply, in order.
+
+        A session whose earliest pending entry is still backing off is skipped
+        entirely, so its later writes never overtake it. ``force`` ignores
+        backoff (used when a session completes).
+        """
+        sql = "SELECT seq, key, op, session_id, payload, attempts, next_attempt, created_at FROM outbox"
+        args: tuple = ()
+        if session_id is not None:
+            sql += " WHERE session_id = ?"
+            args = (session_id,)
+        sql += " ORDER BY seq LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, args + (limit,)).fetchall()
+        now = time.time()
+        blocked = set()
+        entries = []
+        for row in rows:
+            entry = OutboxEntry(*row)
+            if entry.session_id in blocked:
+                continue
+            if not force and entry.next_attempt > now:
+                blocked.add(entry.session_id)
+                continue
+            entries.append(entry)
+        return entries
+
+    def ack(self, entries: List[OutboxEntry]):
+        if not entries:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM outbox WHERE key = ?", [(e.key,) for e in entries])
+            self.acked += len(entries)
+
+    def fail(self, entries: List[OutboxEntry], error: str = ""):
+        """Schedule a retry with exponential backoff and jitter, or dead-letter after max_attempts."""
+        if not entries:
+            return
+        now = time.time()
+        updates = []
+        dead = [e for e in entries if e.attempts + 1 >= self.max_attempts]
+        for e in entries:
+            if e in dead:
+                continue
+            delay = min(self.backoff_max, self.backoff_base * (2 ** e.attempts)) * random.uniform(0.5, 1.0)
+            updates.append((now + delay, error[:500], e.key))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "UPDATE outbox SET attempts = attempts + 1, next_attempt = ?, last_error = ? WHERE key = ?",
+                    updates,
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO outbox_dead "
+                    "(seq, key, op, session_id, payload, attempts, created_at, last_error, died_at) "
+                    "SELECT seq, key, op, session_id, payload, attempts + 1, created_at, ?2, ?1 "
+                    "FROM outbox WHERE key = ?3",
+                    [(now, error[:500], e.key) for e in dead],
+                )
+                self._conn.executemany("DELETE FROM outbox WHERE key = ?", [(e.key,) for e in dead])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.failures += len(entries)
+            self.dead += len(dead)
+        for e in dead:
+            print(f"⚠️ Outbox {e.op} for session {e.session_id} failed {e.attempts + 1} times "
+                      f"({error}); moved to outbox_dead")
+
+    def requeue_dead(self, session_id: Optional[str] = None) -> int:
+        """Move dead letters (all, or one session's) back into the outbox for another round of retries."""
+        where, args = ("WHERE session_id = ?", (session_id,)) if session_id is not None else ("", ())
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                moved = self._conn.execute(
+                    "INSERT OR IGNORE INTO outbox (seq, key, op, session_id, payload, attempts, next_attempt, created_at, "
+                    f"last_error) SELECT seq, key, op, session_id, payload, 0, 0, created_at, last_error FROM outbox_dead {where}",
+                    args,
+                ).rowcount
+                self._conn.execute(f"DELETE FROM outbox_dead {where}", args)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return moved
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending, oldest, retrying = self._conn.execute(
+                "SELECT COUNT(*), MIN(created_at), SUM(attempts > 0) FROM outbox"
+            ).fetchone()
+            dead_letters = self._conn.execute("SELECT COUNT(*) FROM outbox_dead").fetchone()[0]
+        return {
+            "path": self.path,
+            "pending": pending,
+            "retrying": retrying or 0,
+            "oldest_pending_s": round(time.time() - oldest, 1) if oldest else 0.0,
+            "appended": self.appended,
+            "acked": self.acked,
+            "failed_attempts": self.failures,
+            "dead_letters": dead_letters,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,321 @@
+"""
+Full-duplex CLI interview (``python interview.py``, mode 3).
+
+``run_interview`` records, transcribes, asks the LLM and speaks strictly one
+step after another. Here those stages overlap:
+
+    capture thread  the microphone stays open; VAD + endpointer split turns, and
+                    long answers are sent to STT segment by segment at pauses
+                    while the candidate is still talking
+    STT pool        transcribes segments as they arrive
+    main thread     joins segment transcripts, corrects jargon, asks the LLM
+    player thread   speaks hints and questions (prefetched TTS); stops the
+                    moment the candidate starts talking (barge-in)
+
+Every turn prints wall time per stage.
+
+There is no echo cancellation: while audio is playing, barge-in needs a few
+frames of loud speech, but headphones are still recommended.
+"""
+import io
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+import pyaudio
+import sounddevice as sd
+import soundfile as sf
+import webrtcvad
+
+import interview
+from fast_path import classify_intent
+from interview import respond, transcribe_pcm, transcript_is_valid
+from lexicon import lexicon_for
+from transcription import CHUNK_WORKERS, is_transcription_error, merge_transcripts, trim_silence
+from tts import tts_service
+from utils import CHANNELS, FORMAT, FRAME_SIZE, SAMPLE_RATE, AudioRingBuffer, build_interviewer_prompt, make_endpointer
+
+# Send what has been said so far to STT once this much is buffered and the candidate pauses
+PIPELINE_SEGMENT_SECONDS = float(os.getenv("PIPELINE_SEGMENT_SECONDS", "6"))
+PIPELINE_SEGMENT_PAUSE_FRAMES = int(os.getenv("PIPELINE_SEGMENT_PAUSE_FRAMES", "10"))
+# While the interviewer is talking, this many consecutive loud speech frames count as barge-in
+BARGE_IN_FRAMES = int(os.getenv("BARGE_IN_FRAMES", "8"))
+BARGE_IN_MIN_RMS = float(os.getenv("BARGE_IN_MIN_RMS", "900"))
+# Blips shorter than this are treated as noise, not a turn
+MIN_TURN_SECONDS = 0.3
+
+
+class Turn:
+    """One candidate utterance and the timing of each stage that handles it."""
+
+    def __init__(self):
+        self.segments: List[Future] = []
+        self.samples = 0
+        self.timings = {"speech_start": time.perf_counter()}
+        self.pending_audio = 0
+        self.interrupted = False
+
+    def mark(self, stage: str):
+        self.timings[stage] = time.perf_counter()
+
+    def report(self) -> dict:
+        t = self.timings
+
+        def ms(start: str, end: str) -> Optional[int]:
+            return round((t[end] - t[start]) * 1000) if start in t and end in t else None
+
+        return {
+            "speech_ms": ms("speech_start", "speech_end"),
+            "endpoint_ms": t.get("endpoint_ms"),
+            "stt_after_speech_ms": ms("speech_end", "transcript"),
+            "llm_ms": ms("transcript", "reply"),
+            "tts_wait_ms": round(t.get("tts_wait", 0) * 1000),
+            "response_ms": ms("speech_end", "first_audio"),
+            "playback_ms": ms("first_audio", "audio_done"),
+            "segments": len(self.segments),
+            "interrupted": self.interrupted,
+        }
+
+
+class Player(threading.Thread):
+    """Plays queued phrases; ``interrupt()`` stops the current one and drops the rest."""
+
+    def __init__(self):
+        super().__init__(name="interview-player", daemon=True)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._generation = 0
+        self._playing = threading.Event()
+        self.interruptions = 0
+
+    def speak(self, text: str, turn: Optional[Turn] = None):
+        if not text.strip():
+            return
+        if turn is not None:
+            turn.pending_audio += 1
+        # Synthesis starts now, in the background; playback waits only if it isn't done yet
+        self._queue.put((text, tts_service.prefetch(text), turn, self._generation))
+
+    def is_playing(self) -> bool:
+        return self._playing.is_set()
+
+    def interrupt(self):
+        if self._playing.is_set() or not self._queue.empty():
+            self._generation += 1
+            self.interruptions += 1
+            print("✋ Barge-in: stopping playback")
+
+    def stop(self):
+        self._generation += 1
+        self._queue.put(None)
+
+    def wait_idle(self):
+        while self._playing.is_set() or not self._queue.empty():
+            time.sleep(0.05)
+
+    def _finish(self, turn: Optional[Turn], interrupted: bool):
+        if turn is None:
+            return
+        turn.interrupted = turn.interrupted or interrupted
+        turn.pending_audio -= 1
+        if turn.pending_audio <= 0 or interrupted:
+            turn.mark("audio_done")
+
+    def run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            text, audio, turn, generation = item
+            if generation != self._generation:
+                self._finish(turn, True)
+                continue
+            waited = time.perf_counter()
+            try:
+                data, sr = sf.read(io.BytesIO(audio.result()), dtype="float32")
+            except Exception as e:
+                print(f"TTS error: {e}")
+                self._finish(turn, False)
+                continue
+            if turn is not None:
+                turn.timings["tts_wait"] = turn.timings.get("tts_wait", 0) + time.perf_counter() - waited
+                turn.timings.setdefault("first_audio", time.perf_counter())
+            if generation != self._generation:
+                self._finish(turn, True)
+                continue
+            self._playing.set()
+            sd.play(data, sr)
+            interrupted = False
+            try:
+                while sd.get_stream().active:
+                    if generation != self._generation:
+                        sd.stop()
+                        interrupted = True
+                        break
+                    time.sleep(0.02)
+            finally:
+                self._playing.clear()
+            self._finish(turn, interrupted)
+
+
+class DuplexCapture(threading.Thread):
+    """Keeps the microphone open and emits finished ``Turn``s on ``turns``."""
+
+    def __init__(self, turns: "queue.Queue[Turn]", player: Player, stt_pool: ThreadPoolExecutor,
+                 prompt: Optional[str] = None, vad_aggressiveness: int = 1):
+        super().__init__(name="interview-capture", daemon=True)
+        self.turns = turns
+        self.player = player
+        self.stt_pool = stt_pool
+        self.prompt = prompt
+        self.vad = webrtcvad.Vad(vad_aggressiveness)
+        # Stricter while our own voice may be leaking into the microphone
+        self.playback_vad = webrtcvad.Vad(3)
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _submit(self, turn: Turn, audio: np.ndarray):
+        """Transcribe a finished segment in the background; the capture buffer is then reused."""
+        speech = trim_silence(audio, SAMPLE_RATE)
+        if len(speech) < MIN_TURN_SECONDS * SAMPLE_RATE:
+            return
+        pcm = np.array(speech)
+        turn.samples += len(pcm)
+        name = f"segment_{len(turn.segments)}"
+        turn.segments.append(self.stt_pool.submit(transcribe_pcm, pcm, SAMPLE_RATE, name, self.prompt))
+
+    def run(self):
+        p = pyaudio.PyAudio()
+        stream = p.open(format=FORMAT, channels=CHANNELS, rate=SAMPLE_RATE, input=True,
+                        frames_per_buffer=FRAME_SIZE)
+        ring = AudioRingBuffer()
+        endpointer = make_endpointer()
+        onset = deque(maxlen=BARGE_IN_FRAMES)
+        turn: Optional[Turn] = None
+        try:
+            while not self._stopped.is_set():
+                chunk = stream.read(FRAME_SIZE, exception_on_overflow=False)
+                playing = self.player.is_playing()
+                is_speech = (self.playback_vad if playing else self.vad).is_speech(chunk, SAMPLE_RATE)
+
+                if turn is None:
+                    if not is_speech:
+                        onset.clear()
+                        continue
+                    if playing:
+                        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+                        if np.sqrt(np.mean(samples * samples)) < BARGE_IN_MIN_RMS:
+                            onset.clear()
+                            continue
+                        onset.append(chunk)
+                        if len(onset) < BARGE_IN_FRAMES:
+                            continue
+                    else:
+                        onset.append(chunk)
+                    self.player.interrupt()
+                    turn = Turn()
+                    ring.clear()
+                    endpointer.reset()
+                    for frame in onset:
+                        ring.write(frame)
+                        endpointer.update(True)
+                    onset.clear()
+                    print("🗣️  Candidate speaking...")
+                    continue
+
+                if ring.remaining < FRAME_SIZE:
+                    # Long unbroken answer: transcribe what we have rather than overwrite it
+                    self._submit(turn, ring.view())
+                    ring.clear()
+                ring.write(chunk)
+                if endpointer.update(is_speech):
+                    turn.mark("speech_end")
+                    turn.timings["endpoint_ms"] = endpointer.report()["endpoint_delay_ms"]
+                    self._submit(turn, ring.view())
+                    ring.clear()
+                    if turn.segments:
+                        self.turns.put(turn)
+                    turn = None
+                elif (endpointer.silence_run >= PIPELINE_SEGMENT_PAUSE_FRAMES
+                      and len(ring) >= PIPELINE_SEGMENT_SECONDS * SAMPLE_RATE):
+                    # Candidate paused mid-answer: start transcribing what we have so far
+                    self._submit(turn, ring.view())
+                    ring.clear()
+        finally:
+            stream.stop_stream()
+            stream.close()
+            p.terminate()
+
+
+def _print_turn_report(turn: Turn):
+    r = turn.report()
+    stages = ", ".join(f"{k} {v}" for k, v in r.items() if v is not None and k not in ("segments", "interrupted"))
+    flag = " (interrupted)" if r["interrupted"] else ""
+    print(f"⏱️  Turn: {stages}, segments {r['segments']}{flag}")
+
+
+def run_pipelined_interview(topics: List[str]):
+    interview.INTERVIEWER_PROMPT = build_interviewer_prompt(topics)
+    lexicon = lexicon_for(topics)
+    tts_service.warm()
+
+    player = Player()
+    player.start()
+    stt_pool = ThreadPoolExecutor(max_workers=CHUNK_WORKERS, thread_name_prefix="stt-segment")
+    turns: "queue.Queue[Turn]" = queue.Queue()
+    capture = DuplexCapture(turns, player, stt_pool, prompt=lexicon.whisper_prompt)
+    capture.start()
+
+    conversation = []
+    previous: Optional[Turn] = None
+    player.speak("Hello, I'm CodeSage, your AI interviewer. Can you introduce yourself?")
+    try:
+        while True:
+            turn = turns.get()
+            if previous is not None:
+                _print_turn_report(previous)
+                previous = None
+
+            texts = [f.result() for f in turn.segments]
+            turn.mark("transcript")
+            candidate = merge_transcripts([t for t in texts if t and not is_transcription_error(t)])
+            if not transcript_is_valid(candidate) and classify_intent(candidate) is None:
+                print(f"Transcript invalid or unintelligible: '{candidate}'")
+                player.speak("I couldn't understand that. Could you repeat more clearly?")
+                continue
+
+            candidate = lexicon.correct(candidate)
+            print("Candidate:", candidate)
+            reply = respond(candidate, conversation)
+            turn.mark("reply")
+            if not reply.get("fast_path"):
+                conversation.append({"round": len(conversation), "candidate": candidate, **reply})
+
+            if reply.get("evaluation"):
+                print("🤖 Evaluation:", reply["evaluation"])
+            if reply.get("hint"):
+                print("🤖 Hint:", reply["hint"])
+                player.speak(reply["hint"], turn)
+            if reply.get("final_feedback"):
+                print("🤖 Final Feedback:", reply["final_feedback"])
+                player.speak("Thank you for the interview. Here is your final feedback.", turn)
+                player.wait_idle()
+                _print_turn_report(turn)
+                break
+            if reply.get("next_question"):
+                print("🤖 Next:", reply["next_question"])
+                player.speak(reply["next_question"], turn)
+            previous = turn
+    except KeyboardInterrupt:
+        print("\n⚠️  Interview stopped by user.")
+    finally:
+        capture.stop()
+        player.stop()
+        stt_pool.shutdown(wait=False)
+    print(f"🏁 {len(conversation)} answered turns, {player.interruptions} barge-ins")
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Rebuild the analytics rollups (interview_stats, interview_topic_stats)
+from the interviews table.
+
+Triggers keep the rollups current on every write, so this is only needed
+once after adding them to a database that already has interviews, or if
+rows were changed with the triggers disabled:
+
+    python rebuild_stats.py
+"""
+import asyncio
+import sys
+
+from database import db
+
+
+async def main() -> int:
+    try:
+        print("🔄 Rebuilding interview stats...")
+        total = await db.rebuild_interview_stats()
+        if total is None:
+            return 1
+        stats = await db.get_interview_stats() or {}
+        print(f"✅ Rebuilt stats over {total} interviews "
+              f"({stats.get('scored', 0)} scored, {len(stats.get('topics', []))} topics)")
+        return 0
+    finally:
+        await db.aclose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Parquet snapshots of the interview tables, for offline analytics.
+
+Ad-hoc questions (score trends per topic, which questions take longest,
+joins between interviews and their responses) shouldn't run against the
+database the live interviews write to. A snapshot copies ``interviews`` and
+``question_responses`` into Parquet files partitioned by month:
+
+    snapshots/20240601T120000Z/interviews/created_month=2024-06/part-0.parquet
+    snapshots/20240601T120000Z/question_responses/created_month=2024-06/part-0.parquet
+    snapshots/latest -> 20240601T120000Z
+
+DuckDB (or pandas, Polars, Spark) reads them directly:
+
+    SELECT created_month, count(*), avg(average_score)
+    FROM read_parquet('snapshots/latest/interviews/*/*.parquet', hive_partitioning = true)
+    GROUP BY 1 ORDER BY 1;
+
+A snapshot is written to a hidden staging directory and renamed into place
+when complete, so ``latest`` never points at a partial copy. The newest
+SNAPSHOT_KEEP snapshots are kept.
+
+Take one by hand with ``python snapshot.py``, or set SNAPSHOT_INTERVAL_HOURS
+to have the server take one periodically. Needs pyarrow.
+"""
+import asyncio
+import os
+import re
+import shutil
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from database import INTERVIEW_COLUMNS, InterviewDatabase, db
+from export import (INTERVIEW_ARROW_COLUMNS, RESPONSE_ARROW_COLUMNS, Pages, arrow_schema, pa, parse_timestamp,
+                    pq, require_pyarrow, write_row_group)
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots"))
+SNAPSHOT_INTERVAL_HOURS = float(os.getenv("SNAPSHOT_INTERVAL_HOURS", "0"))  # 0 = no periodic snapshots
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "3"))
+SNAPSHOT_PAGE_SIZE = int(os.getenv("SNAPSHOT_PAGE_SIZE", "5000"))
+
+_STAMP = re.compile(r"^\d{8}T\d{6}Z$")
+
+
+def _month(row: Dict[str, Any]) -> str:
+    created_at = parse_timestamp(row.get("created_at"))
+    return created_at.strftime("%Y-%m") if created_at else "unknown"
+
+
+async def _write_partitioned(pages: Pages, columns: Dict[str, str], directory: str) -> int:
+    """Write newest-first pages as ``directory/created_month=YYYY-MM/part-N.parquet``; returns the row count.
+
+    Rows arrive ordered by created_at, so each month's rows are contiguous and
+    only one file is open at a time. A month seen again (created_at strings in
+    mixed formats) gets another part file rather than overwriting the first.
+    """
+    schema = arrow_schema(columns)
+    parts: Dict[str, int] = {}
+    writer, month, written = None, None, 0
+    try:
+        async for page in pages:
+            start = 0
+            while start < len(page):
+                page_month = _month(page[start])
+                end = start + 1
+                while end < len(page) and _month(page[end]) == page_month:
+                    end += 1
+                if page_month != month:
+                    if writer is not None:
+                        await asyncio.to_thread(writer.close)
+                    month = page_month
+                    part = parts.get(month, 0)
+                    parts[month] = part + 1
+                    path = os.path.join(directory, f"created_month={month}")
+                    os.makedirs(path, exist_ok=True)
+                    writer = pq.ParquetWriter(os.path.join(path, f"part-{part}.parquet"), schema,
+                                              compression="zstd")
+                # Conversion and compression are CPU-bound: keep them off the event loop
+                await asyncio.to_thread(write_row_group, writer, page[start:end], columns)
+                written += end - start
+                start = end
+    finally:
+        if writer is not None:
+            await asyncio.to_thread(writer.close)
+    return written
+
+
+class SnapshotJob:
+    """Takes partitioned Parquet snapshots, on demand or every ``interval_hours``."""
+
+    def __init__(self, database: InterviewDatabase = db, root: str = SNAPSHOT_DIR,
+                 interval_hours: float = SNAPSHOT_INTERVAL_HOURS, keep: int = SNAPSHOT_KEEP,
+                 page_size: int = SNAPSHOT_PAGE_SIZE):
+        self.db = database
+        self.root = root
+        self.interval = interval_hours * 3600
+        self.keep = keep
+        self.page_size = page_size
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.snapshots = 0
+        self.failures = 0
+        self.last_snapshot: Optional[str] = None
+        self.last_rows: Dict[str, int] = {}
+        self.last_ms = 0.0
+
+    def start(self):
+        """Start periodic snapshots if SNAPSHOT_INTERVAL_HOURS is set (call from a running event loop)."""
+        if self.interval <= 0 or (self._task is not None and not self._task.done()):
+            return
+        if pa is None:
+            print("⚠️ SNAPSHOT_INTERVAL_HOURS is set but pyarrow is not installed; snapshots disabled")
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.take()
+            except Exception as e:
+                print(f"❌ Snapshot failed: {e}")
+
+    async def take(self) -> str:
+        """Write a complete snapshot and point ``latest`` at it; returns its directory."""
+        require_pyarrow()
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            started = time.perf_counter()
+            stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+            staging = os.path.join(self.root, f".{stamp}.partial")
+            final = os.path.join(self.root, stamp)
+            try:
+                rows = {
+                    "interviews": await _write_partitioned(
+                        self.db.iter_interviews(page_size=self.page_size, columns=INTERVIEW_COLUMNS),
+                        INTERVIEW_ARROW_COLUMNS, os.path.join(staging, "interviews")),
+                    "question_responses": await _write_partitioned(
+                        self.db.iter_question_responses(page_size=self.page_size),
+                        RESPONSE_ARROW_COLUMNS, os.path.join(staging, "question_responses")),
+                }
+                # Empty tables still get their directory, so every snapshot has the same layout
+                for table in rows:
+                    os.makedirs(os.path.join(staging, table), exist_ok=True)
+                os.replace(staging, final)
+            except BaseException:
+                self.failures += 1
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            self._point_latest(stamp)
+            self._prune()
+            self.snapshots += 1
+            self.last_snapshot = final
+            self.last_rows = rows
+            self.last_ms = (time.perf_counter() - started) * 1000
+            print(f"📦 Snapshot {stamp}: {rows['interviews']} interviews, "
+                  f"{rows['question_responses']} responses in {self.last_ms:.0f}ms")
+            return final
+
+    def _point_latest(self, stamp: str):
+        link = os.path.join(self.root, "latest")
+        staged = f"{link}.tmp"
+        try:
+            if os.path.lexists(staged):
+                os.remove(staged)
+            # Relative target so the snapshot directory can be moved or mounted elsewhere
+            os.symlink(stamp, staged, target_is_directory=True)
+            os.replace(staged, link)
+        except OSError as e:
+            print(f"⚠️ Could not update {link}: {e}")
+
+    def _prune(self):
+        stamps = sorted(name for name in os.listdir(self.root) if _STAMP.match(name))
+        for stamp in stamps[:-self.keep] if self.keep > 0 else []:
+            shutil.rmtree(os.path.join(self.root, stamp), ignore_errors=True)
+
+    async def close(self):
+        """Stop periodic snapshots (a snapshot in progress is abandoned and cleaned up)."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.interval > 0 and pa is not None,
+            "interval_hours": self.interval / 3600,
+            "snapshots": self.snapshots,
+            "failures": self.failures,
+            "last_snapshot": self.last_snapshot,
+            "last_rows": self.last_rows,
+            "last_ms": round(self.last_ms, 1),
+        }
+
+
+snapshot_job = SnapshotJob()
+
+
+async def main() -> int:
+    try:
+        print(f"📦 Writing snapshot to {snapshot_job.root}...")
+        path = await snapshot_job.take()
+        print(f"✅ Query it with DuckDB: read_parquet('{path}/interviews/*/*.parquet', hive_partitioning = true)")
+        return 0
+    except Exception as e:
+        print(f"❌ Snapshot failed: {e}")
+        return 1
+    finally:
+        await db.aclose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
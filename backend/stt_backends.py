@@ -0,0 +1,305 @@
+"""
+Pluggable speech-to-text engines.
+
+Every caller (the /transcribe_audio upload, the WebSocket record_audio
+handlers and the CLI loops) goes through ``stt_backend``, chosen with the
+STT_BACKEND environment variable:
+
+    groq   Groq Whisper over the pooled HTTP client (default)
+    local  int8 Whisper on CPU via faster-whisper, model loaded from STT_LOCAL_MODEL;
+           concurrent requests from different sessions are micro-batched
+    fake   canned transcripts with optional simulated latency, for tests and benchmarks
+
+All backends take mono int16 PCM plus an optional vocabulary prompt (see
+lexicon.py) and return text, or a ``[Transcription error ...]`` string on
+failure, like WhisperClient does.
+"""
+import asyncio
+import functools
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from transcription import (
+    CHUNK_MAX_SECONDS, CHUNKED_MIN_SECONDS, _merge_chunk_results, encode_for_upload, plan_chunks, resample,
+    transcribe_chunked, transcribe_chunked_async, whisper_client
+)
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
+STT_BACKEND = os.getenv("STT_BACKEND", "groq")
+STT_LOCAL_MODEL = os.getenv("STT_LOCAL_MODEL", "models/faster-whisper-small.en")
+STT_LOCAL_COMPUTE_TYPE = os.getenv("STT_LOCAL_COMPUTE_TYPE", "int8")
+STT_LOCAL_THREADS = int(os.getenv("STT_LOCAL_THREADS", str(os.cpu_count() or 4)))
+STT_BATCH_SIZE = int(os.getenv("STT_BATCH_SIZE", "8"))
+STT_BATCH_WAIT_MS = float(os.getenv("STT_BATCH_WAIT_MS", "25"))
+
+# Whisper sees audio in 30 s windows at 16 kHz
+_WHISPER_RATE = 16000
+_WHISPER_WINDOW_SECONDS = 30
+
+
+class STTBackend(ABC):
+    """Interface for speech-to-text engines; a backend missing a method fails at construction."""
+
+    name = "base"
+    model = ""
+
+    @property
+    def cache_id(self) -> str:
+        """Identifies the engine in transcript cache keys."""
+        return f"{self.name}:{self.model}"
+
+    @abstractmethod
+    async def transcribe(self, pcm: np.ndarray, sample_rate: int, name: str = "answer",
+                         prompt: Optional[str] = None) -> str:
+        ...
+
+    @abstractmethod
+    def transcribe_sync(self, pcm: np.ndarray, sample_rate: int, name: str = "answer",
+                        prompt: Optional[str] = None) -> str:
+        ...
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "model": self.model}
+
+    async def aclose(self):
+        pass
+
+
+class GroqBackend(STTBackend):
+    """Groq Whisper API: re-encoded uploads, chunked when long."""
+
+    name = "groq"
+
+    def __init__(self, client=whisper_client):
+        self.client = client
+        self.model = client.model
+
+    async def transcribe(self, pcm: np.ndarray, sample_rate: int, name: str = "answer",
+                         prompt: Optional[str] = None) -> str:
+        if len(pcm) / sample_rate > CHUNKED_MIN_SECONDS:
+            send = functools.partial(self.client.transcribe, prompt=prompt)
+            return await transcribe_chunked_async(pcm, sample_rate, send)
+        # FLAC/Opus encoding is CPU-bound: keep it off the event loop
+        upload = await asyncio.to_thread(encode_for_upload, pcm, sample_rate, name)
+        return await self.client.transcribe(*upload, prompt=prompt)
+
+    def transcribe_sync(self, pcm: np.ndarray, sample_rate: int, name: str = "answer",
+                        prompt: Optional[str] = None) -> str:
+        if len(pcm) / sample_rate > CHUNKED_MIN_SECONDS:
+            send = functools.partial(self.client.transcribe_sync, prompt=prompt)
+            return transcribe_chunked(pcm, sample_rate, send)
+        return self.client.transcribe_sync(*encode_for_upload(pcm, sample_rate, name), prompt=prompt)
+
+    def stats(self) -> dict:
+        return {**super().stats(), **self.client.stats()}
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class LocalWhisperBackend(STTBackend):
+    """int8 Whisper on CPU with cross-session micro-batching.
+
+    Requests are queued as ≤30 s clips (longer answers are split at pauses
+    first). A worker thread takes whatever has arrived within
+    ``STT_BATCH_WAIT_MS`` of the first request, up to ``STT_BATCH_SIZE`` clips,
+    and runs them through the encoder/decoder as one batch, so several
+    candidates answering at once share each forward pass instead of queueing
+    behind each other.
+    """
+
+    name = "local"
+
+    def __init__(self, model_path: str = STT_LOCAL_MODEL, compute_type: str = STT_LOCAL_COMPUTE_TYPE,
+                 cpu_threads: int = STT_LOCAL_THREADS, max_batch: int = STT_BATCH_SIZE,
+                 max_wait_ms: float = STT_BATCH_WAIT_MS):
+        self.model = os.path.basename(model_path.rstrip("/")) or model_path
+        self.model_path = model_path
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[Tuple[np.ndarray, Optional[str], Future, float]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._whisper = None
+        self._tokenizer = None
+        self._prompt: List[int] = []
+        self.batches = 0
+        self.clips = 0
+        self.audio_seconds = 0.0
+        self.compute_ms = 0.0
+        self.queue_ms = 0.0
+        self.max_batch_seen = 0
+
+    def _load(self):
+        if WhisperModel is None:
+            raise RuntimeError("faster-whisper not installed. Run: pip install faster-whisper")
+        print(f"🧠 Loading local Whisper model {self.model_path} ({self.compute_type}, {self.cpu_threads} threads)...")
+        self._whisper = WhisperModel(self.model_path, device="cpu", compute_type=self.compute_type,
+                                     cpu_threads=self.cpu_threads)
+        try:
+            from faster_whisper.tokenizer import Tokenizer
+            self._tokenizer = Tokenizer(self._whisper.hf_tokenizer, self._whisper.model.is_multilingual,
+                                        task="transcribe", language="en")
+            self._prompt = list(self._tokenizer.sot_sequence) + [self._tokenizer.no_timestamps]
+        except (ImportError, AttributeError) as e:
+            # Older faster-whisper: fall back to one transcribe() call per clip
+            print(f"⚠️ Batched decoding unavailable, transcribing clips one at a time: {e}")
+            self._tokenizer = None
+        print("✅ Local Whisper model loaded")
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="stt-local-batcher", daemon=True)
+                self._worker.start()
+
+    def submit(self, pcm: np.ndarray, sample_rate: int, prompt: Optional[str] = None) -> Future:
+        """Queue one clip (≤30 s) and return a future for its text."""
+        self._ensure_worker()
+        audio = resample(pcm, sample_rate, _WHISPER_RATE).astype(np.float32) / 32768.0
+        future: Future = Future()
+        self._queue.put((audio, prompt, future, time.perf_counter()))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            started = time.perf_counter()
+            try:
+                if self._whisper is None:
+                    self._load()
+                texts = self._decode_batch([audio for audio, _, _, _ in batch], [p for _, p, _, _ in batch])
+            except Exception as e:
+                print(f"❌ Local transcription error ({type(e).__name__}): {e}")
+                texts = [f"[Transcription error: {type(e).__name__} - {str(e)[:100]}]"] * len(batch)
+            self.batches += 1
+            self.clips += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.compute_ms += (time.perf_counter() - started) * 1000
+            for (audio, _, future, queued), text in zip(batch, texts):
+                self.audio_seconds += len(audio) / _WHISPER_RATE
+                self.queue_ms += (started - queued) * 1000
+                future.set_result(text)
+
+    def _prompt_tokens(self, prompt: Optional[str]) -> List[int]:
+        if not prompt:
+            return self._prompt
+        # Previous-context tokens go before the start-of-transcript sequence; Whisper keeps the last 223
+        context = self._tokenizer.encode(" " + prompt.strip())[-223:]
+        return [self._tokenizer.sot_prev] + context + self._prompt
+
+    def _decode_batch(self, clips: List[np.ndarray], prompts: List[Optional[str]]) -> List[str]:
+        if self._tokenizer is None:
+            texts = []
+            for audio, prompt in zip(clips, prompts):
+                segments, _ = self._whisper.transcribe(audio, language="en", beam_size=1, initial_prompt=prompt)
+                texts.append(" ".join(s.text.strip() for s in segments).strip())
+            return texts
+
+        from faster_whisper.audio import pad_or_trim
+        extractor = self._whisper.feature_extractor
+        features = np.stack([pad_or_trim(extractor(audio)) for audio in clips])
+        encoded = self._whisper.encode(features)
+        results = self._whisper.model.generate(encoded, [self._prompt_tokens(p) for p in prompts], beam_size=1,
+                                               max_length=448, suppress_blank=True)
+        eot = self._tokenizer.eot
+        return [self._tokenizer.decode([t for t in r.sequences_ids[0] if t < eot]).strip() for r in results]
+
+    async def transcribe(self, pcm: np.ndarray, sample_rate: int, name: str = "answer",
+                         prompt: Optional[str] = None) -> str:
+        futures = [self.submit(pcm[start:end], sample_rate, prompt) for start, end in self._clips(pcm, sample_rate)]
+        results = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+        return _merge_chunk_results(list(results))
+
+    def transcribe_sync(self, pcm: np.ndarray, sample_rate: int, name: str = "answer",
+                        prompt: Optional[str] = None) -> str:
+        futures = [self.submit(pcm[start:end], sample_rate, prompt) for start, end in self._clips(pcm, sample_rate)]
+        return _merge_chunk_results([f.result() for f in futures])
+
+    @staticmethod
+    def _clips(pcm: np.ndarray, sample_rate: int) -> List[Tuple[int, int]]:
+        if len(pcm) / sample_rate <= min(CHUNK_MAX_SECONDS, _WHISPER_WINDOW_SECONDS):
+            return [(0, len(pcm))]
+        return plan_chunks(pcm, sample_rate)
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "compute_type": self.compute_type,
+            "model_loaded": self._whisper is not None,
+            "batches": self.batches,
+            "clips": self.clips,
+            "avg_batch_size": round(self.clips / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "avg_queue_ms": round(self.queue_ms / self.clips, 1) if self.clips else 0.0,
+            "realtime_factor": round(self.audio_seconds / (self.compute_ms / 1000), 1) if self.compute_ms else 0.0,
+            "pending": self._queue.qsize(),
+        }
+
+
+class FakeBackend(STTBackend):
+    """Deterministic stand-in: returns ``text`` (or a description of the clip) after ``latency_ms``."""
+
+    name = "fake"
+    model = "fake"
+
+    def __init__(self, text: Optional[str] = None, latency_ms: float = 0.0):
+        self.text = text
+        self.latency = latency_ms / 1000
+        self.calls = 0
+
+    def _reply(self, pcm: np.ndarray, sample_rate: int) -> str:
+        self.calls += 1
+        return self.text if self.text is not None else f"fake transcript of {len(pcm) / sample_rate:.1f} seconds"
+
+    async def transcribe(self, pcm: np.ndarray, sample_rate: int, name: str = "answer",
+                         prompt: Optional[str] = None) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._reply(pcm, sample_rate)
+
+    def transcribe_sync(self, pcm: np.ndarray, sample_rate: int, name: str = "answer",
+                        prompt: Optional[str] = None) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._reply(pcm, sample_rate)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "calls": self.calls}
+
+
+_BACKENDS = {"groq": GroqBackend, "local": LocalWhisperBackend, "fake": FakeBackend}
+
+
+def make_stt_backend(name: Optional[str] = None) -> STTBackend:
+    """Build the backend called ``name`` (default: STT_BACKEND)."""
+    name = (name or STT_BACKEND).lower()
+    if name not in _BACKENDS:
+        print(f"⚠️ Unknown STT_BACKEND '{name}', using groq")
+        name = "groq"
+    return _BACKENDS[name]()
+
+
+stt_backend = make_stt_backend()
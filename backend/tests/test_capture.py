@@ -0,0 +1,63 @@
+import numpy as np
+
+import utils
+from utils import FRAME_SIZE, SAMPLE_RATE, AudioRingBuffer, capture_with_vad, make_endpointer
+
+
+class _AlwaysSpeech:
+    def __init__(self, aggressiveness):
+        pass
+
+    def is_speech(self, frame, sample_rate):
+        return True
+
+
+class _CountingStream:
+    """Frames whose samples are their own index, so the captured start can be checked."""
+
+    def __init__(self):
+        self.frames = 0
+
+    def read(self, n, exception_on_overflow=False):
+        frame = np.full(n, self.frames % 30000, dtype=np.int16)
+        self.frames += 1
+        return frame.tobytes()
+
+
+def test_long_answer_stops_at_the_buffer_instead_of_wrapping(monkeypatch):
+    monkeypatch.setattr(utils.webrtcvad, "Vad", _AlwaysSpeech)
+    buffer = AudioRingBuffer(max_seconds=3)
+    endpointer = make_endpointer()
+    stream = _CountingStream()
+
+    audio, heard = capture_with_vad(stream=stream, buffer=buffer, endpointer=endpointer, log_interval=3600)
+
+    assert heard
+    assert endpointer.report()["cut_off"]
+    assert len(audio) == buffer.capacity == 3 * SAMPLE_RATE
+    # The start of the answer survives: first frame, then the ones after it
+    assert audio[0] == 0 and audio[FRAME_SIZE] == 1
+    assert audio[-1] == len(audio) // FRAME_SIZE - 1
+
+
+def test_capture_reuses_the_callers_buffer(monkeypatch):
+    monkeypatch.setattr(utils.webrtcvad, "Vad", _AlwaysSpeech)
+    buffer = AudioRingBuffer(max_seconds=1)
+    for _ in range(2):
+        audio, _ = capture_with_vad(stream=_CountingStream(), buffer=buffer, log_interval=3600)
+        assert np.shares_memory(audio, buffer._buf)
+
+
+def test_endpointing_reports_are_summarized_for_metrics(monkeypatch):
+    monkeypatch.setattr(utils.webrtcvad, "Vad", _AlwaysSpeech)
+    stats = utils.EndpointingStats()
+    monkeypatch.setattr(utils, "endpoint_stats", stats)
+    capture_with_vad(stream=_CountingStream(), buffer=AudioRingBuffer(max_seconds=1), log_interval=3600)
+    for delay in (300, 600, 900):
+        stats.record({"endpoint_delay_ms": delay, "window_ms": 1200, "cut_off": False})
+
+    summary = stats.stats()
+    assert summary["turns"] == summary["recent_turns"] == 4
+    assert summary["cut_offs"] == 1
+    assert summary["p90_endpoint_delay_ms"] == 900
+    assert summary["last_window_ms"] == 1200
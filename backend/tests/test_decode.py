@@ -0,0 +1,42 @@
+import asyncio
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from transcription import StreamingAudioDecoder, decode_audio
+
+
+def _wav(rate, channels, seconds=1.0, fmt="WAV"):
+    t = np.arange(int(rate * seconds)) / rate
+    tone = (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16)
+    data = np.stack([tone] * channels, axis=1) if channels > 1 else tone
+    buf = io.BytesIO()
+    sf.write(buf, data, rate, format=fmt, subtype="PCM_16")
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("rate, channels, content_type", [
+    (44100, 1, "audio/wav"), (48000, 2, "audio/wav"), (22050, 1, "audio/flac"), (16000, 1, "audio/wav"),
+])
+def test_sndfile_uploads_come_back_at_the_requested_rate(rate, channels, content_type):
+    data = _wav(rate, channels, fmt="FLAC" if content_type.endswith("flac") else "WAV")
+    pcm, sr = asyncio.run(decode_audio(data, content_type, sample_rate=16000))
+    assert sr == 16000 and pcm.dtype == np.int16
+    assert abs(len(pcm) - 16000) <= 1
+
+
+def test_streaming_decoder_resamples_wav():
+    async def main():
+        decoder = StreamingAudioDecoder(sample_rate=16000)
+        await decoder.start("answer.wav", "audio/wav")
+        data = _wav(44100, 2)
+        for start in range(0, len(data), 4096):
+            await decoder.write(data[start:start + 4096])
+        await decoder.finish()
+        return decoder
+
+    decoder = asyncio.run(main())
+    assert decoder.pcm_rate == 16000 and decoder.pcm.dtype == np.int16
+    assert abs(len(decoder.pcm) - 16000) <= 1
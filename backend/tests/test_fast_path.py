@@ -0,0 +1,57 @@
+import pytest
+
+from fast_path import classify_intent, fast_reply
+
+
+@pytest.mark.parametrize("text", [
+    "We repeat until the queue is empty",
+    "I would repeat the binary search",
+    "no hint needed thanks",
+    "I don't need a hint",
+    "The clue is the sorted array",
+    "can you repeat the question I think we would use BFS here",
+])
+def test_answers_are_not_meta_requests(text):
+    assert classify_intent(text) is None
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("can you repeat that", "repeat"),
+    ("sorry, could you please repeat the question", "repeat"),
+    ("I didn't catch that", "repeat"),
+    ("can I get a hint", "hint"),
+    ("give me a hint please", "hint"),
+    ("I'm stuck", "hint"),
+])
+def test_requests_are_recognised(text, intent):
+    assert classify_intent(text) == intent
+
+
+def test_hint_is_reused_for_the_same_question():
+    context = [{"next_question": "Q1", "hint": ""}, {"next_question": "Q1", "hint": "Think about sorting."}]
+    assert fast_reply("give me a hint", context)["hint"] == "Think about sorting."
+
+
+def test_hint_for_a_previous_question_is_not_reused():
+    context = [{"next_question": "Q1", "hint": ""}, {"next_question": "Q2", "hint": "Think about sorting."}]
+    assert fast_reply("give me a hint", context) is None
+
+
+@pytest.mark.parametrize("text", ["", "   ", "...", None])
+def test_empty_transcripts_are_not_fillers(text):
+    assert classify_intent(text) is None
+
+
+@pytest.mark.parametrize("text", ["thank you", "Thank you so much.", "um"])
+def test_filler_words_are_silence(text):
+    assert classify_intent(text) == "silence"
+
+
+def test_failed_segments_reach_the_invalid_transcript_path():
+    from interview import transcript_is_valid
+    from transcription import is_transcription_error, merge_transcripts
+
+    # As pipeline.py merges a turn whose every segment failed
+    texts = ["[Transcription error: API request timeout]", "[Transcription error: API returned 503]"]
+    candidate = merge_transcripts([t for t in texts if t and not is_transcription_error(t)])
+    assert not transcript_is_valid(candidate) and classify_intent(candidate) is None
@@ -0,0 +1,37 @@
+import pytest
+
+from lexicon import lexicon_for
+
+
+@pytest.mark.parametrize("text", [
+    "the rest of the array",
+    "a solid understanding of graphs",
+    "a raft of changes",
+    "the nat",
+    "my manager asked me",
+    "the radius of the circle",
+    "I read it on reddit",
+    "I did it myself",
+    "Rest of it is TCP",
+    "a solid process",
+])
+def test_everyday_english_is_left_alone(text):
+    assert lexicon_for().correct(text) == text
+
+
+def test_topic_lexicon_keeps_everyday_words():
+    assert lexicon_for(["System Design"]).correct("the radius") == "the radius"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I exposed a rest api", "I exposed a REST api"),
+    ("we used raft consensus", "we used Raft consensus"),
+    ("the nat gateway", "the NAT gateway"),
+    ("I follow solid principles", "I follow SOLID principles"),
+    ("the kosarachi algorithm", "the Kosaraju algorithm"),
+    ("run dykstra on it", "run Dijkstra on it"),
+    ("use redis as a cache", "use Redis as a cache"),
+    ("a b tree index", "a B-tree index"),
+])
+def test_technical_terms_are_corrected(text, expected):
+    assert lexicon_for().correct(text) == expected
@@ -0,0 +1,76 @@
+import asyncio
+import random
+import sqlite3
+
+import database  # noqa: F401  (import before local_database, which it imports)
+from local_database import SQLiteInterviewDatabase
+
+
+def _insert(conn, rows):
+    conn.executemany(
+        "INSERT INTO interviews (id, session_id, interview_type, topics, status, average_score, duration, "
+        "completed_questions, total_questions, completion_method, created_at, updated_at) "
+        "VALUES (?, ?, 'technical', '[\"DSA\"]', 'completed', ?, ?, 1, 2, ?, '2024-06-01', '2024-06-01')",
+        [(str(i), f"s-{i}", score, duration, method) for i, (score, duration, method) in enumerate(rows)],
+    )
+
+
+def _sample(n=200, seed=7):
+    rng = random.Random(seed)
+    # Plenty of exact half minutes (30 s, 90 s, 150 s...) and fractional seconds
+    durations = [30, 90, 150, 210, 29, 31, 0, None, 89.5, 90.25, 600, 3630]
+    return [(rng.choice([None, 0, rng.randint(1, 100)]),
+             rng.choice(durations + [rng.randint(0, 3600), rng.uniform(0, 3600)]),
+             rng.choice(["automatic", "manually_ended", "timeout_cleanup"])) for _ in range(n)]
+
+
+def _python_rollup(rows):
+    """The per-request computation the rollups replaced (format_interview_data and the stats endpoints)"""
+    minutes = [round(d / 60) if (d or 0) > 0 else 0 for _, d, _ in rows]
+    timed = [(score or 0, m) for (score, _, _), m in zip(rows, minutes) if m > 0]
+    return {
+        "timed": len(timed),
+        "duration_minutes_sum": sum(m for _, m in timed),
+        "average_duration": round(sum(m for _, m in timed) / len(timed)) if timed else 0,
+        "efficiency_sum": sum(score / m for score, m in timed),
+    }
+
+
+def _check(stats, rows):
+    expected = _python_rollup(rows)
+    assert stats["timed"] == expected["timed"]
+    assert stats["duration_minutes_sum"] == expected["duration_minutes_sum"]
+    assert round(stats["duration_minutes_sum"] / stats["timed"]) == expected["average_duration"]
+    assert abs(stats["efficiency_sum"] - expected["efficiency_sum"]) < 1e-6
+
+
+def test_minutes_round_half_to_even_like_the_backend():
+    db = SQLiteInterviewDatabase(":memory:")
+    rows = _sample()
+    asyncio.run(db._run(True, lambda conn: _insert(conn, rows)))
+    _check(asyncio.run(db.get_interview_stats()), rows)
+    asyncio.run(db.rebuild_interview_stats())
+    _check(asyncio.run(db.get_interview_stats()), rows)
+
+
+def test_half_minute_interviews_are_not_timed():
+    db = SQLiteInterviewDatabase(":memory:")
+    asyncio.run(db._run(True, lambda conn: _insert(conn, [(80, 30, "automatic"), (80, 150, "automatic")])))
+    stats = asyncio.run(db.get_interview_stats())
+    assert stats["timed"] == 1
+    assert stats["duration_minutes_sum"] == 2
+
+
+def test_stale_rollups_are_rebuilt_on_open(tmp_path):
+    path = str(tmp_path / "interviews.db")
+    rows = _sample(50)
+    db = SQLiteInterviewDatabase(path)
+    asyncio.run(db._run(True, lambda conn: _insert(conn, rows)))
+    asyncio.run(db.aclose())
+    # A file written by an older version: different counters, no rollup version
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE interview_stats SET timed = 0, duration_minutes_sum = 0")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+    _check(asyncio.run(SQLiteInterviewDatabase(path).get_interview_stats()), rows)
@@ -0,0 +1,54 @@
+import asyncio
+
+from database import InterviewDatabase, QueryCache
+from local_database import SQLiteInterviewDatabase
+
+
+def test_replayed_create_leaves_a_completed_sqlite_row_alone():
+    db = SQLiteInterviewDatabase(":memory:")
+    session = {"session_id": "s-1", "topics": ["DSA"], "total_questions": 4, "current_question_index": 0}
+
+    async def main():
+        first = await db.create_interview_session(session)
+        await db.update_interview_progress("s-1", {"current_question_index": 2})
+        await db.complete_interview("s-1", {"average_score": 80, "total_time": 600, "completed_questions": 4})
+        assert await db.create_interview_session(session) == first
+        return await db._run(False, lambda conn: conn.execute(
+            "SELECT status, current_question_index FROM interviews WHERE session_id = 's-1'").fetchone())
+
+    row = asyncio.run(main())
+    assert row["status"] == "completed"
+    assert row["current_question_index"] == 3
+
+
+class _FakeRest:
+    """PostgREST stand-in: ignore-duplicates returns no rows for an existing session_id."""
+
+    configured = True
+
+    def __init__(self):
+        self.rows = {}
+        self.prefers = []
+
+    async def insert(self, table, row, prefer="return=representation", **kwargs):
+        self.prefers.append(prefer)
+        if row["session_id"] in self.rows:
+            return []
+        self.rows[row["session_id"]] = {**row, "id": f"id-{len(self.rows)}"}
+        return [self.rows[row["session_id"]]]
+
+    async def select(self, table, params, **kwargs):
+        session_id = params["session_id"].removeprefix("eq.")
+        return [{"id": self.rows[session_id]["id"]}] if session_id in self.rows else []
+
+
+def test_replayed_supabase_create_is_insert_only():
+    rest = _FakeRest()
+    db = InterviewDatabase(rest, QueryCache())
+    session = {"session_id": "s-1", "topics": ["DSA"]}
+
+    first = asyncio.run(db.create_interview_session(session))
+    rest.rows["s-1"]["status"] = "completed"
+    assert asyncio.run(db.create_interview_session(session)) == first
+    assert rest.rows["s-1"]["status"] == "completed"
+    assert all("ignore-duplicates" in prefer for prefer in rest.prefers)
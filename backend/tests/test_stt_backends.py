@@ -0,0 +1,24 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from stt_backends import FakeBackend, STTBackend
+
+
+def test_incomplete_backend_fails_at_construction():
+    class AsyncOnly(STTBackend):
+        name = "async-only"
+
+        async def transcribe(self, pcm, sample_rate, name="answer", prompt=None):
+            return ""
+
+    with pytest.raises(TypeError, match="transcribe_sync"):
+        AsyncOnly()
+
+
+def test_fake_backend_implements_the_interface():
+    backend = FakeBackend()
+    pcm = np.zeros(16000, dtype=np.int16)
+    assert isinstance(asyncio.run(backend.transcribe(pcm, 16000)), str)
+    assert isinstance(backend.transcribe_sync(pcm, 16000), str)
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from transcription import TranscriptCache
+
+
+def test_joiners_survive_the_owner_being_cancelled():
+    cache = TranscriptCache(cache_dir=None)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "use a min heap"
+
+    async def main():
+        owner = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        assert await joiner == "use a min heap"
+
+    asyncio.run(main())
+    assert calls == 1
+    assert cache.get("k") == "use a min heap"
+    assert cache.stats()["inflight_joins"] == 1
+
+
+def test_failures_reach_every_caller_and_are_not_cached():
+    cache = TranscriptCache(cache_dir=None)
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("stt down")
+
+    async def main():
+        results = await asyncio.gather(cache.get_or_compute("k", compute), cache.get_or_compute("k", compute),
+                                       return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    asyncio.run(main())
+    assert cache.get("k") is None
+    assert not cache._inflight
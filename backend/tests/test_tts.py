@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+from tts import TTSService
+
+
+class _SlowTTS(TTSService):
+    """Two parts; the second is held back until ``release`` is set."""
+
+    def __init__(self):
+        super().__init__(cache_dir=None, workers=1)
+        self.release = threading.Event()
+
+    def _synthesize_parts(self, text, voice):
+        yield b"part-1"
+        self.release.wait(5)
+        yield b"part-2"
+
+
+class _RecordingSocket:
+    def __init__(self, tts):
+        self.tts = tts
+        self.events = []
+
+    async def send_json(self, message):
+        self.events.append((message["type"], self.tts.release.is_set()))
+
+    async def send_bytes(self, data):
+        self.events.append((data, self.tts.release.is_set()))
+        # The first part is out while synthesis is still running: let it finish
+        self.tts.release.set()
+
+
+def _stream(prefetch_first):
+    tts = _SlowTTS()
+    ws = _RecordingSocket(tts)
+
+    async def main():
+        if prefetch_first:
+            tts.prefetch("Next question")
+            await asyncio.sleep(0.05)
+        await tts.stream_to_websocket(ws, "Next question")
+
+    asyncio.run(main())
+    return tts, ws.events
+
+
+def test_stream_starts_before_synthesis_finishes():
+    _, events = _stream(prefetch_first=False)
+    assert events[:2] == [("tts_start", False), (b"part-1", False)]
+    assert [e for e, _ in events] == ["tts_start", b"part-1", b"part-2", "tts_end"]
+
+
+def test_stream_joins_a_running_prefetch_part_by_part():
+    tts, events = _stream(prefetch_first=True)
+    assert events[:2] == [("tts_start", False), (b"part-1", False)]
+    assert [e for e, _ in events] == ["tts_start", b"part-1", b"part-2", "tts_end"]
+    assert tts.inflight_joins == 1 and tts.misses == 1
+    assert tts.synthesize("Next question") == b"part-1part-2"
@@ -0,0 +1,24 @@
+import asyncio
+
+from transcription import WhisperClient
+
+
+def test_clients_of_closed_loops_are_evicted():
+    whisper = WhisperClient()
+
+    async def use():
+        return whisper._client()
+
+    first = asyncio.run(use())
+    second = asyncio.run(use())
+    assert first is not second
+    assert list(whisper._clients.values()) == [second]
+
+
+def test_one_client_per_running_loop():
+    whisper = WhisperClient()
+
+    async def use_twice():
+        return whisper._client() is whisper._client()
+
+    assert asyncio.run(use_twice())
@@ -0,0 +1,924 @@
+"""
+Speech-to-text helpers shared by the CLI and the WebSocket server.
+
+Audio stays in memory end to end: uploads are decoded through ffmpeg pipes,
+leading/trailing silence is trimmed with zero-copy slicing, and the PCM is
+re-encoded to FLAC or Opus before upload. Long answers are split at
+pauses into overlapping chunks that are transcribed concurrently and merged
+back together. Finished transcripts are cached by a
+hash of the decoded PCM so re-uploads of the same audio skip the API call.
+All Whisper requests go through one pooled keep-alive HTTP client.
+"""
+import asyncio
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+import soundfile as sf
+import webrtcvad
+
+GROQ_TRANSCRIPTION_URL = "https://api.groq.com/openai/v1/audio/transcriptions"
+STT_MODEL = os.getenv("STT_MODEL", "whisper-large-v3")
+STT_TIMEOUT = float(os.getenv("STT_TIMEOUT", "30"))
+STT_POOL_MAX_CONNECTIONS = int(os.getenv("STT_POOL_MAX_CONNECTIONS", "20"))
+STT_POOL_MAX_KEEPALIVE = int(os.getenv("STT_POOL_MAX_KEEPALIVE", "10"))
+STT_KEEPALIVE_EXPIRY = float(os.getenv("STT_KEEPALIVE_EXPIRY", "120"))
+
+# Audio longer than this is transcribed in chunks
+CHUNKED_MIN_SECONDS = float(os.getenv("STT_CHUNKED_MIN_SECONDS", "25"))
+CHUNK_TARGET_SECONDS = float(os.getenv("STT_CHUNK_TARGET_SECONDS", "15"))
+CHUNK_MAX_SECONDS = float(os.getenv("STT_CHUNK_MAX_SECONDS", "24"))
+CHUNK_OVERLAP_SECONDS = 1.0
+CHUNK_WORKERS = int(os.getenv("STT_CHUNK_WORKERS", "4"))
+
+# Upload codec: "auto" picks FLAC for short clips and Opus for long ones;
+# "flac", "opus" or "wav" force one codec
+STT_UPLOAD_CODEC = os.getenv("STT_UPLOAD_CODEC", "auto").lower()
+OPUS_MIN_SECONDS = float(os.getenv("STT_OPUS_MIN_SECONDS", "20"))
+
+# Transcript cache: entries kept in memory, plus an optional on-disk copy
+STT_CACHE_SIZE = int(os.getenv("STT_CACHE_SIZE", "512"))
+STT_CACHE_DIR = os.getenv("STT_CACHE_DIR") or None
+
+_VAD_RATES = (8000, 16000, 32000, 48000)
+
+
+def is_transcription_error(text: str) -> bool:
+    return bool(text) and text.startswith("[Transcription error")
+
+
+def speech_mask(pcm: np.ndarray, sample_rate: int, frame_ms: int = 30, vad_level: int = 2) -> np.ndarray:
+    """Return one boolean per ``frame_ms`` frame, True where speech is present.
+
+    Uses webrtcvad at the rates it supports and an energy threshold otherwise.
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    n = len(pcm) // frame
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    frames = pcm[:n * frame].reshape(n, frame)
+    if sample_rate in _VAD_RATES:
+        vad = webrtcvad.Vad(vad_level)
+        raw = frames.tobytes()
+        step = frame * 2
+        return np.fromiter((vad.is_speech(raw[i * step:(i + 1) * step], sample_rate) for i in range(n)),
+                           dtype=bool, count=n)
+    energy = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+    return energy > max(200.0, np.percentile(energy, 30) * 2)
+
+
+def find_pauses(mask: np.ndarray, min_frames: int = 10) -> List[Tuple[int, int]]:
+    """Return (center_frame, length) for each non-speech run of at least ``min_frames``."""
+    padded = np.concatenate(([True], mask, [True]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    starts, ends = edges[::2], edges[1::2]
+    return [((s + e) // 2, e - s) for s, e in zip(starts, ends) if e - s >= min_frames]
+
+
+def plan_chunks(pcm: np.ndarray, sample_rate: int, target_seconds: float = CHUNK_TARGET_SECONDS,
+                max_seconds: float = CHUNK_MAX_SECONDS,
+                overlap_seconds: float = CHUNK_OVERLAP_SECONDS) -> List[Tuple[int, int]]:
+    """Split audio into (start, end) sample ranges cut at the longest nearby pause.
+
+    Each chunk extends ``overlap_seconds`` past its cut point so words on the
+    boundary are heard in full by at least one request.
+    """
+    frame_ms = 30
+    frame = int(sample_rate * frame_ms / 1000)
+    pauses = find_pauses(speech_mask(pcm, sample_rate, frame_ms))
+    cuts = np.array([c for c, _ in pauses], dtype=np.int64) * frame
+    lengths = np.array([l for _, l in pauses], dtype=np.int64)
+
+    total = len(pcm)
+    max_len = int(max_seconds * sample_rate)
+    min_len = int(target_seconds * sample_rate * 0.5)
+    overlap = int(overlap_seconds * sample_rate)
+
+    chunks = []
+    pos = 0
+    while total - pos > max_len:
+        window = (cuts >= pos + min_len) & (cuts <= pos + max_len - overlap)
+        if window.any():
+            # Longest pause wins; ties go to the one closest to the target length
+            idx = np.flatnonzero(window)
+            target = pos + target_seconds * sample_rate
+            best = max(idx, key=lambda i: (lengths[i], -abs(cuts[i] - target)))
+            cut = int(cuts[best])
+        else:
+            cut = pos + max_len - overlap
+        chunks.append((pos, min(total, cut + overlap)))
+        pos = cut
+    chunks.append((pos, total))
+    return chunks
+
+
+def trim_silence(pcm: np.ndarray, sample_rate: int, pad_ms: int = 240) -> np.ndarray:
+    """Drop leading/trailing non-speech, keeping ``pad_ms`` of context.
+
+    Returns a view of ``pcm``; audio with no detected speech is returned whole
+    so the STT provider still gets the final say.
+    """
+    frame_ms = 30
+    mask = speech_mask(pcm, sample_rate, frame_ms)
+    voiced = np.flatnonzero(mask)
+    if len(voiced) == 0:
+        return pcm
+    frame = int(sample_rate * frame_ms / 1000)
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(pcm), (voiced[-1] + 1) * frame + pad)
+    return pcm[start:end]
+
+
+class AudioDecodeError(Exception):
+    """Uploaded audio could not be decoded."""
+
+
+# Containers libsndfile decodes directly, so ffmpeg is only needed for the rest
+_SNDFILE_TYPES = ("wav", "wave", "flac", "x-flac")
+# MP4-family containers often put their index (moov atom) at the end, which ffmpeg
+# can't reach through a pipe, so they are spooled to a seekable temp file instead.
+# webm, ogg and mp3 are streamable and stay piped.
+_SEEKABLE_TYPES = ("mp4", "m4a", "x-m4a", "quicktime", "3gpp", "3gpp2")
+_SEEKABLE_EXTENSIONS = (".mp4", ".m4a", ".mov", ".3gp")
+FFMPEG_TIMEOUT = 30
+
+# Headerless int16 PCM straight from an AudioWorklet. audio/pcm is little-endian
+# (what browsers produce); audio/L16 is network byte order per RFC 2586.
+_RAW_PCM_TYPES = ("pcm", "x-pcm", "l16", "x-raw", "raw")
+
+
+def parse_raw_pcm_type(content_type: str, sample_rate: Optional[int] = None,
+                       channels: Optional[int] = None) -> Optional[Tuple[int, int, bool]]:
+    """Return ``(rate, channels, big_endian)`` if ``content_type`` declares raw PCM.
+
+    Rate and channel count come from content-type parameters
+    (``audio/pcm;rate=16000;channels=1``) or, failing that, the explicit
+    arguments, defaulting to 16 kHz mono.
+    """
+    parts = [p.strip() for p in content_type.lower().split(";")]
+    subtype = parts[0].split("/")[-1]
+    if subtype not in _RAW_PCM_TYPES:
+        return None
+    params = dict(p.split("=", 1) for p in parts[1:] if "=" in p)
+    try:
+        rate = int(params.get("rate") or sample_rate or 16000)
+        chans = int(params.get("channels") or channels or 1)
+    except ValueError:
+        raise AudioDecodeError(f"Bad raw PCM parameters in {content_type!r}")
+    if not 4000 <= rate <= 192000 or not 1 <= chans <= 8:
+        raise AudioDecodeError(f"Unsupported raw PCM format: {rate} Hz, {chans} channels")
+    return rate, chans, subtype == "l16"
+
+
+def resample(pcm: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """Vectorized resample; integer decimation averages, anything else interpolates."""
+    if src_rate == dst_rate or len(pcm) == 0:
+        return pcm
+    if src_rate % dst_rate == 0:
+        # 48k/32k -> 16k: box-filter and decimate in one reshape
+        factor = src_rate // dst_rate
+        usable = len(pcm) - len(pcm) % factor
+        return pcm[:usable].reshape(-1, factor).mean(axis=1)
+    n_out = int(len(pcm) * dst_rate / src_rate)
+    positions = np.arange(n_out) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(pcm)), pcm)
+
+
+def pcm_from_raw(data, rate: int, channels: int = 1, big_endian: bool = False,
+                 sample_rate: int = 16000) -> np.ndarray:
+    """Interpret raw int16 bytes as mono PCM at ``sample_rate``.
+
+    Little-endian mono at the target rate is returned as a view of ``data``
+    with no copy; downmix/resample only run when the declared format differs.
+    """
+    count = len(data) // (2 * channels) * channels
+    pcm = np.frombuffer(data, dtype=">i2" if big_endian else "<i2", count=count)
+    if channels == 1 and rate == sample_rate:
+        return pcm if not big_endian else pcm.astype(np.int16)
+    audio = pcm.reshape(-1, channels).mean(axis=1) if channels > 1 else pcm
+    audio = resample(audio, rate, sample_rate)
+    return np.clip(np.round(audio), -32768, 32767).astype(np.int16)
+
+
+def _read_sndfile(data, sample_rate: int) -> np.ndarray:
+    """WAV/FLAC via libsndfile as mono int16 at ``sample_rate`` (raises RuntimeError if unreadable)."""
+    pcm, rate = sf.read(io.BytesIO(data), dtype="int16")
+    if pcm.ndim == 1 and rate == sample_rate:
+        return pcm
+    audio = pcm.mean(axis=1) if pcm.ndim > 1 else pcm
+    audio = resample(audio, rate, sample_rate)
+    return np.clip(np.round(audio), -32768, 32767).astype(np.int16)
+
+
+def _needs_seekable_input(content_type: str = "", filename: str = "", head: bytes = b"") -> bool:
+    """Whether ffmpeg needs a seekable file rather than a pipe (MP4-family containers)."""
+    subtype = content_type.split(";")[0].split("/")[-1].strip().lower()
+    return (subtype in _SEEKABLE_TYPES or filename.lower().endswith(_SEEKABLE_EXTENSIONS)
+            or head[4:8] == b"ftyp")
+
+
+def _ffmpeg_args(source: str, sample_rate: int) -> List[str]:
+    return ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", source,
+            "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1"]
+
+
+async def _ffmpeg_decode_file(path: str, sample_rate: int) -> np.ndarray:
+    proc = await asyncio.create_subprocess_exec(
+        *_ffmpeg_args(path, sample_rate),
+        stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout=FFMPEG_TIMEOUT)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    if proc.returncode != 0:
+        raise AudioDecodeError(err.decode("utf-8", errors="ignore")[:500] or f"ffmpeg exited {proc.returncode}")
+    return np.frombuffer(out, dtype=np.int16)
+
+
+async def decode_audio(data: bytes, content_type: str = "", sample_rate: int = 16000,
+                       filename: str = "") -> Tuple[np.ndarray, int]:
+    """Decode an uploaded audio blob to mono int16 PCM.
+
+    Raw PCM (see ``parse_raw_pcm_type``) is used as-is; WAV/FLAC go straight
+    through libsndfile; streamable formats (webm, ogg, mp3) are piped through
+    ffmpeg, and MP4/M4A/MOV are written to a temp file first so ffmpeg can
+    seek to their index. Output is resampled to ``sample_rate``. Raises
+    ``AudioDecodeError`` or ``asyncio.TimeoutError``.
+    """
+    raw = parse_raw_pcm_type(content_type)
+    if raw:
+        return pcm_from_raw(data, *raw, sample_rate=sample_rate), sample_rate
+    subtype = content_type.split(";")[0].split("/")[-1].strip().lower()
+    if subtype in _SNDFILE_TYPES:
+        try:
+            return _read_sndfile(data, sample_rate), sample_rate
+        except RuntimeError as e:
+            print(f"⚠️ libsndfile could not decode {content_type}, trying ffmpeg: {e}")
+
+    if _needs_seekable_input(content_type, filename, data[:12]):
+        with tempfile.NamedTemporaryFile(suffix=".m4a", delete=False) as tmp:
+            tmp.write(data)
+        try:
+            return await _ffmpeg_decode_file(tmp.name, sample_rate), sample_rate
+        finally:
+            os.unlink(tmp.name)
+
+    proc = await asyncio.create_subprocess_exec(
+        *_ffmpeg_args("pipe:0", sample_rate),
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(data), timeout=FFMPEG_TIMEOUT)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    if proc.returncode != 0:
+        raise AudioDecodeError(err.decode("utf-8", errors="ignore")[:500] or f"ffmpeg exited {proc.returncode}")
+    # frombuffer views ffmpeg's output bytes directly; no copy
+    return np.frombuffer(out, dtype=np.int16), sample_rate
+
+
+class StreamingAudioDecoder:
+    """Decode an upload while it is still arriving.
+
+    For streamable compressed formats ffmpeg is started with the first chunk
+    and fed each chunk as it is received; its PCM output is collected and
+    hashed concurrently, so decoding and cache-key hashing overlap with the
+    upload. MP4/M4A/MOV (recognised by type, extension or their ``ftyp``
+    box) are spooled to a temp file and decoded at the end, since ffmpeg
+    can't read their trailing index from a pipe. WAV/FLAC are buffered and
+    decoded by libsndfile at the end.
+    Raw PCM skips transcoding entirely; when it is already 16 kHz mono the
+    received bytes are the PCM and are hashed as they arrive.
+    """
+
+    def __init__(self, sample_rate: int = 16000, declared_rate: Optional[int] = None,
+                 declared_channels: Optional[int] = None):
+        self.sample_rate = sample_rate
+        self.declared_rate = declared_rate
+        self.declared_channels = declared_channels
+        self._raw_format = None
+        self._raw = bytearray()
+        self._pcm = bytearray()
+        self._hasher = None
+        self._proc = None
+        self._reader = None
+        self._stderr = b""
+        self._transcode = False
+        self._spool = None
+        # ffmpeg closed its stdin mid-upload (it rejected the input); counted in upload metrics
+        self.broken_pipe = False
+        self.pcm: Optional[np.ndarray] = None
+        self.pcm_rate = sample_rate
+        self.content_type = ""
+        self.filename = ""
+
+    async def start(self, filename: str, content_type: str):
+        self.content_type = content_type
+        self.filename = filename or ""
+        self._raw_format = parse_raw_pcm_type(content_type, self.declared_rate, self.declared_channels)
+        if self._raw_format:
+            if self._raw_format == (self.sample_rate, 1, False):
+                self._hasher = TranscriptCache.hasher()
+            return
+        subtype = content_type.split(";")[0].split("/")[-1].strip().lower()
+        # Everything else goes through ffmpeg, piped or spooled; decided on the first chunk
+        self._transcode = subtype not in _SNDFILE_TYPES
+
+    async def _begin_transcode(self, head: bytes):
+        self._transcode = False
+        if _needs_seekable_input(self.content_type, self.filename, head):
+            self._spool = tempfile.NamedTemporaryFile(suffix=".m4a", delete=False)
+            return
+        self._hasher = TranscriptCache.hasher()
+        self._proc = await asyncio.create_subprocess_exec(
+            *_ffmpeg_args("pipe:0", self.sample_rate),
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        self._reader = asyncio.create_task(self._collect())
+
+    async def _collect(self):
+        stdout = self._proc.stdout
+        while True:
+            block = await stdout.read(65536)
+            if not block:
+                break
+            self._pcm += block
+            self._hasher.update(block)
+        self._stderr = await self._proc.stderr.read()
+
+    async def write(self, chunk: bytes):
+        if self.pcm is not None:
+            return
+        if self._transcode:
+            await self._begin_transcode(chunk[:12])
+        if self._spool is not None:
+            self._spool.write(chunk)
+            return
+        if self._proc is None:
+            self._raw += chunk
+            if self._hasher is not None:
+                self._hasher.update(chunk)
+            return
+        try:
+            self._proc.stdin.write(chunk)
+            await self._proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg gave up on the input; finish() reports its error
+            self.broken_pipe = True
+            await self.finish()
+
+    async def finish(self):
+        if self.pcm is not None:
+            return
+        if self._raw_format:
+            # View over the received buffer when no conversion is needed
+            self.pcm = pcm_from_raw(self._raw, *self._raw_format, sample_rate=self.sample_rate)
+            return
+        if self._spool is not None:
+            self._spool.close()
+            try:
+                self.pcm = await _ffmpeg_decode_file(self._spool.name, self.sample_rate)
+            finally:
+                self._discard_spool()
+            return
+        if self._proc is None:
+            try:
+                self.pcm = _read_sndfile(self._raw, self.sample_rate)
+            except RuntimeError as e:
+                print(f"⚠️ libsndfile could not decode {self.content_type}, trying ffmpeg: {e}")
+                self.pcm, self.pcm_rate = await decode_audio(bytes(self._raw), "", self.sample_rate,
+                                                             filename=self.filename)
+            self._raw = bytearray()
+            return
+        if not self._proc.stdin.is_closing():
+            self._proc.stdin.close()
+        try:
+            await asyncio.wait_for(self._reader, timeout=FFMPEG_TIMEOUT)
+            await self._proc.wait()
+        except asyncio.TimeoutError:
+            await self.close()
+            raise
+        if self._proc.returncode != 0:
+            raise AudioDecodeError(self._stderr.decode("utf-8", errors="ignore")[:500]
+                                   or f"ffmpeg exited {self._proc.returncode}")
+        self.pcm = np.frombuffer(self._pcm, dtype=np.int16)
+
+    def cache_key(self, *extra: str) -> str:
+        if self._hasher is not None:
+            return TranscriptCache.finish_key(self._hasher, self.pcm_rate, *extra)
+        return TranscriptCache.key(self.pcm, self.pcm_rate, *extra)
+
+    def memory_bytes(self) -> int:
+        return len(self._raw) + len(self._pcm)
+
+    def _discard_spool(self):
+        if self._spool is not None:
+            self._spool.close()
+            try:
+                os.unlink(self._spool.name)
+            except OSError:
+                pass
+            self._spool = None
+
+    async def close(self):
+        """Kill ffmpeg and remove any spooled file if the upload was abandoned or rejected."""
+        self._discard_spool()
+        if self._proc is not None and self._proc.returncode is None:
+            self._proc.kill()
+            await self._proc.wait()
+        if self._reader is not None and not self._reader.done():
+            self._reader.cancel()
+
+
+def wav_bytes(pcm: np.ndarray, sample_rate: int) -> bytes:
+    """Encode int16 PCM as an in-memory WAV file."""
+    buf = io.BytesIO()
+    sf.write(buf, pcm, sample_rate, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+# libsndfile format/subtype, file extension and MIME type for each upload codec
+_CODECS = {
+    "wav": ("WAV", "PCM_16", "wav", "audio/wav"),
+    "flac": ("FLAC", "PCM_16", "flac", "audio/flac"),
+    "opus": ("OGG", "OPUS", "ogg", "audio/ogg"),
+}
+# Sample rates the Opus encoder accepts
+_OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def choose_codec(seconds: float, sample_rate: int, codec: str = STT_UPLOAD_CODEC) -> str:
+    """Pick the upload codec for a clip of ``seconds`` length.
+
+    Short clips go up as lossless FLAC: they are cheap to send and every
+    phoneme matters. Long answers use Opus, which is roughly 10x smaller than
+    PCM and is where slow uplinks actually hurt.
+    """
+    if codec in _CODECS and codec != "opus":
+        return codec
+    if sample_rate not in _OPUS_RATES:
+        return "flac"
+    if codec == "opus" or seconds >= OPUS_MIN_SECONDS:
+        return "opus"
+    return "flac"
+
+
+class UploadStats:
+    """Bytes saved by upload encoding and STT latency per codec."""
+
+    def __init__(self):
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+        self.encode_ms = 0.0
+        self.by_codec: Dict[str, Dict[str, float]] = {}
+
+    def _codec(self, codec: str) -> Dict[str, float]:
+        return self.by_codec.setdefault(codec, {"uploads": 0, "raw_bytes": 0, "sent_bytes": 0,
+                                                "requests": 0, "request_ms": 0.0})
+
+    def record_encode(self, codec: str, raw: int, sent: int, ms: float):
+        self.raw_bytes += raw
+        self.sent_bytes += sent
+        self.encode_ms += ms
+        entry = self._codec(codec)
+        entry["uploads"] += 1
+        entry["raw_bytes"] += raw
+        entry["sent_bytes"] += sent
+
+    def record_request(self, content_type: str, ms: float):
+        codec = next((name for name, spec in _CODECS.items() if spec[3] == content_type), content_type)
+        entry = self._codec(codec)
+        entry["requests"] += 1
+        entry["request_ms"] += ms
+
+    def stats(self) -> dict:
+        uploads = sum(e["uploads"] for e in self.by_codec.values())
+        return {
+            "raw_bytes": self.raw_bytes,
+            "sent_bytes": self.sent_bytes,
+            "bytes_saved": self.raw_bytes - self.sent_bytes,
+            "compression_ratio": round(self.raw_bytes / self.sent_bytes, 2) if self.sent_bytes else 0.0,
+            "avg_encode_ms": round(self.encode_ms / uploads, 1) if uploads else 0.0,
+            "by_codec": {
+                codec: {
+                    "uploads": e["uploads"],
+                    "bytes_saved": e["raw_bytes"] - e["sent_bytes"],
+                    "avg_request_ms": round(e["request_ms"] / e["requests"], 1) if e["requests"] else 0.0,
+                }
+                for codec, e in self.by_codec.items()
+            },
+        }
+
+
+upload_stats = UploadStats()
+
+
+def encode_for_upload(pcm: np.ndarray, sample_rate: int, name: str = "audio",
+                      codec: Optional[str] = None) -> Tuple[bytes, str, str]:
+    """Encode int16 PCM for the STT upload.
+
+    Returns ``(payload, filename, content_type)``; falls back to WAV if the
+    chosen encoder is unavailable in the local libsndfile build.
+    """
+    chosen = choose_codec(len(pcm) / sample_rate, sample_rate, codec or STT_UPLOAD_CODEC)
+    started = time.perf_counter()
+    try:
+        fmt, subtype, ext, content_type = _CODECS[chosen]
+        buf = io.BytesIO()
+        sf.write(buf, pcm, sample_rate, format=fmt, subtype=subtype)
+        payload = buf.getvalue()
+    except Exception as e:
+        print(f"⚠️ {chosen} encoding failed, uploading WAV instead: {e}")
+        chosen = "wav"
+        fmt, subtype, ext, content_type = _CODECS[chosen]
+        payload = wav_bytes(pcm, sample_rate)
+    ms = (time.perf_counter() - started) * 1000
+    raw = pcm.nbytes + 44
+    upload_stats.record_encode(chosen, raw, len(payload), ms)
+    if chosen != "wav":
+        print(f"🗜️  Encoded {raw} -> {len(payload)} bytes as {chosen} in {ms:.0f} ms")
+    return payload, f"{name}.{ext}", content_type
+
+
+_WORD_RE = re.compile(r"[^\w']+")
+
+
+def _norm(word: str) -> str:
+    return _WORD_RE.sub("", word.lower())
+
+
+def merge_transcripts(parts: List[str], max_overlap_words: int = 15) -> str:
+    """Join chunk transcripts, dropping words repeated across a chunk boundary."""
+    merged: List[str] = []
+    for text in parts:
+        words = text.split()
+        if not words:
+            continue
+        limit = min(max_overlap_words, len(merged), len(words))
+        tail = [_norm(w) for w in merged[-limit:]] if limit else []
+        head = [_norm(w) for w in words[:limit]]
+        skip = 0
+        for k in range(limit, 0, -1):
+            # A lone short word ("a", "the") repeating is more likely speech than overlap
+            if k == 1 and len(head[0]) <= 3:
+                break
+            if tail[-k:] == head[:k] and any(head[:k]):
+                skip = k
+                break
+        merged.extend(words[skip:])
+    return " ".join(merged)
+
+
+def _merge_chunk_results(results: List[str]) -> str:
+    errors = [r for r in results if is_transcription_error(r)]
+    texts = [r for r in results if r and not is_transcription_error(r)]
+    if errors:
+        print(f"⚠️ {len(errors)}/{len(results)} chunks failed: {errors[0]}")
+    if not texts:
+        return errors[0] if errors else ""
+    return merge_transcripts(texts)
+
+
+def transcribe_chunked(pcm: np.ndarray, sample_rate: int,
+                       transcribe_bytes: Callable[[bytes, str, str], str],
+                       max_workers: int = CHUNK_WORKERS) -> str:
+    """Transcribe long audio as concurrent overlapping chunks.
+
+    ``transcribe_bytes(audio, filename, content_type)`` performs one STT request and
+    returns the text or a ``[Transcription error ...]`` string. Failed chunks
+    are dropped so the rest of the answer survives; the error is returned only
+    if every chunk fails.
+    """
+    chunks = plan_chunks(pcm, sample_rate)
+    print(f"✂️  Splitting {len(pcm) / sample_rate:.1f}s of audio into {len(chunks)} chunks")
+
+    def run(item):
+        i, (start, end) = item
+        return transcribe_bytes(*encode_for_upload(pcm[start:end], sample_rate, f"chunk_{i}"))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        results = list(pool.map(run, enumerate(chunks)))
+    return _merge_chunk_results(results)
+
+
+async def transcribe_chunked_async(pcm: np.ndarray, sample_rate: int,
+                                   transcribe_bytes: Callable[[bytes, str, str], Awaitable[str]],
+                                   max_concurrency: int = CHUNK_WORKERS) -> str:
+    """Async ``transcribe_chunked``: chunk requests run concurrently on the event loop."""
+    chunks = plan_chunks(pcm, sample_rate)
+    print(f"✂️  Splitting {len(pcm) / sample_rate:.1f}s of audio into {len(chunks)} chunks")
+    limit = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(i, start, end):
+        async with limit:
+            # FLAC/Opus encoding is CPU-bound: keep it off the event loop
+            upload = await asyncio.to_thread(encode_for_upload, pcm[start:end], sample_rate, f"chunk_{i}")
+            return await transcribe_bytes(*upload)
+
+    results = await asyncio.gather(*(run(i, start, end) for i, (start, end) in enumerate(chunks)))
+    return _merge_chunk_results(list(results))
+
+
+class TranscriptCache:
+    """Bounded LRU of transcripts keyed by audio content hash.
+
+    Entries optionally persist to ``cache_dir`` (one small JSON file each) so
+    they survive restarts. ``get_or_compute`` also collapses identical
+    concurrent requests into a single STT call.
+    """
+
+    def __init__(self, max_entries: int = STT_CACHE_SIZE, cache_dir: Optional[str] = STT_CACHE_DIR):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.inflight_joins = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(pcm: np.ndarray, sample_rate: int, *extra: str) -> str:
+        """Hash decoded PCM plus anything else that changes the transcript."""
+        h = TranscriptCache.hasher()
+        h.update(memoryview(np.ascontiguousarray(pcm)).cast("B"))
+        return TranscriptCache.finish_key(h, sample_rate, *extra)
+
+    @staticmethod
+    def hasher():
+        """Incremental hasher for callers that see the PCM in pieces."""
+        return hashlib.blake2b(digest_size=20)
+
+    @staticmethod
+    def finish_key(h, sample_rate: int, *extra: str) -> str:
+        h.update(f"|{sample_rate}|{'|'.join(extra)}".encode())
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        if self.cache_dir:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    text = json.load(f)["text"]
+                self.disk_hits += 1
+                self._remember(key, text)
+                return text
+            except (OSError, ValueError, KeyError):
+                pass
+        return None
+
+    def _remember(self, key: str, text: str):
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, key: str, text: str):
+        # Errors and empty results must be retried, never replayed
+        if not text or is_transcription_error(text):
+            return
+        self._remember(key, text)
+        if self.cache_dir:
+            try:
+                tmp = self._path(key) + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump({"text": text}, f)
+                os.replace(tmp, self._path(key))
+                self._disk_writes += 1
+                if self._disk_writes % 64 == 0:
+                    self._prune_disk()
+            except OSError as e:
+                print(f"⚠️ Could not persist transcript cache entry: {e}")
+
+    def _prune_disk(self):
+        """Keep the on-disk store within 4x the in-memory bound, dropping oldest files."""
+        try:
+            files = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith(".json")]
+            excess = len(files) - self.max_entries * 4
+            if excess > 0:
+                files.sort(key=os.path.getmtime)
+                for path in files[:excess]:
+                    os.unlink(path)
+        except OSError as e:
+            print(f"⚠️ Transcript cache prune failed: {e}")
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """Return the cached transcript or run ``compute`` once for all concurrent callers.
+
+        The load runs in a task owned by the cache and every caller awaits it
+        shielded, so one caller going away (a client disconnect cancels its
+        request) doesn't cancel the transcription for the others.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            print(f"⚡ Transcript cache hit ({key[:12]})")
+            return cached
+        task = self._inflight.get(key)
+        if task is not None:
+            self.inflight_joins += 1
+            print(f"🔗 Joining in-flight transcription ({key[:12]})")
+        else:
+            self.misses += 1
+            task = asyncio.get_running_loop().create_task(self._load(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._settle(key, done))
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        text = await compute()
+        self.put(key, text)
+        return text
+
+    def _settle(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark retrieved so an exception whose callers all went away is not reported as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses + self.inflight_joins
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "persistent": bool(self.cache_dir),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "inflight_joins": self.inflight_joins,
+            "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups, 3) if lookups else 0.0,
+        }
+
+
+transcript_cache = TranscriptCache()
+
+
+class WhisperClient:
+    """Shared keep-alive HTTP client for the Groq Whisper API.
+
+    One ``httpx.AsyncClient`` is kept per event loop, so async handlers reuse
+    pooled connections (HTTP/2 via ``httpx[http2]``; HTTP/1.1 if ``h2`` is
+    missing) instead of paying a TLS handshake per utterance. Clients of loops
+    that have closed are dropped. Synchronous callers go through a private
+    background loop and share its pool.
+    """
+
+    def __init__(self, url: str = GROQ_TRANSCRIPTION_URL, model: str = STT_MODEL,
+                 timeout: float = STT_TIMEOUT, max_connections: int = STT_POOL_MAX_CONNECTIONS,
+                 max_keepalive: int = STT_POOL_MAX_KEEPALIVE, keepalive_expiry: float = STT_KEEPALIVE_EXPIRY):
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        self.http2 = importlib.util.find_spec("h2") is not None
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self._sync_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshake_ms = 0.0
+        self.http_versions: Dict[str, int] = {}
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            with self._lock:
+                # Loops from finished asyncio.run() calls can't run their client again
+                for closed in [l for l in self._clients if l.is_closed()]:
+                    del self._clients[closed]
+                client = httpx.AsyncClient(http2=self.http2, limits=self.limits,
+                                           timeout=httpx.Timeout(self.timeout, connect=10.0))
+                self._clients[loop] = client
+        return client
+
+    def _tracer(self):
+        """httpcore trace hook recording whether a request opened a new connection."""
+        tls_started = []
+
+        async def trace(event: str, info: dict):
+            if event == "connection.connect_tcp.complete":
+                self.new_connections += 1
+            elif event == "connection.start_tls.started":
+                tls_started.append(time.perf_counter())
+            elif event == "connection.start_tls.complete" and tls_started:
+                self.tls_handshake_ms += (time.perf_counter() - tls_started.pop()) * 1000
+
+        return trace
+
+    async def transcribe(self, audio: bytes, filename: str = "audio.wav",
+                         content_type: str = "audio/wav", prompt: Optional[str] = None) -> str:
+        """Transcribe one in-memory audio file; errors come back as ``[Transcription error ...]``."""
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            print("❌ Groq API key not available for transcription")
+            return "[Transcription error: API key not found]"
+
+        data = {"model": self.model, "response_format": "json"}
+        if prompt:
+            data["prompt"] = prompt
+        try:
+            print(f"📤 Sending {len(audio)} bytes ({filename}) to Groq Whisper API...")
+            started = time.perf_counter()
+            self.requests += 1
+            response = await self._client().post(
+                self.url,
+                files={"file": (filename, audio, content_type)},
+                data=data,
+                headers={"Authorization": f"Bearer {api_key}"},
+                extensions={"trace": self._tracer()},
+            )
+            self.http_versions[response.http_version] = self.http_versions.get(response.http_version, 0) + 1
+            upload_stats.record_request(content_type, (time.perf_counter() - started) * 1000)
+            print(f"📡 Response status: {response.status_code} ({response.http_version}, "
+                  f"{(time.perf_counter() - started) * 1000:.0f} ms)")
+
+            if response.status_code != 200:
+                print(f"❌ API error: {response.text[:200]}")
+                return f"[Transcription error: API returned {response.status_code}]"
+
+            transcript = response.json().get("text", "").strip()
+            if not transcript or len(transcript) < 2:
+                print("⚠️ Transcription returned empty or very short result")
+                return ""
+            print(f"✅ Transcription successful: {transcript[:100]}...")
+            return transcript
+
+        except httpx.TimeoutException:
+            print("❌ Request timeout")
+            return "[Transcription error: API request timeout]"
+        except httpx.HTTPError as e:
+            print(f"❌ Request error: {e}")
+            return f"[Transcription error: Network error - {str(e)[:80]}]"
+        except Exception as e:
+            error_type = type(e).__name__
+            error_msg = str(e)
+            print(f"❌ Transcription error ({error_type}): {error_msg}")
+            if "auth" in error_msg.lower() or "key" in error_msg.lower():
+                return "[Transcription error: API authentication failed]"
+            elif "quota" in error_msg.lower() or "limit" in error_msg.lower():
+                return "[Transcription error: API quota exceeded]"
+            return f"[Transcription error: {error_type} - {error_msg[:100]}]"
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._sync_loop is None:
+                self._sync_loop = asyncio.new_event_loop()
+                threading.Thread(target=self._sync_loop.run_forever, name="whisper-client", daemon=True).start()
+            return self._sync_loop
+
+    def transcribe_sync(self, audio: bytes, filename: str = "audio.wav",
+                        content_type: str = "audio/wav", prompt: Optional[str] = None) -> str:
+        """Blocking variant for the CLI and worker threads."""
+        coro = self.transcribe(audio, filename, content_type, prompt)
+        return asyncio.run_coroutine_threadsafe(coro, self._background_loop()).result()
+
+    async def aclose(self):
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def stats(self) -> dict:
+        reused = max(0, self.requests - self.new_connections)
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": reused,
+            "reuse_rate": round(reused / self.requests, 3) if self.requests else 0.0,
+            "avg_tls_handshake_ms": round(self.tls_handshake_ms / self.new_connections, 1) if self.new_connections else 0.0,
+            "http2_enabled": self.http2,
+            "http_versions": dict(self.http_versions),
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+        }
+
+
+whisper_client = WhisperClient()
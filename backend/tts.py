@@ -0,0 +1,281 @@
+"""
+Text-to-speech with a phrase cache.
+
+Synthesized MP3 audio is cached by a hash of (voice, text) in a bounded
+in-memory LRU and a bounded on-disk store, so fixed phrases ("I didn't hear
+anything...") and repeated questions are synthesized once. ``prefetch``
+starts synthesis in the background as soon as the next question is known,
+so by the time it needs to be spoken the audio is usually already cached.
+
+The CLI plays audio with ``say``; the WebSocket server streams it to
+clients that opt in with ``stream_to_websocket``.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional
+
+from gtts import gTTS
+
+TTS_VOICE = os.getenv("TTS_VOICE", "en")
+TTS_MEMORY_MB = float(os.getenv("TTS_MEMORY_MB", "32"))
+TTS_DISK_MB = float(os.getenv("TTS_DISK_MB", "256"))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tts_cache"))
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "2"))
+TTS_STREAM_CHUNK = 16 * 1024
+
+# Spoken by the CLI loops every session; synthesized once and reused
+FIXED_PHRASES = [
+    "I didn't hear anything. Please speak a bit louder or check your microphone.",
+    "I couldn't understand that. Could you repeat more clearly?",
+    "Still couldn't hear you. Try moving closer to the microphone or increasing input volume.",
+    "Thank you for the interview. Here is your final feedback.",
+]
+
+
+class _Synthesis:
+    """One in-flight synthesis: the MP3 parts produced so far, fanned out to streaming listeners."""
+
+    def __init__(self):
+        self.future: Future = Future()
+        self._parts = []
+        self._listeners = []
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def add(self, part: bytes):
+        with self._lock:
+            self._parts.append(part)
+            for loop, parts in self._listeners:
+                loop.call_soon_threadsafe(parts.put_nowait, part)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for loop, parts in self._listeners:
+                loop.call_soon_threadsafe(parts.put_nowait, None)
+            self._listeners.clear()
+
+    def subscribe(self) -> "asyncio.Queue":
+        """Queue of the parts so far and every later one, then None (call from the event loop)."""
+        parts: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            for part in self._parts:
+                parts.put_nowait(part)
+            if self._closed:
+                parts.put_nowait(None)
+            else:
+                self._listeners.append((asyncio.get_running_loop(), parts))
+        return parts
+
+
+class TTSService:
+    """gTTS behind a memory + disk cache, with background prefetch and in-flight dedupe."""
+
+    def __init__(self, voice: str = TTS_VOICE, max_memory_bytes: int = int(TTS_MEMORY_MB * 1024 * 1024),
+                 cache_dir: Optional[str] = TTS_CACHE_DIR, max_disk_bytes: int = int(TTS_DISK_MB * 1024 * 1024),
+                 workers: int = TTS_WORKERS):
+        self.voice = voice
+        self.max_memory_bytes = max_memory_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._inflight: Dict[str, _Synthesis] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="tts")
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.inflight_joins = 0
+        self.prefetches = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(text: str, voice: str) -> str:
+        return hashlib.blake2b(f"{voice}|{text.strip()}".encode("utf-8"), digest_size=20).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        if self.cache_dir:
+            try:
+                with open(self._path(key), "rb") as f:
+                    audio = f.read()
+                self.disk_hits += 1
+                self._remember(key, audio)
+                return audio
+            except OSError:
+                pass
+        return None
+
+    def _remember(self, key: str, audio: bytes):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            self._entries[key] = audio
+            self._memory_bytes += len(audio)
+            while self._memory_bytes > self.max_memory_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def put(self, key: str, audio: bytes):
+        if not audio:
+            return
+        self._remember(key, audio)
+        if self.cache_dir:
+            try:
+                tmp = f"{self._path(key)}.{uuid.uuid4().hex}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(audio)
+                os.replace(tmp, self._path(key))
+                self._disk_writes += 1
+                if self._disk_writes % 32 == 0:
+                    self._prune_disk()
+            except OSError as e:
+                print(f"⚠️ Could not persist TTS cache entry: {e}")
+
+    def _prune_disk(self):
+        """Drop the oldest files once the on-disk store exceeds its byte budget."""
+        try:
+            files = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith(".mp3")]
+            sizes = {path: os.path.getsize(path) for path in files}
+            total = sum(sizes.values())
+            if total <= self.max_disk_bytes:
+                return
+            for path in sorted(files, key=os.path.getmtime):
+                os.unlink(path)
+                total -= sizes[path]
+                if total <= self.max_disk_bytes:
+                    break
+        except OSError as e:
+            print(f"⚠️ TTS cache prune failed: {e}")
+
+    def _synthesize_parts(self, text: str, voice: str) -> Iterator[bytes]:
+        # gTTS splits long text and fetches it part by part; yield each as it arrives
+        yield from gTTS(text=text, lang=voice).stream()
+
+    def _compute(self, key: str, text: str, voice: str, synthesis: _Synthesis):
+        try:
+            for part in self._synthesize_parts(text, voice):
+                synthesis.add(part)
+            audio = b"".join(synthesis._parts)
+            self.put(key, audio)
+            synthesis.future.set_result(audio)
+        except Exception as e:
+            print(f"❌ TTS error: {e}")
+            synthesis.future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            synthesis.close()
+
+    def _synthesis(self, key: str, text: str, voice: str) -> _Synthesis:
+        """The in-flight synthesis of ``key``, started if there is none."""
+        with self._lock:
+            synthesis = self._inflight.get(key)
+            if synthesis is not None:
+                self.inflight_joins += 1
+                return synthesis
+            self.misses += 1
+            synthesis = _Synthesis()
+            self._inflight[key] = synthesis
+        self._pool.submit(self._compute, key, text, voice, synthesis)
+        return synthesis
+
+    def prefetch(self, text: str, voice: Optional[str] = None) -> Future:
+        """Start synthesizing ``text`` in the background; returns a future for the MP3 bytes."""
+        voice = voice or self.voice
+        key = self.key(text, voice)
+        cached = self.get(key)
+        if cached is not None:
+            done: Future = Future()
+            done.set_result(cached)
+            return done
+        return self._synthesis(key, text, voice).future
+
+    def synthesize(self, text: str, voice: Optional[str] = None) -> bytes:
+        """MP3 bytes for ``text``, from cache when possible (blocking)."""
+        return self.prefetch(text, voice).result()
+
+    async def synthesize_async(self, text: str, voice: Optional[str] = None) -> bytes:
+        return await asyncio.wrap_future(self.prefetch(text, voice))
+
+    def warm(self, phrases: Iterable[str] = FIXED_PHRASES):
+        """Prefetch phrases that will certainly be spoken."""
+        for phrase in phrases:
+            self.prefetch(phrase)
+            self.prefetches += 1
+
+    async def stream_to_websocket(self, ws, text: str, voice: Optional[str] = None):
+        """Send ``text`` as MP3 over a WebSocket: a ``tts_start`` message, binary chunks, then ``tts_end``.
+
+        Cached audio goes out immediately. Otherwise each part gTTS produces is
+        forwarded as soon as it arrives, including when a prefetch of the same
+        text is already running, so playback can start before the whole
+        sentence is synthesized.
+        """
+        voice = voice or self.voice
+        key = self.key(text, voice)
+        tts_id = key[:12]
+        audio = self.get(key)
+        cached = audio is not None
+        # A prefetch already under way is joined part by part rather than awaited whole
+        parts = None if cached else self._synthesis(key, text, voice).subscribe()
+
+        await ws.send_json({"type": "tts_start", "id": tts_id, "text": text, "format": "audio/mpeg",
+                            "cached": cached})
+        sent = 0
+        if cached:
+            for start in range(0, len(audio), TTS_STREAM_CHUNK):
+                await ws.send_bytes(audio[start:start + TTS_STREAM_CHUNK])
+            sent = len(audio)
+        else:
+            while (part := await parts.get()) is not None:
+                await ws.send_bytes(part)
+                sent += len(part)
+        await ws.send_json({"type": "tts_end", "id": tts_id, "bytes": sent})
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses + self.inflight_joins
+        return {
+            "entries": len(self._entries),
+            "memory_bytes": self._memory_bytes,
+            "max_memory_bytes": self.max_memory_bytes,
+            "persistent": bool(self.cache_dir),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "inflight_joins": self.inflight_joins,
+            "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups, 3) if lookups else 0.0,
+        }
+
+
+tts_service = TTSService()
+
+
+def say(text: str):
+    """Speak ``text`` on the local audio device (CLI)."""
+    if not text.strip():
+        return
+    try:
+        import sounddevice as sd
+        import soundfile as sf
+        data, sr = sf.read(io.BytesIO(tts_service.synthesize(text)), dtype="float32")
+        sd.play(data, sr); sd.wait()
+    except Exception as e:
+        print(f"TTS error: {e}")
@@ -0,0 +1,218 @@
+"""
+Streaming, size-capped multipart uploads.
+
+FastAPI's UploadFile reads the whole body before the handler runs, and
+`await file.read()` then copies it into memory again. Here the request body
+is parsed chunk by chunk as it arrives: each chunk of the wanted form field
+is handed straight to a sink (an audio decoder, a spooled temp file), the
+byte count is checked on every chunk so oversized uploads are rejected
+without reading the rest, and peak per-request memory is tracked for
+/metrics.
+"""
+import asyncio
+import os
+import tempfile
+import threading
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from multipart.multipart import MultipartParser, parse_options_header
+
+MAX_AUDIO_UPLOAD_BYTES = int(os.getenv("MAX_AUDIO_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+MAX_RESUME_UPLOAD_BYTES = int(os.getenv("MAX_RESUME_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# Resumes larger than this spill from memory to a temp file
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+
+
+class UploadMetrics:
+    """Per-endpoint upload counters: sizes, rejections, failures and peak memory held."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint: str, nbytes: int, peak_memory: int, rejected: bool = False,
+               failure: Optional[str] = None):
+        """``failure`` names why the upload couldn't be used: "incomplete", "decode_error",
+        "timeout" or "broken_pipe" (the decoder stopped reading mid-upload)."""
+        with self._lock:
+            s = self._endpoints.setdefault(endpoint, {
+                "requests": 0, "rejected": 0, "bytes_in": 0,
+                "peak_memory_max": 0, "peak_memory_total": 0, "failures": {},
+            })
+            s["requests"] += 1
+            s["rejected"] += int(rejected)
+            if failure:
+                s["failures"][failure] = s["failures"].get(failure, 0) + 1
+            s["bytes_in"] += nbytes
+            s["peak_memory_max"] = max(s["peak_memory_max"], peak_memory)
+            s["peak_memory_total"] += peak_memory
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {}
+            for name, s in self._endpoints.items():
+                out[name] = {
+                    "requests": s["requests"],
+                    "rejected": s["rejected"],
+                    "failures": dict(s["failures"]),
+                    "bytes_in": s["bytes_in"],
+                    "peak_memory_max": s["peak_memory_max"],
+                    "peak_memory_avg": round(s["peak_memory_total"] / s["requests"]) if s["requests"] else 0,
+                }
+            return out
+
+
+upload_metrics = UploadMetrics()
+
+
+class SpooledSink:
+    """Upload sink that keeps small files in memory and spills big ones to disk."""
+
+    def __init__(self, spool_bytes: int = UPLOAD_SPOOL_BYTES):
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+        self.filename = ""
+        self.content_type = ""
+
+    async def start(self, filename: str, content_type: str):
+        self.filename = filename
+        self.content_type = content_type
+
+    async def write(self, chunk: bytes):
+        self.file.write(chunk)
+
+    async def finish(self):
+        self.file.seek(0)
+
+    def memory_bytes(self) -> int:
+        # Once rolled over the data lives on disk
+        return 0 if getattr(self.file, "_rolled", False) else self.file.tell()
+
+    async def close(self):
+        self.file.close()
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes // (1024 * 1024)} MB limit")
+
+
+async def stream_upload(request: Request, sink, field: str = "file", max_bytes: int = MAX_AUDIO_UPLOAD_BYTES,
+                        endpoint: Optional[str] = None) -> int:
+    """Feed one multipart form field into `sink` as the body arrives.
+
+    Returns the number of bytes received for the field, whose sink has been
+    finished. Raises 413 as soon as the upload exceeds `max_bytes`, and 400 if
+    the field is missing or the body ends before the field does (a truncated
+    upload). Errors from the sink itself (e.g. the decoder failing) propagate.
+    The sink is not closed here; the caller owns it.
+    """
+    endpoint = endpoint or request.url.path
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + 64 * 1024:
+        upload_metrics.record(endpoint, 0, 0, rejected=True)
+        raise _too_large(max_bytes)
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data upload")
+
+    # The parser callbacks are synchronous, so collect events per body chunk
+    # and apply them afterwards with awaits (same approach as Starlette).
+    events = []
+    header_field = bytearray()
+    header_value = bytearray()
+    part_headers = {}
+
+    def on_header_field(data, start, end):
+        header_field.extend(data[start:end])
+
+    def on_header_value(data, start, end):
+        header_value.extend(data[start:end])
+
+    def on_header_end():
+        part_headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished():
+        events.append(("headers", dict(part_headers)))
+        part_headers.clear()
+
+    def on_part_data(data, start, end):
+        events.append(("data", data[start:end]))
+
+    def on_part_end():
+        events.append(("end", None))
+
+    def on_end():
+        events.append(("eof", None))
+
+    parser = MultipartParser(boundary, {
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+        "on_end": on_end,
+    })
+
+    received = 0
+    peak = 0
+    found = False
+    finished = False
+    in_field = False
+
+    async def apply_events():
+        nonlocal received, peak, found, finished, in_field
+        for kind, payload in events:
+            if kind == "headers":
+                _, disposition = parse_options_header(payload.get(b"content-disposition", b""))
+                in_field = not found and disposition.get(b"name", b"").decode() == field
+                if in_field:
+                    found = True
+                    filename = disposition.get(b"filename", b"").decode("utf-8", errors="ignore")
+                    part_type = payload.get(b"content-type", b"").decode("latin-1").strip().lower()
+                    await sink.start(filename, part_type)
+            elif kind == "data" and in_field:
+                received += len(payload)
+                if received > max_bytes:
+                    raise _too_large(max_bytes)
+                await sink.write(payload)
+                peak = max(peak, sink.memory_bytes())
+            elif kind in ("end", "eof") and in_field:
+                # "eof": the closing boundary arrived while the part was still open
+                in_field = False
+                finished = True
+                await sink.finish()
+                peak = max(peak, sink.memory_bytes())
+        events.clear()
+
+    try:
+        async for body_chunk in request.stream():
+            parser.write(body_chunk)
+            await apply_events()
+        parser.finalize()
+        await apply_events()
+        if found and not finished:
+            raise HTTPException(status_code=400, detail=f"Upload ended before form field '{field}' was complete")
+    except HTTPException as e:
+        incomplete = e.status_code == 400 and found and not finished
+        upload_metrics.record(endpoint, received, peak, rejected=e.status_code == 413,
+                              failure="incomplete" if incomplete else None)
+        raise
+    except Exception as e:
+        if getattr(sink, "broken_pipe", False):
+            failure = "broken_pipe"
+        elif isinstance(e, asyncio.TimeoutError):
+            failure = "timeout"
+        else:
+            failure = "decode_error"
+        upload_metrics.record(endpoint, received, peak, failure=failure)
+        raise
+
+    upload_metrics.record(endpoint, received, peak)
+    if not found:
+        raise HTTPException(status_code=400, detail=f"Missing form field '{field}'")
+    return received
@@ -1,4 +1,8 @@
-import soundfile as sf
+import os
+import time
+from collections import deque
+from typing import Optional, Tuple
+
 import numpy as np
 import webrtcvad
 import pyaudio
@@ -13,6 +17,44 @@ FRAME_SIZE = int(SAMPLE_RATE * FRAME_DURATION / 1000)
 CHANNELS = 1
 FORMAT = pyaudio.paInt16
 
+# "adaptive" (default) or "fixed" end-of-utterance detection
+ENDPOINTING_MODE = os.getenv("VAD_ENDPOINTING", "adaptive").lower()
+
+
+class EndpointingStats:
+    """Recent per-turn endpointing reports, summarized for /metrics to tune against false cut-offs."""
+
+    def __init__(self, max_turns: int = 200):
+        self.history = deque(maxlen=max_turns)
+        self.turns = 0
+
+    def record(self, report: dict):
+        self.history.append(report)
+        self.turns += 1
+
+    @staticmethod
+    def _percentile(values, q: float) -> int:
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0
+
+    def stats(self) -> dict:
+        recent = list(self.history)
+        delays = [r["endpoint_delay_ms"] for r in recent]
+        windows = [r["window_ms"] for r in recent]
+        return {
+            "mode": ENDPOINTING_MODE,
+            "turns": self.turns,
+            "recent_turns": len(recent),
+            "p50_endpoint_delay_ms": self._percentile(delays, 0.5),
+            "p90_endpoint_delay_ms": self._percentile(delays, 0.9),
+            "p50_window_ms": self._percentile(windows, 0.5),
+            "last_window_ms": windows[-1] if windows else 0,
+            "cut_offs": sum(1 for r in recent if r.get("cut_off")),
+        }
+
+
+endpoint_stats = EndpointingStats()
+
 def build_interviewer_prompt(topics):
     topics_str = ", ".join(topics)
     return f"""
@@ -70,99 +112,320 @@ def get_user_topics():
         chosen = TOPIC_OPTIONS
     return chosen
 
-def record_with_vad(filename="answer.wav"):
-    print("🎤 Listening for speech...")
-    vad = webrtcvad.Vad(1)  # REDUCED aggressiveness: 0 (least) to 3 (most) - using 1 for better detection
-    
-    p = pyaudio.PyAudio()
-    
-    # Log device info
-    device_info = p.get_default_input_device_info()
-    print(f"📌 Using device: {device_info['name']}")
-    print(f"📊 Sample rate: {SAMPLE_RATE} Hz, Frame size: {FRAME_SIZE}")
-    
-    stream = p.open(format=FORMAT,
-                    channels=CHANNELS,
-                    rate=SAMPLE_RATE,
-                    input=True,
-                    frames_per_buffer=FRAME_SIZE)
-    
-    frames = []
+class AudioRingBuffer:
+    """Preallocated int16 ring buffer that holds the current utterance.
+
+    Frames are copied straight into the backing array, so the capture loop does
+    not allocate per frame. If an utterance outgrows the buffer the oldest
+    samples are overwritten, so writers check ``remaining`` first and stop (or
+    flush) instead. At the default 180 s it holds 5.8 MB: keep one per session
+    and pass it to every capture rather than allocating one per answer.
+    """
+
+    def __init__(self, max_seconds: float = 180, sample_rate: int = SAMPLE_RATE):
+        self.capacity = int(max_seconds * sample_rate)
+        self._buf = np.zeros(self.capacity, dtype=np.int16)
+        self._write = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def remaining(self) -> int:
+        """Samples that can still be written before the oldest start being overwritten."""
+        return self.capacity - self._count
+
+    def clear(self):
+        self._write = 0
+        self._count = 0
+
+    def write(self, chunk) -> None:
+        """Append a frame given as raw int16 bytes or an int16 array."""
+        samples = np.frombuffer(chunk, dtype=np.int16) if not isinstance(chunk, np.ndarray) else chunk
+        n = len(samples)
+        if n >= self.capacity:
+            self._buf[:] = samples[-self.capacity:]
+            self._write = 0
+            self._count = self.capacity
+            return
+        end = self._write + n
+        if end <= self.capacity:
+            self._buf[self._write:end] = samples
+        else:
+            split = self.capacity - self._write
+            self._buf[self._write:] = samples[:split]
+            self._buf[:n - split] = samples[split:]
+        self._write = end % self.capacity
+        self._count = min(self.capacity, self._count + n)
+
+    def tail(self, n: int) -> np.ndarray:
+        """Return the last ``n`` samples as a view (copies only if they wrap)."""
+        n = min(n, self._count)
+        start = self._write - n
+        if start >= 0:
+            return self._buf[start:self._write]
+        return np.concatenate((self._buf[start:], self._buf[:self._write]))
+
+    def view(self) -> np.ndarray:
+        """Return the buffered audio in order.
+
+        This is a zero-copy view unless the buffer has wrapped, in which case the
+        two halves are joined once.
+        """
+        if self._count < self.capacity:
+            return self._buf[:self._count]
+        return np.concatenate((self._buf[self._write:], self._buf[:self._write]))
+
+
+class _BlockLevels:
+    """Peak/RMS statistics for a block of frames using preallocated scratch space."""
+
+    def __init__(self, block_frames: int, frame_size: int = FRAME_SIZE):
+        self.block_frames = block_frames
+        self.frame_size = frame_size
+        self._scratch = np.empty((block_frames, frame_size), dtype=np.float32)
+        self._peaks = np.empty(block_frames, dtype=np.float32)
+        self._power = np.empty(block_frames, dtype=np.float32)
+
+    def compute(self, samples: np.ndarray):
+        """Return (peak, rms) over ``samples``, which must hold whole frames."""
+        n = min(len(samples) // self.frame_size, self.block_frames)
+        if n == 0:
+            return 0, 0.0
+        frames = samples[:n * self.frame_size].reshape(n, self.frame_size)
+        scratch = self._scratch[:n]
+        np.absolute(frames, out=scratch, dtype=np.float32)
+        np.max(scratch, axis=1, out=self._peaks[:n])
+        np.multiply(scratch, scratch, out=scratch)
+        np.mean(scratch, axis=1, out=self._power[:n])
+        return int(self._peaks[:n].max()), float(np.sqrt(self._power[:n].mean()))
+
+
+class _ThrottledLog:
+    """print() wrapper that emits each message key at most once per interval."""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._last = {}
+
+    def __call__(self, key: str, message: str, force: bool = False):
+        now = time.monotonic()
+        if force or now - self._last.get(key, float("-inf")) >= self.interval:
+            self._last[key] = now
+            print(message)
+
+
+class FixedEndpointer:
+    """Ends the turn after a fixed run of silence frames following speech."""
+
+    mode = "fixed"
+
+    def __init__(self, max_silence: int = 150):
+        self.max_silence = max_silence
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.speech_frames = 0
+        self.silence_run = 0
+        # Set by the capture loop when the turn was ended by the buffer filling up
+        self.cut_off = False
+
+    def window(self) -> int:
+        return self.max_silence
+
+    def update(self, is_speech: bool) -> bool:
+        """Feed one post-speech-onset frame; return True when the turn has ended."""
+        self.frames += 1
+        if is_speech:
+            self.speech_frames += 1
+            self.silence_run = 0
+            return False
+        self.silence_run += 1
+        return self.silence_run > self.window()
+
+    def report(self) -> dict:
+        return {
+            "mode": self.mode,
+            "endpoint_delay_ms": self.silence_run * FRAME_DURATION,
+            "window_ms": self.window() * FRAME_DURATION,
+            "utterance_ms": self.frames * FRAME_DURATION,
+            "speech_ms": self.speech_frames * FRAME_DURATION,
+            "cut_off": self.cut_off,
+        }
+
+
+class AdaptiveEndpointer(FixedEndpointer):
+    """Silence window that adapts to the candidate's own pauses within a turn.
+
+    The window starts from the 90th percentile of pauses already observed in
+    this utterance (people who pause long mid-thought get a longer window),
+    is widened for very short utterances, where the candidate is likely still
+    collecting their thoughts, and for hesitant speech with a low speech/pause
+    ratio. It is always clamped to ``[min_silence, max_silence]`` frames.
+    """
+
+    mode = "adaptive"
+
+    def __init__(self, min_silence: int = 20, max_silence: int = 150,
+                 default_pause: int = 17, pause_margin: float = 1.4,
+                 short_utterance_frames: int = 67, short_bonus: int = 30,
+                 min_pause: int = 3):
+        self.min_silence = min_silence
+        self.default_pause = default_pause
+        self.pause_margin = pause_margin
+        self.short_utterance_frames = short_utterance_frames
+        self.short_bonus = short_bonus
+        self.min_pause = min_pause
+        super().__init__(max_silence)
+
+    def reset(self):
+        super().reset()
+        self.pauses = []
+
+    def _pause_p90(self) -> int:
+        if not self.pauses:
+            return self.default_pause
+        ordered = sorted(self.pauses)
+        return ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))]
+
+    def window(self) -> int:
+        window = self._pause_p90() * self.pause_margin
+        # Short answers ("um, so...") are often followed by a long think
+        if self.speech_frames < self.short_utterance_frames:
+            window += self.short_bonus * (1 - self.speech_frames / self.short_utterance_frames)
+        # Hesitant speakers (mostly pauses) get proportionally more room; the
+        # silence run being measured right now is not part of the ratio
+        speech_ratio = self.speech_frames / max(1, self.frames - self.silence_run)
+        window *= min(1.5, max(1.0, 0.7 / max(speech_ratio, 0.01)))
+        return int(min(self.max_silence, max(self.min_silence, window)))
+
+    def update(self, is_speech: bool) -> bool:
+        if is_speech and self.silence_run >= self.min_pause:
+            self.pauses.append(self.silence_run)
+        return super().update(is_speech)
+
+    def report(self) -> dict:
+        report = super().report()
+        report.update({
+            "pauses": len(self.pauses),
+            "p90_pause_ms": self._pause_p90() * FRAME_DURATION,
+        })
+        return report
+
+
+def make_endpointer(mode: Optional[str] = None, max_silence: int = 150) -> FixedEndpointer:
+    """Build the configured endpointer (``VAD_ENDPOINTING`` env var by default)."""
+    if (mode or ENDPOINTING_MODE) == "fixed":
+        return FixedEndpointer(max_silence)
+    return AdaptiveEndpointer(max_silence=max_silence)
+
+
+def capture_with_vad(stream=None, buffer: Optional[AudioRingBuffer] = None,
+                     endpointer: Optional[FixedEndpointer] = None,
+                     vad_aggressiveness: int = 1, no_speech_limit: int = 200,
+                     level_block: int = 16, log_interval: float = 1.5) -> Tuple[np.ndarray, bool]:
+    """Capture one utterance from the microphone and return it in memory.
+
+    Returns ``(audio, heard_speech)`` where ``audio`` is an int16 NumPy view into
+    the capture buffer (call ``audio.tobytes()`` or ``memoryview(audio)`` as
+    needed). ``stream`` may be any object with a PyAudio-style ``read()``; when
+    omitted the default input device is opened. Pass ``buffer`` to reuse one
+    preallocated buffer across captures - the returned view is then only valid
+    until the next capture into that buffer. The end of the turn is decided by
+    ``endpointer`` (see ``make_endpointer``); its ``report()`` afterwards holds
+    the endpointing delay for this turn, and ``cut_off`` if the answer filled
+    the buffer and recording stopped there rather than overwrite its start.
+    """
+    vad = webrtcvad.Vad(vad_aggressiveness)
+    ring = buffer if buffer is not None else AudioRingBuffer()
+    ring.clear()
+    endpointer = endpointer if endpointer is not None else make_endpointer()
+    endpointer.reset()
+    levels = _BlockLevels(level_block)
+    log = _ThrottledLog(log_interval)
+
+    p = None
+    if stream is None:
+        print("🎤 Listening for speech...")
+        p = pyaudio.PyAudio()
+        device_info = p.get_default_input_device_info()
+        print(f"📌 Using device: {device_info['name']}")
+        print(f"📊 Sample rate: {SAMPLE_RATE} Hz, Frame size: {FRAME_SIZE}")
+        stream = p.open(format=FORMAT,
+                        channels=CHANNELS,
+                        rate=SAMPLE_RATE,
+                        input=True,
+                        frames_per_buffer=FRAME_SIZE)
+        print("🔴 READY - Please speak now!")
+
     silence_count = 0
-    speech_count = 0
     speech_started = False
-    max_silence = 150  # ~4.5s of silence to stop (increased from 60 to prevent premature cutoff)
-    min_speech_frames = 1  # Capture immediately - don't cut first sentence
-    
-    print("🔴 READY - Please speak now!")
-    
+    frames_since_levels = 0
+    block_samples = level_block * FRAME_SIZE
+
     try:
         while True:
             audio_chunk = stream.read(FRAME_SIZE, exception_on_overflow=False)
-            
-            # Calculate audio level for debugging
-            import numpy as np
-            audio_np = np.frombuffer(audio_chunk, dtype=np.int16)
-            max_amplitude = np.max(np.abs(audio_np))
-            rms = np.sqrt(np.mean(audio_np.astype(float)**2))
-            
             is_speech = vad.is_speech(audio_chunk, SAMPLE_RATE)
-            
-            if is_speech:
-                speech_count += 1
-                silence_count = 0
-                
-                # Only mark as "speech started" after consecutive speech frames
-                if not speech_started and speech_count >= min_speech_frames:
+
+            if not speech_started:
+                if is_speech:
                     speech_started = True
-                    print(f"🗣️  SPEECH STARTED (level: {max_amplitude}, rms: {rms:.0f})")
-                elif speech_started:
-                    print(f"🗣️  Speech (level: {max_amplitude})")
+                    ring.clear()
+                    log("speech", "🗣️  SPEECH STARTED", force=True)
                 else:
-                    print(f"🔊 Detecting speech... ({speech_count}/{min_speech_frames})")
-                
-                frames.append(audio_chunk)
+                    silence_count += 1
+            turn_ended = speech_started and endpointer.update(is_speech)
+
+            if speech_started and ring.remaining < FRAME_SIZE:
+                # Writing on would overwrite the start of the answer
+                endpointer.cut_off = turn_ended = True
+                print(f"⚠️  Answer reached the {ring.capacity / SAMPLE_RATE:.0f}s recording limit, stopping.")
             else:
-                speech_count = 0
-                silence_count += 1
-                
-                if silence_count % 50 == 0:  # Log every ~1.5 seconds
-                    print(f"🤫 Silence... ({silence_count}/{max_silence} before stop, level: {max_amplitude})")
-                
-                if speech_started:  # Only add silence frames after speech has started
-                    frames.append(audio_chunk)
-            
-            # Stop recording after speech has started and enough silence is detected
-            if speech_started and silence_count > max_silence:
-                print(f"✅ Silence threshold reached ({silence_count} frames), stopping recording.")
+                # Leading silence is kept only for level stats; the buffer is cleared
+                # when speech starts, so it never reaches the returned audio.
+                ring.write(audio_chunk)
+
+            frames_since_levels += 1
+            if frames_since_levels >= level_block:
+                frames_since_levels = 0
+                peak, rms = levels.compute(ring.tail(block_samples))
+                if speech_started and endpointer.silence_run == 0:
+                    log("speech", f"🗣️  Speech (level: {peak}, rms: {rms:.0f})")
+                elif speech_started:
+                    log("silence", f"🤫 Silence... ({endpointer.silence_run}/{endpointer.window()} before stop, level: {peak})")
+                else:
+                    log("silence", f"🤫 Waiting for speech... ({silence_count}/{no_speech_limit}, level: {peak})")
+
+            # Stop recording once the endpointer is confident the turn is over
+            if turn_ended:
+                report = endpointer.report()
+                endpoint_stats.record(report)
+                print(f"✅ End of turn ({report['mode']}): delay {report['endpoint_delay_ms']} ms, "
+                      f"utterance {report['utterance_ms'] / 1000:.1f}s")
                 break
-                
+
             # Safety break - don't record forever if no speech detected
-            if not speech_started and silence_count > 200:
+            if not speech_started and silence_count > no_speech_limit:
                 print(f"⏱️  No speech detected for too long ({silence_count} frames), stopping.")
                 break
-                
+
     except KeyboardInterrupt:
         print("⚠️  Recording stopped by user.")
     finally:
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-    
-    if frames:
-        # Concatenate all frames
-        audio_data = b''.join(frames)
-        # Convert to NumPy array for soundfile
-        audio_np = np.frombuffer(audio_data, dtype=np.int16)
-        max_amplitude = np.max(np.abs(audio_np))
-        print(f"📼 Recording saved: {len(frames)} frames, max amplitude: {max_amplitude}")
-        sf.write(filename, audio_np, SAMPLE_RATE)
-        return filename, True
-    else:
+        if p is not None:
+            stream.stop_stream()
+            stream.close()
+            p.terminate()
+
+    if not speech_started:
         print("❌ No audio recorded - no frames captured")
-        # Create empty file
-        sf.write(filename, np.array([]), SAMPLE_RATE)
-        return filename, False
-        # Create empty file
-        sf.write(filename, np.array([]), SAMPLE_RATE)
-        return filename, False
\ No newline at end of file
+        return ring.view()[:0], False
+
+    audio = ring.view()
+    print(f"📼 Recording captured: {len(audio) // FRAME_SIZE} frames, "
+          f"{len(audio) / SAMPLE_RATE:.1f}s")
+    return audio, True
+
@@ -0,0 +1,275 @@
+"""
+Write-behind persistence for interview sessions.
+
+Progress updates and question responses used to be written inline, so every
+submission waited on one or two Supabase round trips before the candidate
+got feedback, and progress was written twice per question (once from
+``next_question`` and again from the submit handler). When Supabase was
+slow or down, those writes were simply lost.
+
+``WriteBehindQueue`` takes all interview writes off the request path and
+makes them durable:
+
+* every write is first appended to the local outbox (outbox.py), so it
+  survives DB brownouts and process restarts;
+* progress updates are coalesced per session, last write wins, so a burst
+  of updates becomes one PATCH;
+* question responses are sent as one bulk insert per flush;
+* a background task replays the outbox every ``DB_FLUSH_INTERVAL_MS``,
+  per session in order, backing off on failures;
+* ``complete`` folds a session's pending create, responses and progress into
+  the single ``complete_interview`` RPC call. It locks only its own session,
+  so an interview ending never waits behind other sessions' writes;
+* if a bulk response insert fails, it is retried per session and then per
+  row, so one row the database rejects can't hold back everyone else's
+  (after ``OUTBOX_MAX_ATTEMPTS`` that row is dead-lettered, see outbox.py).
+
+Entries stay in the outbox until the database acknowledges them; their keys
+are sent as idempotency keys, so a replay never duplicates a row.
+"""
+import asyncio
+import os
+import time
+import weakref
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import InterviewDatabase, db
+from outbox import Outbox, OutboxEntry
+
+DB_FLUSH_INTERVAL_MS = int(os.getenv("DB_FLUSH_INTERVAL_MS", "500"))
+
+
+class WriteBehindQueue:
+    """Replays the outbox: coalesces progress, batches inserts, completes in one call."""
+
+    def __init__(self, database: InterviewDatabase = db, outbox: Optional[Outbox] = None,
+                 interval_ms: int = DB_FLUSH_INTERVAL_MS):
+        self.db = database
+        self.outbox = outbox or Outbox()
+        self.interval = interval_ms / 1000
+        self._task: Optional[asyncio.Task] = None
+        # One background flush at a time; each session's writes are serialized by its own lock
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self.enqueued = 0
+        self.coalesced = 0
+        self.round_trips = 0
+        self.flushes = 0
+        self.flush_ms = 0.0
+
+    def start(self):
+        """Start the background replayer (call from a running event loop)."""
+        self._ensure_running()
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ Write-behind flush failed: {e}")
+
+    def _append(self, op: str, session_id: str, payload: Dict[str, Any], **kwargs) -> Optional[str]:
+        if not self.db.configured:
+            return None
+        self._ensure_running()
+        self.enqueued += 1
+        return self.outbox.append(op, session_id, payload, **kwargs)
+
+    def create_session(self, session_data: Dict[str, Any]):
+        """Queue the initial interview row."""
+        payload = {**session_data, "created_at": datetime.utcnow().isoformat()}
+        self._append("create", session_data["session_id"], payload)
+
+    def update_progress(self, session_id: str, progress_data: Dict[str, Any]):
+        """Queue a progress update; replaces any pending update for the session."""
+        self._append("progress", session_id, dict(progress_data), replace_pending=True)
+
+    def store_question_response(self, session_id: str, question_index: int, question_data: Dict[str, Any]):
+        """Queue a question_responses row (question_index is 1-based)."""
+        if not self.db.configured:
+            return
+        row = self.db.question_response_row(session_id, question_index, question_data)
+        self._append("response", session_id, row, key=row["idempotency_key"])
+
+    async def complete(self, session_id: str, results_data: Dict[str, Any],
+                       session_data: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Record the completion durably and apply it now, with the session's other pending writes.
+
+        Returns the completed row, or None if the database couldn't be reached;
+        the completion then stays in the outbox and is replayed later.
+        """
+        if self._append("complete", session_id, {"results": results_data, "session": session_data}) is None:
+            return None
+        rows = await self.flush(session_id)
+        return rows.get(session_id)
+
+    def _session_lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[session_id] = lock
+        return lock
+
+    async def flush(self, session_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Apply due outbox entries (all, or ``session_id``'s regardless of backoff).
+
+        Returns completed interview rows by session_id.
+        """
+        if session_id is not None:
+            return await self._flush_session(session_id)
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            sessions: Dict[str, List[OutboxEntry]] = {}
+            for e in self.outbox.due():
+                sessions.setdefault(e.session_id, []).append(e)
+            # Sessions being completed right now are left to their own flush
+            locks = {sid: self._session_lock(sid) for sid in sessions}
+            sessions = {sid: group for sid, group in sessions.items() if not locks[sid].locked()}
+            if not sessions:
+                return {}
+            for sid in sessions:
+                # Free locks are taken without yielding, so no completion can slip in between
+                await locks[sid].acquire()
+            try:
+                return await self._apply(sessions)
+            finally:
+                for sid in sessions:
+                    locks[sid].release()
+
+    async def _flush_session(self, session_id: str) -> Dict[str, Dict[str, Any]]:
+        async with self._session_lock(session_id):
+            entries = self.outbox.due(session_id, force=True)
+            if not entries:
+                return {}
+            return await self._apply({session_id: entries})
+
+    async def _apply(self, sessions: Dict[str, List[OutboxEntry]]) -> Dict[str, Dict[str, Any]]:
+        started = time.perf_counter()
+        self.flushes += 1
+        completing = {sid: group for sid, group in sessions.items() if any(e.op == "complete" for e in group)}
+        rest = [e for sid, group in sessions.items() if sid not in completing for e in group]
+        results = await asyncio.gather(
+            self._apply_writes(rest),
+            *(self._apply_completion(sid, group) for sid, group in completing.items()),
+        )
+        self.flush_ms += (time.perf_counter() - started) * 1000
+        return {sid: row for sid, row in zip(completing, results[1:]) if row}
+
+    async def _apply_writes(self, entries: List[OutboxEntry]):
+        """Creates, then one bulk response insert, then the latest progress per session."""
+        failed = set()
+        creates = [e for e in entries if e.op == "create"]
+        if creates:
+            self.round_trips += len(creates)
+            ids = await asyncio.gather(*(self.db.create_interview_session(e.payload) for e in creates),
+                                       return_exceptions=True)
+            for e, interview_id in zip(creates, ids):
+                if isinstance(interview_id, str):
+                    self.outbox.ack([e])
+                else:
+                    failed.add(e.session_id)
+                    self.outbox.fail([e], "create failed")
+
+        responses = [e for e in entries if e.op == "response" and e.session_id not in failed]
+        if responses:
+            stored, rejected = await self._insert_responses(responses)
+            self.outbox.ack(stored)
+            failed.update(e.session_id for e in rejected)
+            self.outbox.fail(rejected, "insert failed")
+
+        progress: Dict[str, List[OutboxEntry]] = {}
+        for e in entries:
+            if e.op == "progress" and e.session_id not in failed:
+                progress.setdefault(e.session_id, []).append(e)
+        if progress:
+            ids = list(progress)
+            self.round_trips += len(ids)
+            self.coalesced += sum(len(group) - 1 for group in progress.values())
+            oks = await asyncio.gather(
+                *(self.db.update_interview_progress(sid, progress[sid][-1].payload) for sid in ids),
+                return_exceptions=True,
+            )
+            for sid, ok in zip(ids, oks):
+                if ok is True:
+                    self.outbox.ack(progress[sid])
+                else:
+                    self.outbox.fail(progress[sid], "progress update failed")
+
+    async def _insert_responses(self, entries: List[OutboxEntry]) -> Tuple[List[OutboxEntry], List[OutboxEntry]]:
+        """Insert response entries, splitting a failed batch; returns (stored, failed).
+
+        A failed batch is retried per session, and a session that still fails
+        is retried row by row, so one bad row only holds back itself. A retry
+        round in which nothing succeeds means the database is down rather than
+        a row being bad, so splitting stops there.
+        """
+        stored: List[OutboxEntry] = []
+        failed: List[OutboxEntry] = []
+        pending, first = [entries], True
+        while pending:
+            self.round_trips += len(pending)
+            oks = await asyncio.gather(*(self.db.store_question_responses([e.payload for e in group])
+                                         for group in pending))
+            stored += [e for group, ok in zip(pending, oks) if ok for e in group]
+            rejected = [group for group, ok in zip(pending, oks) if not ok]
+            if not first and len(rejected) == len(pending):
+                failed += [e for group in rejected for e in group]
+                break
+            first = False
+            pending = []
+            for group in rejected:
+                if len(group) == 1:
+                    failed += group
+                elif len({e.session_id for e in group}) > 1:
+                    by_session: Dict[str, List[OutboxEntry]] = {}
+                    for e in group:
+                        by_session.setdefault(e.session_id, []).append(e)
+                    pending += by_session.values()
+                else:
+                    pending += [[e] for e in group]
+        return stored, failed
+
+    async def _apply_completion(self, session_id: str, entries: List[OutboxEntry]) -> Optional[Dict[str, Any]]:
+        """One RPC: pending create, responses and completion together; progress is superseded."""
+        complete = [e for e in entries if e.op == "complete"][-1]
+        session_data = complete.payload.get("session")
+        if session_data is None:
+            session_data = next((e.payload for e in entries if e.op == "create"), None)
+        responses = [e.payload for e in entries if e.op == "response"]
+        self.round_trips += 1
+        self.coalesced += len(entries) - 1
+        row = await self.db.complete_interview(session_id, complete.payload["results"],
+                                               session_data=session_data, responses=responses)
+        if row:
+            self.outbox.ack(entries)
+        else:
+            self.outbox.fail(entries, "completion failed")
+        return row
+
+    async def close(self):
+        """Stop the background task and try once more to write whatever is pending."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "round_trips": self.round_trips,
+            "writes_per_round_trip": round(self.enqueued / self.round_trips, 2) if self.round_trips else 0.0,
+            "avg_flush_ms": round(self.flush_ms / self.flushes, 1) if self.flushes else 0.0,
+            "outbox": self.outbox.stats(),
+        }
+
+
+write_behind = WriteBehindQueue()
@@ -1,31 +1,41 @@
 import os
 import json
 import uuid
-import tempfile
 import asyncio
-import subprocess
 import time
-import csv
-import io
+from collections import deque
+import numpy as np
 from typing import Optional, Dict, List, Any
 from datetime import datetime, timedelta
-from collections import defaultdict
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException, Query
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse
 
 # Import all functions from existing modules
-from utils import TOPIC_OPTIONS, build_interviewer_prompt, record_with_vad
-from interview import transcript_is_valid, transcribe, interviewer_reply, INTERVIEWER_PROMPT
-from interview_with_resume import read_resume
+from utils import (TOPIC_OPTIONS, SAMPLE_RATE, AudioRingBuffer, build_interviewer_prompt, capture_with_vad,
+                   endpoint_stats, make_endpointer)
+from interview import transcript_is_valid, transcribe_pcm_async, interviewer_reply, respond, INTERVIEWER_PROMPT
+from fast_path import classify_intent, fast_path_stats
+from tts import tts_service
+from transcription import (
+    AudioDecodeError, StreamingAudioDecoder, parse_raw_pcm_type, pcm_from_raw, transcript_cache,
+    trim_silence, upload_stats, whisper_client
+)
+from stt_backends import stt_backend
+from lexicon import lexicon_for, lexicon_stats
+from uploads import MAX_AUDIO_UPLOAD_BYTES, MAX_RESUME_UPLOAD_BYTES, SpooledSink, stream_upload, upload_metrics
+from interview_with_resume import read_resume_pdf
 from groq import Groq
 
 # Import database operations
-from database import db
+from database import db, interview_filter, parse_include
+from export import interviews_export
+from snapshot import snapshot_job
+from write_behind import write_behind
 
 # Initialize FastAPI app
 app = FastAPI(title="CodeSage Backend API")
@@ -297,7 +307,8 @@ class TechnicalSession:
         self.code_submissions = []
         self.final_evaluation = None  # Store detailed LLM evaluation
         self.question_submitted = False  # Track if current question was already submitted
-        self.interview_id = None  # Will be set when creating database record
+        self.interview_id = None  # Set once the completed row is written
+        self.capture_buffer = None  # Server-mic capture buffer, allocated on first record_audio
         
         print(f"🔧 Client status: {'✅ Available' if client else '❌ Not available'}")
         
@@ -330,11 +341,11 @@ class TechnicalSession:
         
         print(f"🎯 Session initialization complete. Generated {len(self.questions)} questions")
         
-        # Initialize database record asynchronously
-        asyncio.create_task(self._initialize_database_record())
+        # Initialize database record (queued in the outbox, written behind)
+        self._initialize_database_record()
     
-    async def _initialize_database_record(self):
-        """Initialize the database record for this interview session"""
+    def _initialize_database_record(self):
+        """Queue the database record for this interview session"""
         try:
             session_data = {
                 "session_id": self.session_id,
@@ -344,27 +355,23 @@ class TechnicalSession:
                 "total_questions": len(self.questions)
             }
             
-            self.interview_id = await db.create_interview_session(session_data)
-            if self.interview_id:
-                print(f"✅ Database record created with interview_id: {self.interview_id}")
-            else:
-                print("⚠️ Failed to create database record")
+            write_behind.create_session(session_data)
         except Exception as e:
             print(f"❌ Error initializing database record: {e}")
     
-    async def update_progress_in_db(self):
-        """Update interview progress in database"""
+    def update_progress_in_db(self):
+        """Queue an interview progress update (written behind, coalesced per session)"""
         try:
             progress_data = {
                 "current_question_index": self.current_question_index,
                 "completed_questions": len([s for s in self.scores if s is not None])
             }
-            await db.update_interview_progress(self.session_id, progress_data)
+            write_behind.update_progress(self.session_id, progress_data)
         except Exception as e:
             print(f"❌ Error updating progress in database: {e}")
     
-    async def store_question_response_in_db(self, question_index: int, user_response: str, score: int, feedback: str):
-        """Store individual question response in database"""
+    def store_question_response_in_db(self, question_index: int, user_response: str, score: int, feedback: str):
+        """Queue an individual question response for the next batched insert"""
         try:
             # Convert internal 0-based question_index to 1-based for storage
             db_question_index = int(question_index) + 1
@@ -381,7 +388,7 @@ class TechnicalSession:
                     "difficulty": question.get("difficulty", "medium")
                 }
 
-                await db.store_question_response(self.session_id, db_question_index, question_data)
+                write_behind.store_question_response(self.session_id, db_question_index, question_data)
         except Exception as e:
             print(f"❌ Error storing question response in database: {e}")
     
@@ -429,29 +436,25 @@ class TechnicalSession:
             print(f"   Completed Questions: {results_data.get('completed_questions')}")
             print(f"   Average Score: {results_data.get('average_score')}")
 
-            # First ensure the session exists in the database
-            if not self.interview_id:
-                print("🔄 Session not found in database, creating it first...")
-                session_data = {
-                    "session_id": self.session_id,
-                    "interview_type": "technical",
-                    "topics": self.topics,
-                    "start_time": self.start_time,
-                    "total_questions": len(self.questions)
-                }
-                self.interview_id = await db.create_interview_session(session_data)
-                if not self.interview_id:
-                    print("❌ Failed to create session record, cannot complete interview")
-                    return False
-                print(f"✅ Session record created: {self.interview_id}")
-
-            success = await db.complete_interview(self.session_id, results_data)
+            # One round trip: creates the row if the initial insert never landed, writes any
+            # question responses still queued behind, and completes the interview atomically.
+            # The completion is in the outbox first, so a failure here is replayed later.
+            session_data = {
+                "interview_type": "technical",
+                "topics": self.topics,
+                "start_time": self.start_time,
+                "total_questions": len(self.questions)
+            }
+            row = await write_behind.complete(self.session_id, results_data, session_data=session_data)
+            success = row is not None
+            if row and not self.interview_id:
+                self.interview_id = row.get("id")
 
             if success:
                 print(f"✅ Interview completion successful in database")
                 return True
             else:
-                print(f"❌ Interview completion failed in database")
+                print(f"⚠️ Interview completion not written yet; kept in the outbox for replay")
                 return False
 
         except Exception as e:
@@ -473,7 +476,7 @@ class TechnicalSession:
         self.question_submitted = False  # Reset for new question
         
         # Update progress in database
-        asyncio.create_task(self.update_progress_in_db())
+        self.update_progress_in_db()
         
         return self.get_current_question()
     
@@ -534,29 +537,50 @@ def list_topics():
     return {"topics": TOPIC_OPTIONS}
 
 
-@app.post("/upload_resume")
-async def upload_resume(file: UploadFile = File(...)):
-    if file.content_type not in ("application/pdf", "application/octet-stream"):
-        raise HTTPException(status_code=400, detail="Only PDF resumes are supported")
+@app.on_event("shutdown")
+async def close_http_clients():
+    await stt_backend.aclose()
+    await whisper_client.aclose()
+    await write_behind.close()
+    await snapshot_job.close()
+    await db.aclose()
+
+
+@app.get("/metrics")
+def metrics():
+    """Runtime counters for caches and the audio pipeline"""
+    return {
+        "transcript_cache": transcript_cache.stats(),
+        "stt_backend": stt_backend.stats(),
+        "lexicon": lexicon_stats.stats(),
+        "fast_path": fast_path_stats.stats(),
+        "endpointing": endpoint_stats.stats(),
+        "tts": tts_service.stats(),
+        "stt_http": whisper_client.stats(),
+        "stt_upload": upload_stats.stats(),
+        "http_uploads": upload_metrics.stats(),
+        "database": db.stats(),
+        "write_behind": write_behind.stats(),
+        "snapshots": snapshot_job.stats(),
+    }
 
-    content = await file.read()
-    # Persist to a temp file and use the existing read_resume function
+
+@app.post("/upload_resume")
+async def upload_resume(request: Request):
+    """Stream a PDF resume (form field 'file') into a spooled temp file and extract its text."""
+    sink = SpooledSink()
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
-        text = read_resume(tmp_path) or ""
-        if not text:
-            raise ValueError("Empty text extracted from resume")
-        # No easy way to get page count from read_resume; return -1 to indicate unknown
-        page_count = -1
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to process uploaded PDF: {e}")
-    finally:
+        await stream_upload(request, sink, max_bytes=MAX_RESUME_UPLOAD_BYTES)
+        if sink.content_type not in ("application/pdf", "application/octet-stream"):
+            raise HTTPException(status_code=400, detail="Only PDF resumes are supported")
         try:
-            os.unlink(tmp_path)
-        except Exception:
-            pass
+            text, page_count = await asyncio.to_thread(read_resume_pdf, sink.file)
+            if not text:
+                raise ValueError("Empty text extracted from resume")
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to process uploaded PDF: {e}")
+    finally:
+        await sink.close()
 
     resume_id = str(uuid.uuid4())
     resume_store[resume_id] = text
@@ -564,101 +588,61 @@ async def upload_resume(file: UploadFile = File(...)):
 
 
 @app.post("/transcribe_audio")
-async def transcribe_audio(file: UploadFile = File(...)):
-    """Accept an uploaded audio blob (webm/wav/ogg/mp3), convert to wav if needed, and return transcript."""
+async def transcribe_audio(request: Request, sample_rate: Optional[int] = Query(None),
+                           channels: Optional[int] = Query(None), topics: Optional[str] = Query(None)):
+    """Accept an uploaded audio blob (webm/wav/ogg/mp3), decode it while it streams in, and return transcript.
+
+    Clients that capture raw 16-bit PCM can upload it as audio/pcm (optionally
+    ';rate=...;channels=...' or the sample_rate/channels query params) to skip ffmpeg.
+    Optional comma-separated ``topics`` narrow the technical vocabulary used for correction.
+    """
+    decoder = StreamingAudioDecoder(declared_rate=sample_rate, declared_channels=channels)
     try:
         # Check if client is available
-        if not client:
+        if stt_backend.name == "groq" and not client:
             print("[TRANSCRIBE] ❌ Groq client not initialized")
             raise HTTPException(
                 status_code=500, 
                 detail="Groq API client not initialized - check GROQ_API_KEY environment variable"
             )
         
-        # Persist upload to a temp file
-        suffix = ".wav"
-        ct = (file.content_type or "").lower()
-        print(f"[TRANSCRIBE] Content-Type: {ct}")
-        print(f"[TRANSCRIBE] Filename: {file.filename}")
-        
-        if "webm" in ct:
-            suffix = ".webm"
-        elif "ogg" in ct:
-            suffix = ".ogg"
-        elif "mp3" in ct:
-            suffix = ".mp3"
-        elif "m4a" in ct or "mp4" in ct:
-            suffix = ".m4a"
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            content = await file.read()
-            print(f"[TRANSCRIBE] Uploaded bytes: {len(content)}")
-            if not content or len(content) < 100:
+        # Decode to 16 kHz mono PCM as the body arrives (ffmpeg over pipes for compressed formats)
+        try:
+            received = await stream_upload(request, decoder, max_bytes=MAX_AUDIO_UPLOAD_BYTES)
+            print(f"[TRANSCRIBE] Content-Type: {decoder.content_type}, uploaded bytes: {received}")
+            if received < 100 or decoder.pcm is None:
                 raise HTTPException(status_code=400, detail="Audio file too small or empty")
-            tmp.write(content)
-            src_path = tmp.name
-        
-        print(f"[TRANSCRIBE] Saved to temp file: {src_path}")
-        
-        # If not wav, convert to wav via ffmpeg
-        ext = os.path.splitext(src_path)[1].lower()
-        wav_path = src_path
-        if ext != ".wav":
-            wav_path = src_path.replace(ext, ".wav")
-            print(f"[TRANSCRIBE] Converting {ext} to WAV...")
-            try:
-                proc = subprocess.run([
-                    "ffmpeg", "-y", "-i", src_path,
-                    "-ac", "1", "-ar", "16000", "-acodec", "pcm_s16le",
-                    wav_path
-                ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30)
-                print(f"[TRANSCRIBE] ✅ ffmpeg conversion OK -> {wav_path}")
-                print(f"[TRANSCRIBE] WAV file size: {os.path.getsize(wav_path)} bytes")
-            except subprocess.TimeoutExpired:
-                print(f"[TRANSCRIBE] ❌ ffmpeg timeout")
-                try:
-                    os.unlink(src_path)
-                except Exception:
-                    pass
-                raise HTTPException(status_code=400, detail="Audio conversion timeout")
-            except subprocess.CalledProcessError as e:
-                err = e.stderr.decode("utf-8", errors="ignore") if e.stderr else str(e)
-                print(f"[TRANSCRIBE] ❌ ffmpeg error: {err[:500]}")
-                try:
-                    os.unlink(src_path)
-                except Exception:
-                    pass
-                raise HTTPException(status_code=400, detail=f"Audio conversion failed - invalid format")
-            except Exception as e:
-                print(f"[TRANSCRIBE] ❌ ffmpeg unexpected error: {e}")
-                try:
-                    os.unlink(src_path)
-                except Exception:
-                    pass
-                raise HTTPException(status_code=500, detail=f"Audio conversion error: {str(e)[:100]}")
+            pcm, sample_rate = decoder.pcm, decoder.pcm_rate
+            print(f"[TRANSCRIBE] ✅ Decoded {len(pcm) / sample_rate:.1f}s of audio at {sample_rate} Hz")
+        except HTTPException:
+            raise
+        except asyncio.TimeoutError:
+            print(f"[TRANSCRIBE] ❌ ffmpeg timeout")
+            raise HTTPException(status_code=400, detail="Audio conversion timeout")
+        except AudioDecodeError as e:
+            print(f"[TRANSCRIBE] ❌ ffmpeg error: {e}")
+            raise HTTPException(status_code=400, detail=f"Audio conversion failed - invalid format")
+        except Exception as e:
+            print(f"[TRANSCRIBE] ❌ ffmpeg unexpected error: {e}")
+            raise HTTPException(status_code=500, detail=f"Audio conversion error: {str(e)[:100]}")
+        
+        # Transcribe (identical audio re-uploaded by retries is served from cache)
+        lexicon = lexicon_for(t.strip() for t in topics.split(",")) if topics else lexicon_for()
+        cache_key = decoder.cache_key(stt_backend.cache_id, lexicon.whisper_prompt)
+        speech = trim_silence(pcm, sample_rate)
+        print(f"[TRANSCRIBE] Starting transcription with {stt_backend.cache_id}...")
+        transcript = await transcript_cache.get_or_compute(
+            cache_key, lambda: transcribe_pcm_async(speech, sample_rate, "upload", prompt=lexicon.whisper_prompt)
+        )
+        print(f"[TRANSCRIBE] Raw transcript: {transcript}")
+        print(f"[TRANSCRIBE] Transcript length: {len(transcript) if transcript else 0}")
         
-        # Transcribe
-        try:
-            print(f"[TRANSCRIBE] Starting Groq Whisper transcription...")
-            transcript = transcribe(wav_path)
-            print(f"[TRANSCRIBE] Raw transcript: {transcript}")
-            print(f"[TRANSCRIBE] Transcript length: {len(transcript) if transcript else 0}")
-            
-            # Check if transcript is an error message
-            if transcript.startswith("[Transcription"):
-                print(f"[TRANSCRIBE] ⚠️ Transcription returned error: {transcript}")
-                raise HTTPException(status_code=500, detail=transcript)
-                
-        finally:
-            # Cleanup temp files
-            for p in [src_path, wav_path]:
-                try:
-                    if os.path.exists(p):
-                        os.unlink(p)
-                        print(f"[TRANSCRIBE] Cleaned up: {p}")
-                except Exception as cleanup_err:
-                    print(f"[TRANSCRIBE] Cleanup warning: {cleanup_err}")
+        # Check if transcript is an error message
+        if transcript.startswith("[Transcription"):
+            print(f"[TRANSCRIBE] ⚠️ Transcription returned error: {transcript}")
+            raise HTTPException(status_code=500, detail=transcript)
         
+        transcript = lexicon.correct(transcript)
         print(f"[TRANSCRIBE] ✅ Success - returning transcript")
         return {"transcript": transcript}
         
@@ -669,6 +653,8 @@ async def transcribe_audio(file: UploadFile = File(...)):
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)[:200]}")
+    finally:
+        await decoder.close()
 
 
 @app.post("/save_interview_results")
@@ -717,11 +703,15 @@ async def download_results(interview_id: str):
 
 
 @app.get("/api/interview-results/{session_id}")
-async def get_interview_results(session_id: str):
-    """Get interview results data for a session from database"""
+async def get_interview_results(session_id: str, include: Optional[str] = None):
+    """Get interview results data for a session from database (final_results with include=final_results)"""
+    try:
+        include_final_results = "final_results" in parse_include(include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
         # First try to get from database
-        results = await db.get_interview_results(session_id)
+        results = await db.get_interview_results(session_id, include_final_results=include_final_results)
         if results:
             return results
         
@@ -743,22 +733,45 @@ async def get_interview_results(session_id: str):
 
 
 @app.get("/api/interviews")
-async def get_all_interviews(limit: int = 50):
-    """Get all interview records from database, formatted for frontend"""
+async def get_all_interviews(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    status_filter: Optional[str] = None,
+    interview_type: Optional[str] = None,
+    min_score: Optional[int] = Query(None, ge=0, le=100),
+    max_score: Optional[int] = Query(None, ge=0, le=100),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    include: Optional[str] = None,
+):
+    """Get interview records from database, formatted for frontend (filtered and paginated in the DB)"""
     try:
-        interviews = await db.get_all_interviews(limit)
-        formatted = [format_interview_data(i) for i in interviews]
-        return {"interviews": formatted, "total": len(formatted)}
+        result = await db.list_interviews(
+            limit=limit, cursor=cursor, offset=0 if cursor else (page - 1) * limit,
+            include_final_results="final_results" in parse_include(include),
+            status=status_filter, interview_type=interview_type, min_score=min_score, max_score=max_score,
+            start_date=start_date, end_date=end_date,
+        )
+        formatted = [format_interview_data(i) for i in result["interviews"]]
+        return {"interviews": formatted, "total": len(formatted), "next_cursor": result["next_cursor"],
+                "has_more": result["next_cursor"] is not None}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get interviews: {str(e)}")
 
 
 @app.get("/api/interview-details/{session_id}")
-async def get_interview_details(session_id: str):
-    """Get detailed interview data including question responses"""
+async def get_interview_details(session_id: str, include: Optional[str] = None):
+    """Get detailed interview data including question responses (final_results with include=final_results)"""
+    try:
+        include_final_results = "final_results" in parse_include(include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
         # Get main interview data
-        interview_data = await db.get_interview_results(session_id)
+        interview_data = await db.get_interview_results(session_id, include_final_results=include_final_results)
         if not interview_data:
             raise HTTPException(status_code=404, detail="Interview not found")
         
@@ -798,21 +811,21 @@ def format_interview_data(interview: Dict[str, Any]) -> Dict[str, Any]:
     average_score = interview.get("average_score")
     status = calculate_status(completion_method, average_score)
     
-    final_results = interview.get("final_results", {})
+    final_results = interview.get("final_results") or {}
     if isinstance(final_results, str):
         try:
             final_results = json.loads(final_results)
         except:
             final_results = {}
     
-    interviewer = final_results.get("interviewer", "AI Interviewer")
+    interviewer = interview.get("interviewer") or final_results.get("interviewer", "AI Interviewer")
     topics = interview.get("topics", [])
     if not topics:
         topics = final_results.get("topics", [])
     
-    feedback = final_results.get("overall_feedback", "No feedback available")
+    feedback = interview.get("overall_feedback") or final_results.get("overall_feedback", "No feedback available")
     
-    return {
+    formatted = {
         "id": interview.get("session_id"),
         "type": interview.get("interview_type", "technical"),
         "date": interview.get("created_at"),
@@ -828,22 +841,41 @@ def format_interview_data(interview: Dict[str, Any]) -> Dict[str, Any]:
         "completion_method": completion_method,
         "individual_scores": interview.get("individual_scores", []),
         "start_time": interview.get("start_time"),
-        "end_time": interview.get("end_time"),
-        "final_results": final_results
+        "end_time": interview.get("end_time")
     }
+    if "final_results" in interview:
+        formatted["final_results"] = final_results
+    return formatted
+
+
+def consistency_score(stats: Dict[str, Any]) -> int:
+    """100 minus the standard deviation of scores (> 0), from the rollup sums"""
+    n = stats["scored"]
+    if n <= 1:
+        return 100
+    # Integer sums keep the numerator exact
+    variance = (n * stats["score_sum_sq"] - stats["score_sum"] ** 2) / (n * n)
+    return max(0, round(100 - variance ** 0.5))
+
+
+async def recent_interviews(count: int) -> List[Dict[str, Any]]:
+    """The ``count`` most recent interviews, formatted, oldest first"""
+    result = await db.list_interviews(limit=count)
+    return [format_interview_data(i) for i in reversed(result["interviews"])]
 
 
 # -----------------------------
 # Analytics & Stats Endpoints
 # -----------------------------
+# Served from the analytics rollups (interview_stats / interview_topic_stats), which the
+# database keeps current on every interview write, so they cost the same at any history size.
 @app.get("/api/interviews/stats/overview")
 async def get_stats_overview():
     """Get overall statistics and metrics"""
     try:
-        all_interviews = await db.get_all_interviews(limit=1000)
-        formatted = [format_interview_data(i) for i in all_interviews]
+        stats = await db.get_interview_stats()
         
-        total = len(formatted)
+        total = stats["total"] if stats else 0
         if total == 0:
             return {
                 "total": 0, "approved": 0, "rejected": 0,
@@ -852,24 +884,16 @@ async def get_stats_overview():
                 "completion_rate": 0
             }
         
-        approved = len([i for i in formatted if i["status"] == "approved"])
-        rejected = len([i for i in formatted if i["status"] == "rejected"])
-        manually_ended = len([i for i in formatted if i["status"] == "manually_ended"])
-        timeout = len([i for i in formatted if i["status"] == "timeout"])
+        average_score = round(stats["score_sum"] / stats["scored"]) if stats["scored"] else 0
+        average_duration = round(stats["duration_minutes_sum"] / stats["timed"]) if stats["timed"] else 0
         
-        scores = [i["score"] for i in formatted if i["score"] > 0]
-        average_score = round(sum(scores) / len(scores)) if scores else 0
-        
-        durations = [i["duration"] for i in formatted if i["duration"] > 0]
-        average_duration = round(sum(durations) / len(durations)) if durations else 0
-        
-        total_questions = sum(i["questions_completed"] for i in formatted)
-        expected_questions = sum(i["total_questions"] for i in formatted)
+        total_questions = stats["questions_completed"]
+        expected_questions = stats["questions_expected"]
         completion_rate = round((total_questions / expected_questions * 100)) if expected_questions > 0 else 0
         
         return {
-            "total": total, "approved": approved, "rejected": rejected,
-            "manually_ended": manually_ended, "timeout": timeout,
+            "total": total, "approved": stats["approved"], "rejected": stats["rejected"],
+            "manually_ended": stats["manually_ended"], "timeout": stats["timeout"],
             "average_score": average_score, "average_duration": average_duration,
             "total_questions_answered": total_questions,
             "completion_rate": completion_rate
@@ -889,70 +913,45 @@ async def get_stats_alias():
 async def get_performance_analytics():
     """Get detailed performance analytics including topic breakdown and trends"""
     try:
-        all_interviews = await db.get_all_interviews(limit=1000)
-        formatted = [format_interview_data(i) for i in all_interviews]
+        stats = await db.get_interview_stats()
         
-        if not formatted:
+        if not stats or stats["total"] == 0:
             return {
                 "topic_performance": [], "score_distribution": {},
                 "time_efficiency": {}, "improvement_trend": [],
                 "consistency_score": 0
             }
         
-        topic_scores = defaultdict(list)
-        for interview in formatted:
-            for topic in interview.get("topics", []):
-                if interview["score"] > 0:
-                    topic_scores[topic].append(interview["score"])
-        
         topic_performance = [
             {
-                "topic": topic,
-                "average_score": round(sum(scores) / len(scores)),
-                "attempts": len(scores),
-                "max_score": max(scores),
-                "min_score": min(scores)
+                "topic": t["topic"],
+                "average_score": round(t["score_sum"] / t["attempts"]),
+                "attempts": t["attempts"],
+                "max_score": t["max_score"],
+                "min_score": t["min_score"]
             }
-            for topic, scores in topic_scores.items()
+            for t in stats["topics"]
         ]
         topic_performance.sort(key=lambda x: x["average_score"], reverse=True)
         
-        score_ranges = {"0-20": 0, "21-40": 0, "41-60": 0, "61-80": 0, "81-100": 0}
-        for interview in formatted:
-            score = interview["score"]
-            if score <= 20:
-                score_ranges["0-20"] += 1
-            elif score <= 40:
-                score_ranges["21-40"] += 1
-            elif score <= 60:
-                score_ranges["41-60"] += 1
-            elif score <= 80:
-                score_ranges["61-80"] += 1
-            else:
-                score_ranges["81-100"] += 1
+        score_ranges = {
+            "0-20": stats["score_0_20"], "21-40": stats["score_21_40"], "41-60": stats["score_41_60"],
+            "61-80": stats["score_61_80"], "81-100": stats["score_81_100"]
+        }
         
-        sorted_interviews = sorted(formatted, key=lambda x: x["date"])
-        recent_interviews = sorted_interviews[-10:]
         improvement_trend = [
             {"date": i["date"], "score": i["score"], "interview_number": idx + 1}
-            for idx, i in enumerate(recent_interviews)
+            for idx, i in enumerate(await recent_interviews(10))
         ]
         
-        scores = [i["score"] for i in formatted if i["score"] > 0]
-        if len(scores) > 1:
-            mean_score = sum(scores) / len(scores)
-            variance = sum((s - mean_score) ** 2 for s in scores) / len(scores)
-            std_dev = variance ** 0.5
-            consistency_score = max(0, round(100 - std_dev))
-        else:
-            consistency_score = 100
+        avg_efficiency = round(stats["efficiency_sum"] / stats["timed"], 2) if stats["timed"] else 0
         
         return {
             "topic_performance": topic_performance,
             "score_distribution": score_ranges,
-            "time_efficiency": {"average": 0},
+            "time_efficiency": {"average": avg_efficiency},
             "improvement_trend": improvement_trend,
-            "consistency_score": consistency_score
+            "consistency_score": consistency_score(stats)
         }
     except Exception as e:
         print(f"❌ Error in get_performance_analytics: {e}")
@@ -963,23 +962,17 @@ async def get_performance_analytics():
 async def get_performance_insights():
     """Get AI-generated performance insights and recommendations"""
     try:
-        all_interviews = await db.get_all_interviews(limit=1000)
-        formatted = [format_interview_data(i) for i in all_interviews]
+        stats = await db.get_interview_stats()
         
-        if not formatted:
+        if not stats or stats["total"] == 0:
             return {"strengths": [], "areas_for_improvement": [], "recommendations": []}
         
-        topic_scores = defaultdict(list)
-        for interview in formatted:
-            for topic in interview.get("topics", []):
-                if interview["score"] > 0:
-                    topic_scores[topic].append(interview["score"])
-        
         strengths = []
         weaknesses = []
         
-        for topic, scores in topic_scores.items():
-            avg = sum(scores) / len(scores)
+        for t in stats["topics"]:
+            topic = t["topic"]
+            avg = t["score_sum"] / t["attempts"]
             if avg >= 80:
                 strengths.append({
                     "topic": topic,
@@ -994,8 +987,8 @@ async def get_performance_insights():
                 })
         
         recommendations = []
-        total_expected = sum(i["total_questions"] for i in formatted)
-        total_completed = sum(i["questions_completed"] for i in formatted)
+        total_expected = stats["questions_expected"]
+        total_completed = stats["questions_completed"]
         if total_expected > 0:
             completion_rate = (total_completed / total_expected) * 100
             if completion_rate < 80:
@@ -1017,58 +1010,131 @@ async def get_performance_insights():
 
 @app.get("/api/interviews/export")
 async def export_interviews(
-    format: str = Query("csv", regex="^(csv|json)$"),
-    status_filter: Optional[str] = Query(None)
+    format: str = Query("csv", regex="^(csv|json|ndjson|parquet|arrow)$"),
+    compression: Optional[str] = Query(None, regex="^gzip$"),
+    status_filter: Optional[str] = Query(None),
+    interview_type: Optional[str] = Query(None),
+    min_score: Optional[int] = Query(None, ge=0, le=100),
+    max_score: Optional[int] = Query(None, ge=0, le=100),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    include: Optional[str] = Query(None)
 ):
-    """Export interview data in CSV or JSON format"""
+    """Export interview data as CSV, JSON, NDJSON, Parquet or Arrow, streamed page by page (compression=gzip to gzip it)"""
+    filters = {
+        "status": status_filter,
+        "interview_type": interview_type,
+        "min_score": min_score,
+        "max_score": max_score,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
     try:
-        all_interviews = await db.get_all_interviews(limit=1000)
-        formatted = [format_interview_data(i) for i in all_interviews]
-        
-        if status_filter:
-            formatted = [i for i in formatted if i["status"] == status_filter]
-        
-        if format == "csv":
-            output = io.StringIO()
-            if formatted:
-                fieldnames = ["id", "type", "date", "duration", "score", "status",
-                             "questions_completed", "total_questions", "interviewer", "completion_method"]
-                writer = csv.DictWriter(output, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for interview in formatted:
-                    writer.writerow({
-                        "id": interview["id"],
-                        "type": interview["type"],
-                        "date": interview["date"],
-                        "duration": interview["duration"],
-                        "score": interview["score"],
-                        "status": interview["status"],
-                        "questions_completed": interview["questions_completed"],
-                        "total_questions": interview["total_questions"],
-                        "interviewer": interview["interviewer"],
-                        "completion_method": interview["completion_method"]
-                    })
-            
-            output.seek(0)
-            return StreamingResponse(
-                iter([output.getvalue()]),
-                media_type="text/csv",
-                headers={"Content-Disposition": f"attachment; filename=interviews_{datetime.now().strftime('%Y%m%d')}.csv"}
-            )
-        else:
-            return JSONResponse(
-                content={"interviews": formatted, "exported_at": datetime.now().isoformat()},
-                headers={"Content-Disposition": f"attachment; filename=interviews_{datetime.now().strftime('%Y%m%d')}.json"}
-            )
-    except Exception as e:
-        print(f"❌ Error in export_interviews: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        # Reject bad filters now; once streaming starts the status code is already sent
+        interview_filter(**filters)
+        include_final_results = "final_results" in parse_include(include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        return interviews_export(db, format_interview_data, format, compression,
+                                 include_final_results=include_final_results, **filters)
+    except RuntimeError as e:
+        # Parquet/Arrow need the optional pyarrow package
+        raise HTTPException(status_code=501, detail=str(e))
 
 
 # -----------------------------
 # WebSocket endpoint
 # -----------------------------
+TOPICS_GREETING = "Let's begin. Can you introduce yourself?"
+RESUME_GREETING = "Thanks for sharing your resume. Could you give a brief overview of your background?"
+# Interviewer lines per session that a client may ask to hear again with "speak"
+SPEAKABLE_LINES = 20
+
+
+@app.on_event("startup")
+async def replay_outbox():
+    # Writes left over from a previous run (or a DB outage) are replayed in the background
+    write_behind.start()
+
+
+@app.on_event("startup")
+async def schedule_snapshots():
+    # Parquet snapshots for offline analytics, every SNAPSHOT_INTERVAL_HOURS (off by default)
+    snapshot_job.start()
+
+
+@app.on_event("startup")
+async def warm_tts_cache():
+    # Greetings are spoken in every session; synthesize them once up front
+    tts_service.warm([TOPICS_GREETING, RESUME_GREETING])
+
+
+def prefetch_speech(session: dict, reply: dict):
+    """Start synthesizing the next question as soon as the LLM has produced it"""
+    if session.get("server_tts") and reply.get("next_question"):
+        tts_service.prefetch(reply["next_question"])
+
+
+async def speak_to_client(ws: WebSocket, session: dict, text: str):
+    """Stream server-side TTS audio for ``text`` to clients that sent init with "server_tts": true"""
+    if not text:
+        return
+    session.setdefault("interviewer_lines", deque(maxlen=SPEAKABLE_LINES)).append(text)
+    if not session.get("server_tts"):
+        return
+    try:
+        await tts_service.stream_to_websocket(ws, text)
+    except Exception as e:
+        print(f"⚠️ TTS streaming failed: {e}")
+
+
+async def answer_turn(ws: WebSocket, session: dict, candidate: str):
+    """Reply to one candidate turn, record it and speak the next question"""
+    reply = respond(candidate, session["conversation"])
+    prefetch_speech(session, reply)
+    # Fast-path filler turns ("can you repeat that?") are not scored
+    if not reply.get("fast_path"):
+        session["conversation"].append({
+            "candidate": candidate,
+            **reply
+        })
+    await ws.send_text(json.dumps({"type": "assessment", **reply}))
+    await speak_to_client(ws, session, reply.get("next_question"))
+
+
+async def handle_utterance(ws: WebSocket, session: dict, pcm: np.ndarray, sample_rate: int,
+                           endpointing: Optional[dict] = None):
+    """One spoken answer, however it was captured: trim, transcribe, correct jargon, reply"""
+    lexicon = session.get("lexicon") or lexicon_for()
+    candidate = await transcribe_pcm_async(
+        trim_silence(pcm, sample_rate), sample_rate, prompt=lexicon.whisper_prompt
+    )
+    print(f"📝 Transcription result: '{candidate}'")
+
+    # Short fillers like "okay" are handled by the fast path
+    if not transcript_is_valid(candidate) and classify_intent(candidate) is None:
+        await ws.send_text(json.dumps({
+            "type": "invalid_transcript",
+            "message": "Could not understand. Please repeat more clearly.",
+            "transcript": candidate
+        }))
+        return
+
+    candidate = lexicon.correct(candidate)
+    # Send transcript immediately to show in chat
+    transcribed = {"type": "transcribed", "transcript": candidate}
+    if endpointing is not None:
+        transcribed["endpointing"] = endpointing
+    await ws.send_text(json.dumps(transcribed))
+    if not session.get("prompt"):
+        return
+
+    await ws.send_text(json.dumps({"type": "ai_thinking", "message": "AI is processing..."}))
+    await answer_turn(ws, session, candidate)
+
+
 @app.websocket("/ws")
 async def ws_endpoint(ws: WebSocket):
     await ws.accept()
@@ -1084,7 +1150,28 @@ async def ws_endpoint(ws: WebSocket):
 
     try:
         while True:
-            data = await ws.receive_text()
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is not None:
+                # Binary frames carry raw PCM between audio_start and audio_end
+                if session.get("pcm_dropped"):
+                    # Over the limit: already reported once, ignore the rest of this utterance
+                    continue
+                if session.get("pcm_upload") is None:
+                    await ws.send_text(json.dumps({
+                        "type": "error", "error": "Send 'audio_start' before binary audio"
+                    }))
+                    continue
+                session["pcm_upload"] += message["bytes"]
+                if len(session["pcm_upload"]) > MAX_AUDIO_UPLOAD_BYTES:
+                    session["pcm_upload"] = None
+                    session["pcm_dropped"] = True
+                    await ws.send_text(json.dumps({
+                        "type": "error", "error": "Audio exceeds upload limit"
+                    }))
+                continue
+            data = message.get("text") or ""
             try:
                 msg = json.loads(data)
             except Exception:
@@ -1117,6 +1204,8 @@ async def ws_endpoint(ws: WebSocket):
 
             if mtype == "init":
                 mode = msg.get("mode")  # "topics" | "resume"
+                # Opt in to spoken questions streamed as MP3 (tts_start / binary / tts_end)
+                session["server_tts"] = bool(msg.get("server_tts"))
                 if mode == "topics":
                     topics = msg.get("topics") or []
                     if not isinstance(topics, list) or not topics:
@@ -1129,20 +1218,17 @@ async def ws_endpoint(ws: WebSocket):
                     session["topics"] = topics
                     # Build and set prompt via existing module
                     prompt = build_interviewer_prompt(topics)
-                    # Append jargon correction instruction as in interview.py
-                    prompt += (
-                        "\nIf the candidate uses a technical term or jargon that is misspelled or not recognized "
-                        "(for example, 'kosarachi' instead of 'kosaraju'), try to infer the intended word and "
-                        "suggest the closest possible correct term in your feedback."
-                    )
+                    # Mis-heard jargon is corrected locally rather than by the LLM
+                    session["lexicon"] = lexicon_for(topics)
                     import interview
                     interview.INTERVIEWER_PROMPT = prompt
                     session["prompt"] = prompt
                     await ws.send_text(json.dumps({
                         "type": "ready",
                         "message": "Topic-based interview initialized",
-                        "next_question": "Let's begin. Can you introduce yourself?"
+                        "next_question": TOPICS_GREETING
                     }))
+                    await speak_to_client(ws, session, TOPICS_GREETING)
                 elif mode == "resume":
                     resume_id = msg.get("resume_id")
                     if not resume_id or resume_id not in resume_store:
@@ -1167,11 +1253,11 @@ async def ws_endpoint(ws: WebSocket):
                         "start_time": start_time,
                         "total_questions": 0  # Will be determined dynamically
                     }
-                    interview_id = await db.create_interview_session(session_data)
-                    session["interview_id"] = interview_id
-                    print(f"✅ Resume interview session created: {session_id} (DB ID: {interview_id})")
+                    write_behind.create_session(session_data)
+                    print(f"✅ Resume interview session created: {session_id}")
                     
                     resume_text = resume_store[resume_id]
+                    session["lexicon"] = lexicon_for()
                     # Resume-based prompt. Avoid f-string so JSON braces remain literal.
                     prompt = """
 You are **CodeSage**, an AI technical interviewer.
@@ -1206,10 +1292,7 @@ You are conducting a live mock job interview with the candidate, using their res
     - Suggest improvements or ask for more details if needed.
     - If candidate requests a hint, give only a small clue.
 
-3. Jargon or Misspelling:
-    - If the candidate uses a technical term or jargon that is misspelled or not recognized (e.g., "kosarachi" instead of "kosaraju"), try to infer the intended word and suggest the closest possible correct term in your feedback.
-
-4. Final feedback (at end of interview):
+3. Final feedback (at end of interview):
     - Summarize overall performance:
       1. Strengths demonstrated
       2. Areas for improvement
@@ -1233,8 +1316,9 @@ Resume:
                     await ws.send_text(json.dumps({
                         "type": "ready",
                         "message": "Resume-based interview initialized",
-                        "next_question": "Thanks for sharing your resume. Could you give a brief overview of your background?"
+                        "next_question": RESUME_GREETING
                     }))
+                    await speak_to_client(ws, session, RESUME_GREETING)
                 else:
                     await ws.send_text(json.dumps({
                         "type": "error", "error": "Unknown mode. Use 'topics' or 'resume'"
@@ -1253,19 +1337,14 @@ Resume:
                     }))
                     continue
 
-                # Validate transcript
-                if not transcript_is_valid(candidate):
+                # Validate transcript (short fillers like "okay" are handled by the fast path)
+                if not transcript_is_valid(candidate) and classify_intent(candidate) is None:
                     await ws.send_text(json.dumps({
                         "type": "error", "error": "Invalid transcript. Please speak more clearly."
                     }))
                     continue
 
-                reply = interviewer_reply(candidate, session["conversation"])
-                session["conversation"].append({
-                    "candidate": candidate,
-                    **reply
-                })
-                await ws.send_text(json.dumps({"type": "assessment", **reply}))
+                await answer_turn(ws, session, candidate)
 
             elif mtype == "code_submission":
                 if not session.get("prompt"):
@@ -1283,11 +1362,13 @@ Resume:
                 # Process code submission like a regular answer
                 candidate_message = f"[Code Submission]\n{code}"
                 reply = interviewer_reply(candidate_message, session["conversation"])
+                prefetch_speech(session, reply)
                 session["conversation"].append({
                     "candidate": candidate_message,
                     **reply
                 })
                 await ws.send_text(json.dumps({"type": "assessment", **reply}))
+                await speak_to_client(ws, session, reply.get("next_question"))
 
             elif mtype == "record_audio":
                 # Check if interview has ended
@@ -1297,9 +1378,14 @@ Resume:
                     
                 await ws.send_text(json.dumps({"type": "listening", "message": "Listening for speech..."}))
                 try:
-                    filename = f"ws_ans_{len(session['conversation'])}.wav"
-                    print(f"🎙️  Starting audio recording for {filename}...")
-                    recorded_file, heard_speech = record_with_vad(filename)
+                    print(f"🎙️  Starting audio recording for answer {len(session['conversation'])}...")
+                    endpointer = make_endpointer()
+                    # Reused across answers; the returned audio is a view into it
+                    if session.get("capture_buffer") is None:
+                        session["capture_buffer"] = AudioRingBuffer()
+                    audio, heard_speech = await asyncio.to_thread(
+                        capture_with_vad, buffer=session["capture_buffer"], endpointer=endpointer
+                    )
                     
                     if not heard_speech:
                         print("❌ No speech detected in recording")
@@ -1309,47 +1395,8 @@ Resume:
                         }))
                         continue
                     
-                    print(f"🎤 Audio recorded successfully, transcribing {recorded_file}...")
-                    candidate = transcribe(recorded_file)
-                    print(f"📝 Transcription result: '{candidate}'")
-                    
-                    try:
-                        os.remove(recorded_file)
-                    except Exception:
-                        pass
-                    
-                    if not transcript_is_valid(candidate):
-                        print(f"⚠️  Invalid transcript detected: '{candidate}'")
-                        await ws.send_text(json.dumps({
-                            "type": "invalid_transcript",
-                            "message": "Could not understand. Please repeat more clearly.",
-                            "transcript": candidate
-                        }))
-                        continue
-                    
-                    print(f"✅ Valid transcript, sending to frontend: '{candidate[:100]}...'")
-                    
-                    # Send transcript immediately to show in chat
-                    await ws.send_text(json.dumps({
-                        "type": "transcribed",
-                        "transcript": candidate
-                    }))
-                    
-                    # Send AI processing indicator immediately
-                    await ws.send_text(json.dumps({
-                        "type": "ai_thinking",
-                        "message": "AI is processing..."
-                    }))
-                    
-                    print("🤖 Getting AI response...")
-                    reply = interviewer_reply(candidate, session["conversation"])
-                    session["conversation"].append({
-                        "candidate": candidate,
-                        **reply
-                    })
-                    
-                    print(f"📤 Sending assessment to frontend")
-                    await ws.send_text(json.dumps({"type": "assessment", **reply}))
+                    print(f"🎤 Audio recorded successfully, transcribing {len(audio) / SAMPLE_RATE:.1f}s...")
+                    await handle_utterance(ws, session, audio, SAMPLE_RATE, endpointing=endpointer.report())
                     
                 except Exception as e:
                     print(f"❌ Error in record_audio handler: {e}")
@@ -1360,6 +1407,55 @@ Resume:
                         "error": f"Recording failed: {str(e)}"
                     }))
 
+            elif mtype == "audio_start":
+                # Client-side capture: raw int16 PCM follows as binary frames
+                try:
+                    session["pcm_format"] = parse_raw_pcm_type(
+                        msg.get("content_type") or "audio/pcm", msg.get("sample_rate"), msg.get("channels")
+                    )
+                except AudioDecodeError as e:
+                    await ws.send_text(json.dumps({"type": "error", "error": str(e)}))
+                    continue
+                session["pcm_upload"] = bytearray()
+                session.pop("pcm_dropped", None)
+                await ws.send_text(json.dumps({"type": "listening", "message": "Receiving audio..."}))
+
+            elif mtype == "audio_end":
+                raw = session.pop("pcm_upload", None)
+                pcm_format = session.pop("pcm_format", None)
+                if session.pop("pcm_dropped", False):
+                    # The over-limit error was already sent
+                    continue
+                if raw is None or pcm_format is None:
+                    await ws.send_text(json.dumps({
+                        "type": "error", "error": "No audio stream in progress"
+                    }))
+                    continue
+                try:
+                    audio = pcm_from_raw(raw, *pcm_format, sample_rate=SAMPLE_RATE)
+                    print(f"🎤 Received {len(audio) / SAMPLE_RATE:.1f}s of client PCM, transcribing...")
+                    await handle_utterance(ws, session, audio, SAMPLE_RATE)
+                except Exception as e:
+                    print(f"❌ Error in audio_end handler: {e}")
+                    await ws.send_text(json.dumps({
+                        "type": "error",
+                        "error": f"Transcription failed: {str(e)}"
+                    }))
+
+            elif mtype == "speak":
+                # Client asks to hear an interviewer line again. Only text this session's interviewer
+                # produced is synthesized, so clients can't fill the TTS disk cache with their own
+                text = (msg.get("text") or "").strip()
+                if not text:
+                    await ws.send_text(json.dumps({"type": "error", "error": "Empty text"}))
+                    continue
+                if text not in session.get("interviewer_lines", ()):
+                    await ws.send_text(json.dumps({
+                        "type": "error", "error": "Only the interviewer's own lines can be spoken"
+                    }))
+                    continue
+                await speak_to_client(ws, {"server_tts": True}, text)
+
             elif mtype == "end":
                 # Set flag to stop any ongoing recording
                 session["ended"] = True
@@ -1382,7 +1478,7 @@ Resume:
                         }
                         
                         # Save to database if session was tracked
-                        if session.get("session_id") and session.get("interview_id"):
+                        if session.get("session_id"):
                             print(f"📊 Saving {session.get('mode', 'unknown')} interview to database...")
                             
                             # Calculate duration
@@ -1400,14 +1496,9 @@ Resume:
                                 "completion_method": "manual"
                             }
                             
-                            db_success = await db.complete_interview(session["session_id"], results_data)
+                            db_success = await write_behind.complete(session["session_id"], results_data)
                             if db_success:
                                 print(f"✅ Resume interview saved to database: {session['session_id']}")
-                                # Invalidate cache so Past Interviews shows updated data immediately
-                                from database import _interviews_cache
-                                _interviews_cache["data"] = None
-                                _interviews_cache["timestamp"] = 0
-                                print("🔄 Cache invalidated - Past Interviews will show fresh data")
                             else:
                                 print(f"❌ Failed to save resume interview to database")
                         
@@ -1445,7 +1536,7 @@ Resume:
 
     except WebSocketDisconnect:
         # Save session on disconnect if it exists
-        if session.get("session_id") and session.get("interview_id"):
+        if session.get("session_id"):
             try:
                 print(f"📊 WebSocket disconnected, saving {session.get('mode', 'unknown')} interview...")
                 end_time = time.time()
@@ -1466,7 +1557,7 @@ Resume:
                     "completion_method": "disconnected"
                 }
                 
-                await db.complete_interview(session["session_id"], results_data)
+                await write_behind.complete(session["session_id"], results_data)
                 print(f"✅ Interview saved on disconnect: {session['session_id']}")
             except Exception as e:
                 print(f"❌ Error saving interview on disconnect: {e}")
@@ -1568,7 +1659,7 @@ async def technical_ws_endpoint(ws: WebSocket):
                     feedback_msg += f"\n{session.final_evaluation.get('feedback', '')}"
                 
                 # Store question response in database
-                await session.store_question_response_in_db(
+                session.store_question_response_in_db(
                     session.current_question_index, 
                     msg.get("code", ""), 
                     score, 
@@ -1636,9 +1727,6 @@ async def technical_ws_endpoint(ws: WebSocket):
                     if next_question_data:
                         print(f"Sending next question: {next_question_data.get('question', 'Unknown')[:50]}...")
                         
-                        # Update database progress
-                        await session.update_progress_in_db()
-                        
                         await ws.send_text(json.dumps({
                             "type": "question_complete",
                             "score": score,
@@ -1707,8 +1795,12 @@ async def technical_ws_endpoint(ws: WebSocket):
                 
                 await ws.send_text(json.dumps({"type": "listening", "message": "Listening for your approach..."}))
                 try:
-                    filename = f"technical_approach_{session.session_id}_{len(session.voice_responses)}.wav"
-                    recorded_file, heard_speech = record_with_vad(filename)
+                    endpointer = make_endpointer()
+                    if session.capture_buffer is None:
+                        session.capture_buffer = AudioRingBuffer()
+                    audio, heard_speech = await asyncio.to_thread(
+                        capture_with_vad, buffer=session.capture_buffer, endpointer=endpointer
+                    )
                     
                     if not heard_speech:
                         await ws.send_text(json.dumps({
@@ -1717,11 +1809,11 @@ async def technical_ws_endpoint(ws: WebSocket):
                         }))
                         continue
                     
-                    transcript = transcribe(recorded_file)
-                    try:
-                        os.remove(recorded_file)
-                    except Exception:
-                        pass
+                    lexicon = lexicon_for(session.topics)
+                    transcript = await transcribe_pcm_async(
+                        trim_silence(audio, SAMPLE_RATE), SAMPLE_RATE,
+                        f"technical_approach_{len(session.voice_responses)}", prompt=lexicon.whisper_prompt
+                    )
                     
                     if not transcript_is_valid(transcript):
                         await ws.send_text(json.dumps({
@@ -1732,6 +1824,7 @@ async def technical_ws_endpoint(ws: WebSocket):
                         continue
                     
                     # Store and analyze approach
+                    transcript = lexicon.correct(transcript)
                     session.add_voice_response(transcript, "approach")
                     session.approach_discussed = True
                     
@@ -1741,7 +1834,8 @@ async def technical_ws_endpoint(ws: WebSocket):
                         "type": "approach_analyzed",
                         "transcript": transcript,
                         "feedback": approach_feedback,
-                        "approach_discussed": True
+                        "approach_discussed": True,
+                        "endpointing": endpointer.report()
                     }))
                     
                 except Exception as e:
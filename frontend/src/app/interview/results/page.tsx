@@ -44,7 +44,7 @@ export default function InterviewResultsPage() {
           // Try to fetch from database API
           try {
             const API_URL = process.env.NEXT_PUBLIC_API_URL!;
-            const response = await fetch(`${API_URL}/api/interview-results/${sessionId}`);
+            const response = await fetch(`${API_URL}/api/interview-results/${sessionId}?include=final_results`);
             if (response.ok) {
               const data = await response.json();
               console.log('Fetched results from database:', data);